@@ -0,0 +1,179 @@
+"""Benchmark of the container header reader over a synthetic corpus.
+
+Builds MP4 (moov before and after mdat, 32- and 64-bit box sizes, rotated
+track) and Matroska (Info/Tracks before the clusters, and Tracks after the
+clusters reached through SeekHead) samples with large sparse payloads,
+checks that read_container_info returns the values they were built with,
+and times it. ffprobe is timed on the same files when it is installed.
+Pass extra real files as arguments to include them.
+
+Usage:
+    python benchmarks/bench_container_header.py [--payload-mb 2048] [--runs 50] [files...]
+"""
+import argparse
+import os
+import shutil
+import statistics
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from container_header import read_container_info  # noqa: E402
+
+
+# MP4 builders
+
+def box(box_type, payload):
+    return struct.pack(">I4s", 8 + len(payload), box_type) + payload
+
+
+def full_box(version, flags=0):
+    return bytes([version]) + flags.to_bytes(3, "big")
+
+
+def mp4_moov(duration_ms, width, height, rotate=False, version=0):
+    timescale = 1000
+    if version == 1:
+        mvhd = full_box(1) + struct.pack(">QQIQ", 0, 0, timescale, duration_ms) + b"\0" * 80
+    else:
+        mvhd = full_box(0) + struct.pack(">IIII", 0, 0, timescale, duration_ms) + b"\0" * 80
+    matrix = (0, 0x10000, 0, -0x10000, 0, 0, 0, 0, 0x40000000) if rotate else \
+        (0x10000, 0, 0, 0, 0x10000, 0, 0, 0, 0x40000000)
+
+    def trak(handler, codec, w, h):
+        tkhd = (
+            full_box(0, 7) + struct.pack(">IIIII", 0, 0, 1, 0, duration_ms)
+            + b"\0" * 8 + struct.pack(">hhhh", 0, 0, 0, 0)
+            + struct.pack(">9i", *matrix) + struct.pack(">II", w << 16, h << 16)
+        )
+        hdlr = full_box(0) + struct.pack(">I", 0) + handler + b"\0" * 12 + b"bench\0"
+        stsd = full_box(0) + struct.pack(">I", 1) + box(codec, b"\0" * 78)
+        mdia = box(b"mdia", box(b"hdlr", hdlr) + box(b"minf", box(b"stbl", box(b"stsd", stsd))))
+        return box(b"trak", box(b"tkhd", tkhd) + mdia)
+
+    return box(b"moov", box(b"mvhd", mvhd) + trak(b"vide", b"avc1", width, height)
+               + trak(b"soun", b"mp4a", 0, 0))
+
+
+def write_mp4(path, payload, duration_ms, width, height, moov_first, rotate=False, version=0):
+    ftyp = box(b"ftyp", b"isom\0\0\2\0isomiso2avc1mp41")
+    moov = mp4_moov(duration_ms, width, height, rotate, version)
+    with open(path, "wb") as f:
+        f.write(ftyp)
+        if moov_first:
+            f.write(moov)
+        # 64-bit mdat header, payload left sparse
+        f.write(struct.pack(">I4sQ", 1, b"mdat", 16 + payload))
+        f.seek(payload, os.SEEK_CUR)
+        if not moov_first:
+            f.write(moov)
+        else:
+            f.truncate()
+
+
+# Matroska builders
+
+def element(element_id, payload):
+    id_bytes = element_id.to_bytes((element_id.bit_length() + 7) // 8, "big")
+    return id_bytes + b"\x01" + len(payload).to_bytes(7, "big") + payload
+
+
+def mkv_info(duration_ms):
+    return element(0x1549A966, element(0x2AD7B1, (1000000).to_bytes(3, "big"))
+                   + element(0x4489, struct.pack(">d", float(duration_ms))))
+
+
+def mkv_tracks(width, height):
+    video = element(0xAE, element(0x83, b"\x01") + element(0x86, b"V_MPEG4/ISO/AVC")
+                    + element(0xE0, element(0xB0, width.to_bytes(2, "big"))
+                              + element(0xBA, height.to_bytes(2, "big"))))
+    audio = element(0xAE, element(0x83, b"\x02") + element(0x86, b"A_AAC"))
+    return element(0x1654AE6B, video + audio)
+
+
+def write_mkv(path, payload, duration_ms, width, height, tracks_last):
+    ebml = element(0x1A45DFA3, element(0x4282, b"matroska"))
+    info = mkv_info(duration_ms)
+    tracks = mkv_tracks(width, height)
+    cluster_header = (0x1F43B675).to_bytes(4, "big") + b"\x01" + payload.to_bytes(7, "big")
+    with open(path, "wb") as f:
+        f.write(ebml)
+        # Segment of unknown size, as written by live muxers
+        f.write((0x18538067).to_bytes(4, "big") + b"\x01\xff\xff\xff\xff\xff\xff\xff")
+        segment_start = f.tell()
+        if tracks_last:
+            seek_head_size = len(element(0x114D9B74, element(0x4DBB, element(0x53AB, b"\x16\x54\xae\x6b")
+                                                                   + element(0x53AC, b"\0" * 8))))
+            tracks_pos = seek_head_size + len(info) + len(cluster_header) + payload
+            seek_head = element(0x114D9B74, element(0x4DBB, element(0x53AB, b"\x16\x54\xae\x6b")
+                                                    + element(0x53AC, tracks_pos.to_bytes(8, "big"))))
+            f.write(seek_head + info + cluster_header)
+            f.seek(payload, os.SEEK_CUR)
+            assert f.tell() - segment_start == tracks_pos
+            f.write(tracks)
+        else:
+            f.write(info + tracks + cluster_header)
+            f.seek(payload, os.SEEK_CUR)
+            f.truncate()
+
+
+def time_call(func, runs):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--payload-mb", type=int, default=2048)
+    parser.add_argument("--runs", type=int, default=50)
+    parser.add_argument("files", nargs="*")
+    args = parser.parse_args()
+
+    payload = args.payload_mb * 1024 * 1024
+    root = tempfile.mkdtemp(prefix="bench_header_")
+    # (name, builder, expected duration_ms, width, height)
+    samples = [
+        ("mp4_moov_first.mp4", lambda p: write_mp4(p, payload, 7265432, 1920, 1080, True), 7265432, 1920, 1080),
+        ("mp4_moov_last.mp4", lambda p: write_mp4(p, payload, 5400000, 1280, 720, False), 5400000, 1280, 720),
+        ("mp4_v1_rotated.mov", lambda p: write_mp4(p, payload, 61000, 1920, 1080, False, True, 1), 61000, 1080, 1920),
+        ("mkv_tracks_first.mkv", lambda p: write_mkv(p, payload, 7200500, 854, 480, False), 7200500, 854, 480),
+        ("mkv_seekhead.webm", lambda p: write_mkv(p, payload, 3600000, 640, 360, True), 3600000, 640, 360),
+    ]
+    ffprobe = shutil.which("ffprobe")
+    print(f"payload {args.payload_mb} MB (sparse), {args.runs} runs, ffprobe: {'yes' if ffprobe else 'no'}")
+    try:
+        paths = []
+        for name, build, duration_ms, width, height in samples:
+            path = os.path.join(root, name)
+            build(path)
+            info = read_container_info(path)
+            ok = info is not None and (info.duration_ms, info.width, info.height) == (duration_ms, width, height)
+            paths.append((name, path, "ok" if ok else "MISMATCH"))
+        for path in args.files:
+            paths.append((os.path.basename(path), path, "-"))
+
+        for name, path, check in paths:
+            info = read_container_info(path)
+            header = time_call(lambda: read_container_info(path), args.runs)
+            line = f"{name:<24} {check:<9} header {header * 1e6:>9.1f} us"
+            if info:
+                line += f"  {info.duration_ms} ms {info.width}x{info.height}"
+            if ffprobe:
+                cmd = [ffprobe, "-v", "error", "-show_entries", "format=duration", "-of", "json", path]
+                probe = time_call(lambda: subprocess.run(cmd, capture_output=True), max(1, args.runs // 10))
+                line += f"  ffprobe {probe * 1000:>8.1f} ms"
+            print(line)
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""Database round trips and lookup time of the URL delivery index.
+
+Fills a simulated downloads collection (every query sleeps --latency ms,
+like a remote MongoDB) with delivered URLs, then checks a list in which
+--dup-ratio of the lines were delivered before. Compared: one find per
+line, and DeliveryIndex with its Bloom filter front, per-line lookups and
+batch prefetch. URLs are written with varied case, ports and utm_*
+parameters to exercise normalization.
+
+Usage:
+    python benchmarks/bench_dedup.py [--delivered 200000] [--lines 5000] [--dup-ratio 0.5] [--latency 2]
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import dedup  # noqa: E402
+from dedup import DeliveryIndex, url_key  # noqa: E402
+
+
+class SimulatedCollection:
+    def __init__(self, latency):
+        self.latency = latency
+        self.store = {}
+        self.queries = 0
+
+    async def _round_trip(self):
+        self.queries += 1
+        await asyncio.sleep(self.latency)
+
+    async def ensure_indexes(self):
+        return True
+
+    async def get_upload_keys(self):
+        await self._round_trip()
+        return list(self.store)
+
+    async def find_uploads(self, url_keys):
+        await self._round_trip()
+        return [self.store[key] for key in url_keys if key in self.store]
+
+    async def record_upload(self, record):
+        await self._round_trip()
+        self.store[record["url_key"]] = record
+
+    async def delete_upload(self, key):
+        await self._round_trip()
+        self.store.pop(key, None)
+
+
+def list_url(rng, i):
+    host = rng.choice(["cdn.example.com", "CDN.Example.com", "cdn.example.com:443"])
+    tracking = rng.choice(["", "?utm_source=group", "?utm_medium=share&utm_source=x"])
+    return f"https://{host}/course/{i}/video.mp4{tracking}"
+
+
+async def naive(collection, urls):
+    hits = 0
+    for url in urls:
+        hits += bool(await collection.find_uploads([url_key(url)]))
+    return hits
+
+
+async def indexed(bloom, urls, prefetch):
+    # Share the loaded filter, a fresh LRU for each run
+    index = DeliveryIndex()
+    index._bloom = bloom
+    if prefetch:
+        await index.prefetch(urls)
+    hits = 0
+    for url in urls:
+        hits += await index.lookup(url) is not None
+    return hits
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--delivered", type=int, default=200000)
+    parser.add_argument("--lines", type=int, default=5000)
+    parser.add_argument("--dup-ratio", type=float, default=0.5)
+    parser.add_argument("--latency", type=float, default=2.0, help="milliseconds per query")
+    args = parser.parse_args()
+
+    rng = random.Random(11)
+    collection = SimulatedCollection(args.latency / 1000)
+    dedup.db = collection
+    for i in range(args.delivered):
+        key = url_key(f"https://cdn.example.com/course/{i}/video.mp4")
+        collection.store[key] = {"url_key": key, "chat_id": 1, "message_id": i}
+
+    urls = [
+        list_url(rng, rng.randrange(args.delivered) if rng.random() < args.dup_ratio else args.delivered + i)
+        for i in range(args.lines)
+    ]
+
+    start = time.perf_counter()
+    index = DeliveryIndex()
+    await index.load()
+    print(f"load {args.delivered} keys: {time.perf_counter() - start:.2f} s")
+
+    for label, run in (
+        ("find per line", lambda: naive(collection, urls)),
+        ("index", lambda: indexed(index._bloom, urls, False)),
+        ("index+prefetch", lambda: indexed(index._bloom, urls, True)),
+    ):
+        collection.queries = 0
+        start = time.perf_counter()
+        hits = await run()
+        elapsed = time.perf_counter() - start
+        print(f"{label:<15} {elapsed:>7.2f} s  {collection.queries:>6} queries  {hits} duplicates found")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
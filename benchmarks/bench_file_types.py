@@ -0,0 +1,123 @@
+"""Requests, time and accuracy of the file-type classifier on extensionless links.
+
+Serves a course list's worth of extensionless URLs from a local aiohttp
+server that answers after --latency ms: videos under one path layout with
+a video/* Content-Type, PDFs under another sent as application/octet-stream
+(so they need sniffing), and a /download?id= endpoint mixing both. Compared:
+the old extension checks of the download stage, which skip every one of
+these as unsupported, a HEAD (plus a range GET when generic) per URL, and
+file_types.FileTypeClassifier with its per-pattern memo.
+
+Usage:
+    python benchmarks/bench_file_types.py [--urls 300] [--latency 20]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+from aiohttp import web
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from file_types import FileTypeClassifier, file_type_for_mime, sniff_mime  # noqa: E402
+from http_engine import http_engine  # noqa: E402
+
+PDF = b"%PDF-1.4\n" + b"0" * 4096
+MP4 = b"\x00\x00\x00\x20ftypisom\x00\x00\x02\x00isomiso2avc1mp41" + b"\x00" * 4096
+
+
+def legacy_kind(url):
+    """The old download stage's checks, before the list parser"""
+    base_url = url.split('*')[0].lower()
+    if any(base_url.endswith(ext) for ext in ['.mkv', '.mp4', '.avi', '.mov', '.wmv', '.flv', '.webm']):
+        return 'video'
+    if base_url.endswith('.pdf') or ('pdf' in base_url and '*' in url):
+        return 'pdf'
+    return 'other'
+
+
+def make_app(latency, counter):
+    async def handle(request):
+        counter[0] += 1
+        await asyncio.sleep(latency)
+        path = request.path
+        if path.startswith("/video/"):
+            body, content_type = MP4, "video/mp4"
+        elif path.startswith("/notes/"):
+            body, content_type = PDF, "application/octet-stream"
+        else:
+            body = PDF if int(request.query.get("id", 0)) % 2 == 0 else MP4
+            content_type = "application/octet-stream"
+        if request.headers.get("Range"):
+            body = body[:2048]
+        return web.Response(body=body, content_type=content_type)
+
+    app = web.Application()
+    app.router.add_route("*", "/{tail:.*}", handle)
+    return app
+
+
+async def probe_each(url):
+    session = await http_engine.session()
+    async with session.head(url) as resp:
+        file_type = file_type_for_mime(resp.headers.get("Content-Type"))
+    if file_type:
+        return file_type.kind
+    async with session.get(url, headers={"Range": "bytes=0-2047"}) as resp:
+        data = await resp.read()
+    file_type = file_type_for_mime(sniff_mime(data))
+    return file_type.kind if file_type else 'other'
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--urls", type=int, default=300)
+    parser.add_argument("--latency", type=float, default=20.0, help="milliseconds per response")
+    args = parser.parse_args()
+
+    counter = [0]
+    runner = web.AppRunner(make_app(args.latency / 1000, counter))
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    base = f"http://127.0.0.1:{port}"
+
+    urls, expected = [], []
+    for i in range(args.urls):
+        layout = i % 3
+        if layout == 0:
+            urls.append(f"{base}/video/{i}/play")
+            expected.append("video")
+        elif layout == 1:
+            urls.append(f"{base}/notes/{i}/file")
+            expected.append("pdf")
+        else:
+            urls.append(f"{base}/download?id={i}")
+            expected.append("pdf" if i % 2 == 0 else "video")
+
+    classifier = FileTypeClassifier()
+
+    async def classified(url):
+        return (await classifier.classify(url)).kind
+
+    async def legacy(url):
+        return legacy_kind(url)
+
+    try:
+        for label, classify in (("legacy", legacy), ("probe each", probe_each), ("classifier", classified)):
+            counter[0] = 0
+            start = time.perf_counter()
+            kinds = [await classify(url) for url in urls]
+            elapsed = time.perf_counter() - start
+            correct = sum(kind == want for kind, want in zip(kinds, expected))
+            print(f"{label:<11} {elapsed:>6.2f} s  {counter[0]:>5} requests  {correct}/{len(urls)} correct")
+    finally:
+        await http_engine.close()
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,134 @@
+"""Benchmark of the native HTTP engine against yt-dlp on a local server.
+
+Serves generated files from a local aiohttp server (with Range support) and
+measures per-file startup latency for small files and throughput for a large
+one, for the segmented engine and for yt-dlp's generic extractor. aria2c is
+used for the yt-dlp run when it is installed, like in production.
+
+Usage:
+    python benchmarks/bench_http_engine.py [--small-count 20] [--large-mb 256]
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from aiohttp import web
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from http_engine import HttpEngine  # noqa: E402
+
+
+def make_file(path, size):
+    with open(path, "wb") as f:
+        remaining = size
+        block = os.urandom(1024 * 1024)
+        while remaining > 0:
+            f.write(block[:remaining])
+            remaining -= len(block)
+
+
+async def start_server(root):
+    app = web.Application()
+    app.router.add_static("/", root)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}"
+
+
+def ytdlp_download(url, out_dir):
+    import yt_dlp
+    opts = {
+        "quiet": True,
+        "no_warnings": True,
+        "noprogress": True,
+        "outtmpl": os.path.join(out_dir, "%(title).100s.%(ext)s"),
+    }
+    if shutil.which("aria2c"):
+        opts["external_downloader"] = "aria2c"
+        opts["external_downloader_args"] = ["-x", "16", "-s", "16", "-k", "16M"]
+    with yt_dlp.YoutubeDL(opts) as ydl:
+        ydl.extract_info(url, download=True)
+
+
+async def bench_engine(engine, urls, out_dir):
+    timings = []
+    for i, url in enumerate(urls):
+        start = time.perf_counter()
+        await engine.download(url, os.path.join(out_dir, f"engine_{i}"))
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+async def bench_ytdlp(urls, out_dir):
+    timings = []
+    loop = asyncio.get_running_loop()
+    for i, url in enumerate(urls):
+        target = os.path.join(out_dir, f"ytdlp_{i}")
+        os.makedirs(target, exist_ok=True)
+        start = time.perf_counter()
+        await loop.run_in_executor(None, ytdlp_download, url, target)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def report(name, timings, size=None):
+    median = sorted(timings)[len(timings) // 2]
+    line = f"{name:<28} median {median * 1000:>9.1f} ms  total {sum(timings):>7.2f} s"
+    if size:
+        line += f"  {size / median / 1024 / 1024:>8.1f} MB/s"
+    print(line)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--small-count", type=int, default=20)
+    parser.add_argument("--small-kb", type=int, default=300)
+    parser.add_argument("--large-mb", type=int, default=256)
+    parser.add_argument("--large-runs", type=int, default=3)
+    parser.add_argument("--skip-ytdlp", action="store_true")
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp(prefix="bench_http_")
+    serve_dir = os.path.join(root, "serve")
+    out_dir = os.path.join(root, "out")
+    os.makedirs(serve_dir)
+    os.makedirs(out_dir)
+    try:
+        for i in range(args.small_count):
+            make_file(os.path.join(serve_dir, f"small_{i}.pdf"), args.small_kb * 1024)
+        large_size = args.large_mb * 1024 * 1024
+        make_file(os.path.join(serve_dir, "large.mp4"), large_size)
+
+        runner, base = await start_server(serve_dir)
+        small_urls = [f"{base}/small_{i}.pdf" for i in range(args.small_count)]
+        large_urls = [f"{base}/large.mp4"] * args.large_runs
+
+        engine = HttpEngine()
+        print(f"small files: {args.small_count} x {args.small_kb} KB, "
+              f"large file: {args.large_mb} MB x {args.large_runs}, "
+              f"aria2c: {'yes' if shutil.which('aria2c') else 'no'}")
+        try:
+            report("engine, small (startup)", await bench_engine(engine, small_urls, out_dir))
+            report("engine, large", await bench_engine(engine, large_urls, out_dir), large_size)
+        finally:
+            await engine.close()
+
+        if not args.skip_ytdlp:
+            report("yt-dlp, small (startup)", await bench_ytdlp(small_urls, out_dir))
+            report("yt-dlp, large", await bench_ytdlp(large_urls, out_dir), large_size)
+
+        await runner.cleanup()
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
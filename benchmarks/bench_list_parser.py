@@ -0,0 +1,153 @@
+"""Golden checks and timing for the shared batch list parser.
+
+Every list in benchmarks/corpus/lists/*.txt has a *.expected.json next to
+it with the manifest /txt and document uploads build and the output /filter
+writes. The accents_* lists hold the same text in different encodings.
+Both paths are checked against it, then parse_manifest is timed
+against the previous /txt handling, which stripped and split the file, ran
+a ':' validation pass and parsed and classified each line again when it
+was downloaded.
+
+Usage:
+    python benchmarks/bench_list_parser.py [--lines 200000] [--update]
+"""
+import argparse
+import asyncio
+import glob
+import json
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from list_parser import parse_manifest, read_manifest  # noqa: E402
+from txt_filter import filter_lines  # noqa: E402
+
+CORPUS = os.path.join(ROOT, "benchmarks", "corpus", "lists")
+
+
+def legacy_parse_line(line):
+    """The old bot.parse_line, minus its logging"""
+    if ':http' in line:
+        filename, url = line.split(':http', 1)
+        filename, url = filename.strip(), 'http' + url.strip()
+        if ('.pdf*' in url.lower() or url.lower().endswith('.pdf')) and not filename.lower().endswith('.pdf'):
+            filename = f"{filename}.pdf"
+        return filename, url
+    url_start = line.find('http://')
+    if url_start == -1:
+        url_start = line.find('https://')
+    if url_start == -1:
+        return None, None
+    filename = line[:url_start].strip().rstrip(':').strip()
+    url = line[url_start:].strip()
+    if not filename:
+        filename = url.split('/')[-1].split('?')[0]
+    if url.lower().endswith('.pdf') and not filename.lower().endswith('.pdf'):
+        filename = f"{filename}.pdf"
+    return filename, url
+
+
+def legacy_classify(url):
+    """The old download stage's skip checks"""
+    if url.lower().endswith('.zip'):
+        return 'zip'
+    if "youtube.com" in url.lower() or "youtu.be" in url.lower():
+        return 'youtube'
+    base_url = url.split('*')[0].lower()
+    if any(base_url.endswith(ext) for ext in ['.mkv', '.mp4', '.avi', '.mov', '.wmv', '.flv', '.webm']):
+        return 'video'
+    if base_url.endswith('.pdf') or ('pdf' in base_url and '*' in url):
+        return 'pdf'
+    return 'other'
+
+
+def legacy_txt(content):
+    urls = [line.strip() for line in content.splitlines() if line.strip()]
+    valid, invalid = [], []
+    for line in urls:
+        if ":" in line:
+            filename, url = [x.strip() for x in line.split(":", 1)]
+            (valid if filename and url else invalid).append(line)
+        else:
+            invalid.append(line)
+    # Each valid line was parsed and classified again by the download stage
+    parsed = [legacy_parse_line(line) for line in valid]
+    return [(filename, url, legacy_classify(url)) for filename, url in parsed if url], invalid
+
+
+def snapshot(list_path):
+    manifest = asyncio.run(read_manifest(list_path))
+    with tempfile.NamedTemporaryFile(suffix=".txt", delete=False) as tmp:
+        output_path = tmp.name
+    try:
+        filter_lines(list_path, output_path)
+        with open(output_path, encoding="utf-8") as f:
+            filter_output = f.read().splitlines()
+    finally:
+        os.remove(output_path)
+    return {
+        "entries": [entry.as_dict() for entry in manifest.entries],
+        "invalid": manifest.invalid,
+        "filter": filter_output,
+    }
+
+
+def check_corpus(update):
+    failures = 0
+    for list_path in sorted(glob.glob(os.path.join(CORPUS, "*.txt"))):
+        expected_path = f"{list_path[:-4]}.expected.json"
+        actual = snapshot(list_path)
+        if update:
+            with open(expected_path, "w", encoding="utf-8") as f:
+                json.dump(actual, f, indent=2, ensure_ascii=False)
+                f.write("\n")
+            print(f"updated  {os.path.basename(expected_path)}")
+            continue
+        with open(expected_path, encoding="utf-8") as f:
+            expected = json.load(f)
+        for section in ("entries", "invalid", "filter"):
+            if actual[section] != expected[section]:
+                failures += 1
+                print(f"MISMATCH {os.path.basename(list_path)} {section}")
+                for want, got in zip(expected[section], actual[section]):
+                    if want != got:
+                        print(f"  expected {want}\n  got      {got}")
+                        break
+        print(f"checked  {os.path.basename(list_path)}: {len(actual['entries'])} entries, "
+              f"{len(actual['invalid'])} invalid")
+    return failures
+
+
+def time_parsers(lines):
+    with open(os.path.join(CORPUS, "mixed.txt"), encoding="utf-8") as f:
+        sample = f.read().splitlines()
+    content = "\n".join(sample[i % len(sample)] for i in range(lines))
+    for label, func in (
+        ("legacy", legacy_txt),
+        ("manifest", lambda text: parse_manifest(text.splitlines())),
+    ):
+        start = time.perf_counter()
+        func(content)
+        elapsed = time.perf_counter() - start
+        print(f"{lines:>9} lines  {label:<9} {elapsed:>6.2f} s  {lines / elapsed / 1000:>7.1f} k lines/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lines", type=int, default=200000)
+    parser.add_argument("--update", action="store_true", help="rewrite the expected files")
+    args = parser.parse_args()
+
+    failures = check_corpus(args.update)
+    if not args.update:
+        time_parsers(args.lines)
+    if failures:
+        sys.exit(f"{failures} golden mismatch(es)")
+
+
+if __name__ == "__main__":
+    main()
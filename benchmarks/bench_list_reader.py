@@ -0,0 +1,92 @@
+"""Event loop stalls and wall time reading an uploaded list file.
+
+Writes a large list as utf-8, as utf-8 with one latin-1 byte on its last
+line and as utf-16, then loads each the old way (blocking open().read()
+inside the handler, retried per encoding, then splitlines and parse) and
+with list_parser.read_manifest. A ticker task records the longest gap the
+event loop went without running while each load was in progress.
+
+Usage:
+    python benchmarks/bench_list_reader.py [--lines 500000]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from list_parser import parse_manifest, read_manifest  # noqa: E402
+
+
+async def legacy_load(path):
+    content = None
+    for encoding in ['utf-8', 'latin-1', 'ascii']:
+        try:
+            with open(path, 'r', encoding=encoding) as f:
+                content = f.read()
+            break
+        except UnicodeDecodeError:
+            continue
+    return parse_manifest(content.splitlines())
+
+
+async def measure(load, path):
+    gaps = [0.0]
+    done = asyncio.Event()
+
+    async def ticker():
+        last = time.perf_counter()
+        while not done.is_set():
+            await asyncio.sleep(0.001)
+            now = time.perf_counter()
+            gaps.append(now - last)
+            last = now
+
+    task = asyncio.create_task(ticker())
+    await asyncio.sleep(0.01)
+    start = time.perf_counter()
+    manifest = await load(path)
+    elapsed = time.perf_counter() - start
+    done.set()
+    await task
+    return elapsed, max(gaps), manifest
+
+
+def write_samples(root, lines):
+    body = [f"Lecture {i} Café - Physics : https://cdn.example.com/course/{i}/video.mp4" for i in range(lines)]
+    samples = []
+    for name, encoding, last in (
+        ("utf-8", "utf-8", "Last : https://cdn.example.com/end.mp4"),
+        ("utf-8 + latin-1 tail", "utf-8", None),
+        ("utf-16", "utf-16", "Last : https://cdn.example.com/end.mp4"),
+    ):
+        path = os.path.join(root, f"{name.replace(' ', '_')}.txt")
+        with open(path, "wb") as f:
+            f.write("\n".join(body).encode(encoding))
+            if last:
+                f.write(f"\n{last}".encode(encoding)[2 if encoding == "utf-16" else 0:])
+            else:
+                f.write("\nLast caf\xe9 : https://cdn.example.com/end.mp4".encode("latin-1"))
+        samples.append((name, path))
+    return samples
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lines", type=int, default=500000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="bench_reader_") as root:
+        for name, path in write_samples(root, args.lines):
+            size = os.path.getsize(path) / 1024 / 1024
+            for label, load in (("legacy", legacy_load), ("streaming", read_manifest)):
+                elapsed, stall, manifest = await measure(load, path)
+                print(f"{name:<22} {size:>6.1f} MiB  {label:<10} {elapsed:>6.2f} s  "
+                      f"longest stall {stall * 1000:>8.1f} ms  entries {len(manifest.entries)}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
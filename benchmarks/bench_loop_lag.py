@@ -0,0 +1,89 @@
+"""Event-loop lag while media tools run.
+
+A ticker coroutine wakes every --tick ms and records how late it was, while
+a batch of media-tool calls runs. The calls go either through a blocking
+subprocess.run inside an async def (the old extract_video_metadata) or
+through media_tools.run_tool. Lag stays near zero only when the loop is
+never blocked.
+
+By default each call is a short Python sleep standing in for ffprobe, so
+the benchmark runs without ffmpeg installed. Pass --cmd to time a real tool,
+e.g. --cmd "ffprobe -v error -show_format video.mp4".
+
+Usage:
+    python benchmarks/bench_loop_lag.py [--calls 8] [--concurrency 4]
+"""
+import argparse
+import asyncio
+import os
+import shlex
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from media_tools import run_tool  # noqa: E402
+
+DEFAULT_CMD = [sys.executable, "-c", "import time; time.sleep(0.3)"]
+
+
+async def ticker(interval, lags, stop):
+    loop = asyncio.get_running_loop()
+    expected = loop.time() + interval
+    while not stop.is_set():
+        await asyncio.sleep(interval)
+        now = loop.time()
+        lags.append(max(0.0, now - expected))
+        expected = now + interval
+
+
+async def blocking_call(cmd):
+    # What extract_video_metadata used to do: subprocess.run on the loop thread
+    subprocess.run(cmd, capture_output=True)
+
+
+async def runner_call(cmd):
+    await run_tool(cmd)
+
+
+async def measure(name, call, cmd, calls, concurrency, interval):
+    lags = []
+    stop = asyncio.Event()
+    tick_task = asyncio.create_task(ticker(interval, lags, stop))
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            await call(cmd)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(calls)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await tick_task
+
+    lags.sort()
+    p99 = lags[int(len(lags) * 0.99) - 1] if lags else 0.0
+    print(
+        f"{name:<22} wall {elapsed:>6.2f} s  max lag {max(lags, default=0) * 1000:>8.1f} ms  "
+        f"p99 lag {p99 * 1000:>8.1f} ms  ticks {len(lags)}"
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=8)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--tick", type=float, default=10, help="Ticker interval in ms")
+    parser.add_argument("--cmd", help="Tool command line to run instead of the stand-in")
+    args = parser.parse_args()
+
+    cmd = shlex.split(args.cmd) if args.cmd else DEFAULT_CMD
+    interval = args.tick / 1000
+    await measure("subprocess.run", blocking_call, cmd, args.calls, args.concurrency, interval)
+    await measure("media_tools.run_tool", runner_call, cmd, args.calls, args.concurrency, interval)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,94 @@
+"""Micro-benchmark of progress hook overhead on the download thread.
+
+Compares the old blocking hand-off (run_coroutine_threadsafe(...).result)
+with ProgressChannel.publish, against a fast and a slow (Telegram-like)
+consumer.
+
+Usage:
+    python benchmarks/bench_progress_hook.py [--calls 20000] [--slow-delay 0.2]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from progress import ProgressChannel  # noqa: E402
+
+SAMPLE = (42.0, 1024 * 1024, 100 * 1024 * 1024, 42 * 1024 * 1024, 58, "video.mkv")
+
+
+def make_consumer(delay):
+    async def consumer(*sample):
+        if delay:
+            await asyncio.sleep(delay)
+    return consumer
+
+
+def legacy_hook(loop, callback):
+    """The previous hand-off: blocks until the edit finishes or 1 s passes"""
+    def hook():
+        try:
+            future = asyncio.run_coroutine_threadsafe(callback(*SAMPLE), loop)
+            future.result(timeout=1)
+        except Exception:
+            pass
+    return hook
+
+
+def channel_hook(channel):
+    def hook():
+        channel.publish(*SAMPLE)
+    return hook
+
+
+async def measure(name, make_hook, calls):
+    """Call the hook `calls` times from a worker thread, return per-call cost"""
+    loop = asyncio.get_running_loop()
+    hook, close = make_hook(loop)
+    timings = []
+
+    def worker():
+        start = time.perf_counter()
+        for _ in range(calls):
+            hook()
+        timings.append(time.perf_counter() - start)
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    while thread.is_alive():
+        await asyncio.sleep(0.001)
+    if close:
+        await close()
+    per_call = timings[0] / calls
+    print(f"{name:<34} {calls:>8} calls {per_call * 1e6:>12.2f} us/call")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=20000)
+    parser.add_argument("--legacy-slow-calls", type=int, default=20,
+                        help="Calls for the legacy slow case, each one blocks")
+    parser.add_argument("--slow-delay", type=float, default=0.2,
+                        help="Simulated edit_text latency in seconds")
+    args = parser.parse_args()
+
+    for label, delay in (("fast consumer", 0), ("slow consumer", args.slow_delay)):
+        legacy_calls = args.calls if not delay else args.legacy_slow_calls
+        await measure(
+            f"legacy, {label}",
+            lambda loop: (legacy_hook(loop, make_consumer(delay)), None),
+            legacy_calls,
+        )
+
+        def make_channel(loop, delay=delay):
+            channel = ProgressChannel(make_consumer(delay), loop).start()
+            return channel_hook(channel), channel.close
+        await measure(f"channel, {label}", make_channel, args.calls)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
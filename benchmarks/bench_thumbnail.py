@@ -0,0 +1,135 @@
+"""Thumbnail latency and CPU time, piped single call vs the old disk round-trips.
+
+Builds a short, a long and a corrupt-start video with ffmpeg and times
+metadata_handler.generate_thumbnail against the previous implementation.
+The previous one ran two ffmpeg calls per timestamp, each writing a JPEG
+that PIL reopened, composited and re-encoded, with backoff sleeps between
+attempts. CPU time includes the ffmpeg children. Requires ffmpeg on PATH.
+
+Usage:
+    python benchmarks/bench_thumbnail.py [--runs 5] [--long-seconds 600] [files...]
+"""
+import argparse
+import asyncio
+import os
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image  # noqa: E402
+
+from container_header import read_container_info  # noqa: E402
+from media_tools import run_tool  # noqa: E402
+from metadata_handler import generate_thumbnail  # noqa: E402
+
+
+async def legacy_thumbnail(video_path, max_attempts=5):
+    """The old generate_thumbnail, minus its file-size polling"""
+    thumbnail_path = f"{video_path}_legacy.jpg"
+    if os.path.exists(thumbnail_path):
+        os.remove(thumbnail_path)
+
+    def finish():
+        with Image.open(thumbnail_path) as img:
+            if img.mode != 'RGB':
+                img = img.convert('RGB')
+            bg = Image.new('RGB', img.size, (255, 255, 255))
+            bg.paste(img)
+            bg.thumbnail((320, 320), Image.Resampling.LANCZOS)
+            bg.save(thumbnail_path, "JPEG", quality=95, optimize=True)
+
+    for attempt in range(max_attempts):
+        ts = 1 + attempt * 5
+        for seek in (['-ss', str(ts), '-i', video_path], ['-i', video_path, '-ss', str(ts)]):
+            await run_tool(['ffmpeg', *seek, '-vframes', '1',
+                            '-vf', 'scale=320:320:force_original_aspect_ratio=decrease',
+                            '-y', thumbnail_path], heavy=True)
+            if os.path.exists(thumbnail_path) and os.path.getsize(thumbnail_path) > 0:
+                try:
+                    finish()
+                    return thumbnail_path
+                except Exception:
+                    break
+        if attempt < max_attempts - 1:
+            await asyncio.sleep(2 ** attempt)
+    return None
+
+
+def make_samples(root, long_seconds):
+    def encode(name, seconds, extra=()):
+        path = os.path.join(root, name)
+        subprocess.run([
+            'ffmpeg', '-v', 'error', '-y',
+            '-f', 'lavfi', '-i', f'testsrc2=size=1280x720:rate=25:duration={seconds}',
+            '-f', 'lavfi', '-i', f'sine=duration={seconds}',
+            '-c:v', 'libx264', '-preset', 'ultrafast', '-g', '250', '-c:a', 'aac',
+            *extra, path
+        ], check=True)
+        return path
+
+    short = encode('short.mp4', 3)
+    long = encode('long.mp4', long_seconds, ['-movflags', '+faststart'])
+    # Intact header, media data garbled from 5% to 25%, as from a broken capture
+    corrupt = encode('corrupt_start.mp4', 40, ['-g', '50', '-movflags', '+faststart'])
+    size = os.path.getsize(corrupt)
+    with open(corrupt, 'r+b') as f:
+        f.seek(size // 20)
+        f.write(os.urandom(size // 5))
+    return [('short 3s', short), (f'long {long_seconds}s', long), ('corrupt start', corrupt)]
+
+
+def cpu_seconds():
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return own.ru_utime + own.ru_stime + children.ru_utime + children.ru_stime
+
+
+async def measure(func, path, runs):
+    walls, cpus, result = [], [], None
+    for _ in range(runs):
+        cpu = cpu_seconds()
+        start = time.perf_counter()
+        result = await func(path)
+        walls.append(time.perf_counter() - start)
+        cpus.append(cpu_seconds() - cpu)
+    return statistics.median(walls), statistics.median(cpus), result
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--long-seconds', type=int, default=600)
+    parser.add_argument('files', nargs='*')
+    args = parser.parse_args()
+
+    if not shutil.which('ffmpeg'):
+        sys.exit('ffmpeg is not on PATH')
+
+    root = tempfile.mkdtemp(prefix='bench_thumb_')
+    try:
+        samples = make_samples(root, args.long_seconds)
+        samples += [(os.path.basename(path), path) for path in args.files]
+        for name, path in samples:
+            # get_video_metadata passes the probed duration along the same way
+            header = read_container_info(path)
+            duration = header.duration_ms / 1000 if header else None
+
+            async def piped(video_path):
+                return await generate_thumbnail(video_path, duration=duration)
+
+            for label, func in (('legacy', legacy_thumbnail), ('piped', piped)):
+                wall, cpu, result = await measure(func, path, args.runs)
+                print(f"{name:<16} {label:<7} wall {wall * 1000:>8.1f} ms  cpu {cpu * 1000:>8.1f} ms  "
+                      f"{'ok' if result else 'FAILED'}")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,175 @@
+"""Throughput and peak memory of the /filter list formatter.
+
+Generates synthetic course lists in every layout the formatter accepts
+("name - url", "name : url", "name :: url", bare URLs, "name url", URLs
+inside text) plus junk lines, and runs them through the streaming
+txt_filter.filter_lines and through the previous implementation (four
+re.match calls per line, whole file and both result lists in memory).
+Lines whose output differs are counted; /filter now shares the list_parser
+grammar with /txt, so the old layout quirks no longer match exactly.
+
+Usage:
+    python benchmarks/bench_txt_filter.py [--sizes 10000 100000 1000000]
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from txt_filter import filter_lines, clean_filename  # noqa: E402
+
+
+def clean_url(url):
+    url = url.strip()
+    if not url.startswith(('http://', 'https://')):
+        if '//' in url:
+            url = 'https:' + url[url.index('//'):]
+        else:
+            url = 'https://' + url
+    return url
+
+
+def legacy_format_line(line):
+    patterns = [
+        r'^(.+?)\s*-\s*(https?://\S+|//\S+|\S+\.\S+)$',
+        r'^(.+?)\s*:+\s*(https?://\S+|//\S+|\S+\.\S+)$',
+        r'^(https?://\S+|//\S+|\S+\.\S+)$',
+        r'^(.+?)\s+(https?://\S+|//\S+|\S+\.\S+)$'
+    ]
+    if not line.strip():
+        return None
+    for pattern in patterns:
+        match = re.match(pattern, line.strip())
+        if match:
+            if len(match.groups()) == 1:
+                url = clean_url(match.group(1))
+                filename = url.split('/')[-1].split('?')[0].split('*')[0]
+                if not filename:
+                    filename = f"File_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+            else:
+                filename = match.group(1)
+                url = match.group(2)
+            filename = clean_filename(filename)
+            url = clean_url(url)
+            if url.lower().endswith('.pdf') and not filename.lower().endswith('.pdf'):
+                filename += '.pdf'
+            elif '*' in url and '.mkv' in url.lower() and not filename.lower().endswith('.mkv'):
+                filename += '.mkv'
+            elif any(url.lower().endswith(ext) for ext in ['.mp4', '.mkv', '.avi']):
+                ext = url.split('.')[-1].split('*')[0].lower()
+                if not filename.lower().endswith(ext):
+                    filename += f'.{ext}'
+            return f"{filename} : {url}"
+    url_match = re.search(r'(https?://\S+|//\S+|\S+\.\S+)', line)
+    if url_match:
+        url = clean_url(url_match.group(1))
+        remaining = line.replace(url_match.group(1), '').strip(' :-')
+        filename = clean_filename(remaining) if remaining else url.split('/')[-1].split('?')[0]
+        return f"{filename} : {url}"
+    return None
+
+
+def legacy_filter(input_path, output_path):
+    with open(input_path, 'r', encoding='utf-8') as f:
+        content = f.read()
+    formatted_lines, skipped_lines = [], []
+    for line in content.splitlines():
+        if line.strip():
+            formatted = legacy_format_line(line)
+            if formatted:
+                formatted_lines.append(formatted)
+            else:
+                skipped_lines.append(line)
+    output_content = []
+    if formatted_lines:
+        output_content.append("✅ Formatted URLs:")
+        output_content.extend(formatted_lines)
+    if skipped_lines:
+        if output_content:
+            output_content.append("\n❌ Skipped Lines (Invalid Format):")
+        output_content.extend(skipped_lines)
+    with open(output_path, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(output_content))
+    return len(formatted_lines), len(skipped_lines)
+
+
+def synthetic_line(rng, i):
+    name = f"Lecture {i} Part {rng.randint(1, 9)} - {rng.choice(['Physics', 'Maths', 'Chemistry'])}"
+    url = rng.choice([
+        f"https://cdn.example.com/course/{i}/master.m3u8",
+        f"https://files.example.com/notes/{i}.pdf",
+        f"https://videos.example.com/enc/{i}.mkv*{rng.randint(10000, 99999)}",
+        f"//media.example.com/{i}/video.mp4",
+        f"www.example.com/watch?v={i}",
+    ])
+    layout = rng.random()
+    if layout < 0.40:
+        return f"{name}:{url}"
+    if layout < 0.55:
+        return f"{name} - {url}"
+    if layout < 0.65:
+        return f"{name} :: {url}"
+    if layout < 0.75:
+        return url
+    if layout < 0.85:
+        return f"{name} {url}"
+    if layout < 0.92:
+        return f"see {url} for {name}"
+    if layout < 0.97:
+        return f"{name} (no link)"
+    return ""
+
+
+def measure(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    func(*args)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    root = tempfile.mkdtemp(prefix="bench_txt_")
+    try:
+        for size in args.sizes:
+            input_path = os.path.join(root, f"list_{size}.txt")
+            with open(input_path, "w", encoding="utf-8") as f:
+                f.write("\n".join(synthetic_line(rng, i) for i in range(size)))
+            legacy_out = os.path.join(root, "legacy.txt")
+            stream_out = os.path.join(root, "stream.txt")
+
+            for label, func, out in (
+                ("legacy", legacy_filter, legacy_out),
+                ("streaming", filter_lines, stream_out),
+            ):
+                elapsed, peak, (formatted, skipped) = measure(func, input_path, out)
+                print(
+                    f"{size:>9} lines  {label:<10} {elapsed:>7.2f} s  {size / elapsed / 1000:>7.1f} k lines/s  "
+                    f"peak {peak / 1024 / 1024:>7.1f} MiB  formatted {formatted} skipped {skipped}"
+                )
+            with open(legacy_out, encoding="utf-8") as a, open(stream_out, encoding="utf-8") as b:
+                legacy_lines, stream_lines = set(a.read().splitlines()), set(b.read().splitlines())
+            print(f"{size:>9} lines  {len(legacy_lines ^ stream_lines)} output lines differ")
+    finally:
+        for name in os.listdir(root):
+            os.remove(os.path.join(root, name))
+        os.rmdir(root)
+
+
+if __name__ == "__main__":
+    main()
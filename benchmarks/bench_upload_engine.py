@@ -0,0 +1,144 @@
+"""Throughput and lost parts uploading one file to a simulated Telegram DC.
+
+Each media connection carries at most --per-connection MB/s (one TCP
+stream's window) and all of them share a --bandwidth MB/s link; a part
+completes --rtt ms after its bytes went through both, and --fail-rate of
+part requests fail. Compared: pyrogram's save_file loop (one connection,
+four workers, failed parts only logged) and upload_engine.UploadEngine with
+one and with --connections connections.
+
+Usage:
+    python benchmarks/bench_upload_engine.py [--size 100] [--bandwidth 40] [--per-connection 6]
+        [--rtt 80] [--fail-rate 0.01] [--connections 4] [--max-parts 16]
+"""
+import argparse
+import asyncio
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+import types
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import upload_engine  # noqa: E402
+from upload_engine import PART_SIZE, UploadEngine  # noqa: E402
+
+
+class Link:
+    def __init__(self, bandwidth, rtt, fail_rate, rng):
+        self.bandwidth = bandwidth
+        self.rtt = rtt
+        self.fail_rate = fail_rate
+        self.rng = rng
+        self.free_at = 0.0
+        self.saved = set()
+
+
+class FakeSession:
+    def __init__(self, link, per_connection):
+        self.link = link
+        self.per_connection = per_connection
+        self.free_at = 0.0
+
+    async def invoke(self, rpc, timeout=None):
+        link = self.link
+        now = time.monotonic()
+        size = len(rpc.bytes)
+        self.free_at = max(now, self.free_at) + size / self.per_connection
+        link.free_at = max(now, link.free_at) + size / link.bandwidth
+        await asyncio.sleep(max(self.free_at, link.free_at) + link.rtt - now)
+        if link.rng.random() < link.fail_rate:
+            raise OSError("connection reset")
+        link.saved.add(rpc.file_part)
+        return True
+
+    async def stop(self):
+        pass
+
+
+async def legacy_save_file(session, path):
+    """pyrogram's save_file loop for big files"""
+    async def worker():
+        while True:
+            data = await queue.get()
+            if data is None:
+                return
+            try:
+                await session.invoke(data)
+            except Exception:
+                pass
+
+    size = os.path.getsize(path)
+    total_parts = math.ceil(size / PART_SIZE)
+    queue = asyncio.Queue(1)
+    workers = [asyncio.create_task(worker()) for _ in range(4)]
+    with open(path, "rb") as fp:
+        for part in range(total_parts):
+            await queue.put(upload_engine.raw.functions.upload.SaveBigFilePart(
+                file_id=1, file_part=part, file_total_parts=total_parts, bytes=fp.read(PART_SIZE)
+            ))
+    for _ in workers:
+        await queue.put(None)
+    await asyncio.gather(*workers)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", type=int, default=100, help="MB")
+    parser.add_argument("--bandwidth", type=float, default=40.0, help="MB/s of the whole link")
+    parser.add_argument("--per-connection", type=float, default=6.0, help="MB/s of one connection")
+    parser.add_argument("--rtt", type=float, default=80.0, help="milliseconds")
+    parser.add_argument("--fail-rate", type=float, default=0.01)
+    parser.add_argument("--connections", type=int, default=4)
+    parser.add_argument("--max-parts", type=int, default=16)
+    args = parser.parse_args()
+
+    mb = 1024 * 1024
+    client = types.SimpleNamespace(me=types.SimpleNamespace(is_premium=False), rnd_id=lambda: 1)
+
+    with tempfile.TemporaryDirectory(prefix="bench_upload_") as root:
+        path = os.path.join(root, "video.mp4")
+        with open(path, "wb") as f:
+            f.truncate(args.size * mb)
+        total_parts = math.ceil(args.size * mb / PART_SIZE)
+
+        def new_link():
+            return Link(args.bandwidth * mb, args.rtt / 1000, args.fail_rate, random.Random(5))
+
+        async def legacy():
+            link = new_link()
+            await legacy_save_file(FakeSession(link, args.per_connection * mb), path)
+            return link, None
+
+        def engine_run(connections):
+            async def run():
+                link = new_link()
+                engine = UploadEngine(connections, args.max_parts)
+
+                async def open_session(_client):
+                    return FakeSession(link, args.per_connection * mb)
+
+                engine._open_session = open_session
+                await engine.save_file(client, path)
+                return link, engine
+            return run
+
+        for label, run in (
+            ("pyrogram", legacy),
+            ("engine x1", engine_run(1)),
+            (f"engine x{args.connections}", engine_run(args.connections)),
+        ):
+            start = time.perf_counter()
+            link, engine = await run()
+            elapsed = time.perf_counter() - start
+            lost = total_parts - len(link.saved)
+            tuned = f"  parts in flight {int(engine.limit):>2}  retries {engine.retries}" if engine else ""
+            print(f"{label:<10} {elapsed:>6.2f} s  {args.size / elapsed:>6.2f} MB/s  "
+                  f"lost parts {lost:>3}/{total_parts}{tuned}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
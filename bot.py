@@ -1,7 +1,9 @@
 import asyncio
 import os
+import shutil
 import time
-from pyrogram import Client, filters
+import uuid
+from pyrogram import Client, filters, idle
 from pyrogram.types import (
     Message,
     InlineKeyboardMarkup,
@@ -9,9 +11,32 @@ from pyrogram.types import (
     ForceReply,
     CallbackQuery,
 )
-from config import API_ID, API_HASH, BOT_TOKEN, AUTH_USERS, ADMIN_ID, OWNER_ID
+from pyrogram.errors import (
+    FileIdInvalid,
+    FileReferenceEmpty,
+    FileReferenceExpired,
+    FileReferenceInvalid,
+    MediaEmpty,
+)
+from pyrogram.file_id import FileId
+from config import (
+    API_ID, API_HASH, BOT_TOKEN, AUTH_USERS, ADMIN_ID, OWNER_ID,
+    DOWNLOAD_WORKERS, POSTPROCESS_WORKERS, UPLOAD_WORKERS, PIPELINE_QUEUE_SIZE,
+    DEDUP_MODE, WORKERS,
+)
 from database import db
 from downloader import Downloader
+from pipeline import BatchPipeline
+from executor import execution_service
+from journal import journal
+from http_engine import http_engine
+from extraction_cache import extraction_cache
+from disk_ledger import disk_ledger
+from dedup import delivery_index
+from file_types import file_types, kind_for_extension
+from cover_store import cover_store
+from file_events import full_checksum
+from upload_engine import upload_engine
 import logging
 from pyrogram.enums import ParseMode
 import traceback
@@ -19,13 +44,14 @@ import threading
 import re
 from datetime import datetime
 import aiofiles
-from PIL import Image
 import logging.handlers
 import glob
 import json
-import subprocess
-from metadata_handler import ensure_video_metadata, format_duration
+from metadata_handler import (
+    ensure_video_metadata, fetch_remote_thumbnail, format_duration, generate_pdf_thumbnail, get_video_metadata,
+)
 from txt_filter import process_text_file
+from list_parser import ListEntry, parse_line, read_manifest
 from health import health_manager  # Import the health manager
 
 # Set up logger
@@ -42,6 +68,7 @@ app = Client(
     api_id=API_ID,
     api_hash=API_HASH,
     bot_token=BOT_TOKEN,
+    workers=WORKERS,
 )
 
 # User states
@@ -69,11 +96,34 @@ async def health_command(client: Client, message: Message):
         # /health with no arguments shows current settings
         if len(command_parts) == 1:
             status = "✅ ENABLED" if health_manager.is_enabled else "❌ DISABLED"
+            workers = execution_service.stats()
+            extractions = extraction_cache.stats()
+            disk = disk_ledger.stats()
+            uploads = upload_engine.stats()
             await message.reply_text(
                 f"⚙️ **Server Health Management**\n\n"
                 f"• Status: {status}\n"
                 f"• Cooldown: {health_manager.default_cooldown} seconds\n"
                 f"• Upload Limit: {health_manager.uploads_per_hour_limit} uploads/hour\n\n"
+                "**Workers:**\n"
+                f"• Jobs: {workers['running']}/{workers['max_workers']} running, {workers['queued']} queued\n"
+                f"• Media Tools: {workers['processes_running']}/{workers['max_processes']} running, "
+                f"{workers['processes_waiting']} waiting\n"
+                f"• Completed: {workers['completed']} jobs, {workers['failed']} failed\n"
+                f"• Threads: {workers['threads']}\n\n"
+                "**Extraction Cache:**\n"
+                f"• Entries: {extractions['entries']}/{extractions['max_entries']}\n"
+                f"• Hits: {extractions['hits']}, Misses: {extractions['misses']}, "
+                f"Invalidated: {extractions['invalidations']}\n\n"
+                "**Disk:**\n"
+                f"• Available: {format_size(max(0, disk['available']))}, "
+                f"Reserved: {format_size(disk['reserved'])} for {disk['active']} job(s)\n"
+                f"• Admitted: {disk['admitted']}, Queued: {disk['queued']}, Rejected: {disk['rejected']}\n\n"
+                "**Uploads:**\n"
+                f"• Connections: {uploads['connections']}/{uploads['max_connections']}, "
+                f"Parts in flight: {uploads['in_flight']}/{uploads['limit']} (max {uploads['max_parts']})\n"
+                f"• Files: {uploads['files']}, Part retries: {uploads['retries']}, "
+                f"Last: {uploads['last_mbps']:.2f} MB/s\n\n"
                 "**Available Commands:**\n"
                 "• `/health on` - Enable health management\n"
                 "• `/health off` - Disable health management\n"
@@ -161,7 +211,7 @@ if not os.path.exists("logs"):
     os.makedirs("logs")
 
 # Initialize bot
-app = Client("url_uploader_bot", api_id=API_ID, api_hash=API_HASH, bot_token=BOT_TOKEN)
+app = Client("url_uploader_bot", api_id=API_ID, api_hash=API_HASH, bot_token=BOT_TOKEN, workers=WORKERS)
 
 # Set up rotating file handler for logs
 log_file = "logs/bot.log"
@@ -195,9 +245,6 @@ USER_STATES = {}
 # Lock for updating progress messages
 update_locks = {}
 
-# Add these global variables after USER_STATES
-USER_THUMBNAILS = {}  # Store user thumbnails
-
 # Add this new command handler
 @app.on_message(filters.command("auth") & filters.private)
 async def auth_user(client: Client, message: Message):
@@ -445,21 +492,8 @@ def create_progress_bar(progress):
 
 # Function to determine if file is a video
 def is_video_file(file_path):
-    """Check if the file is a video based on its extension"""
-    video_extensions = [
-        ".mp4",
-        ".mkv",
-        ".avi",
-        ".mov",
-        ".wmv",
-        ".flv",
-        ".webm",
-        ".m4v",
-        ".3gp",
-        ".m3u8"  # Added support for HLS streaming
-    ]
-    ext = os.path.splitext(file_path)[1].lower()
-    return ext in video_extensions
+    """Check if the file is a video (or an HLS/DASH stream) based on its extension"""
+    return kind_for_extension(file_path) in ("video", "stream")
 
 
 # Helper function to format ETA
@@ -599,7 +633,8 @@ async def handle_messages(client: Client, message: Message):
         )
 
     elif state == "waiting_file_url":
-        if ":" not in message.text:
+        entry = parse_line(message.text)
+        if not entry:
             await message.reply_text(
                 "⚠️ Invalid format!\n\n"
                 "Please use the format:\n"
@@ -613,406 +648,12 @@ async def handle_messages(client: Client, message: Message):
             )
             return
 
-        filename, url = [x.strip() for x in message.text.split(":", 1)]
-        if not filename or not url:
-            await message.reply_text(
-                "⚠️ Invalid format!\n\n" "Please provide both filename and URL.",
-                reply_markup=ForceReply(selective=True),
-            )
-            return
-
-        # Check if it's an encrypted video URL
-        is_encrypted = "*" in url and any(
-            ext in url.lower()
-            for ext in [".mkv", ".mp4", ".avi", ".mov", ".wmv", ".flv", ".webm"]
-        )
-
-        # Store current download info in case user wants to cancel
-        USER_STATES[user_id]["current_task"] = {
-            "filename": filename,
-            "url": url,
-            "is_encrypted": is_encrypted,
-            "status_message": None,
-            "last_update_time": 0,
-            "progress": 0,
-            "downloaded_size": 0,
-            "total_size": 0,
-            "speed": 0,
-            "eta": 0
-        }
-
         # Set canceled flag to False for new download
         USER_STATES[user_id]["canceled"] = False
-        
-        # Create lock for this user if it doesn't exist
-        if user_id not in update_locks:
-            update_locks[user_id] = threading.Lock()
-
-        # Initial status message
-        status_message = await message.reply_text(
-            f"{'🔐 Dᴇᴄʀʏᴘᴛɪɴɢ & ' if is_encrypted else ''}Dᴏᴡɴʟᴏᴀᴅ Sᴛᴀʀᴛᴇᴅ....\n\n"
-            f"{create_progress_bar(0)}\n\n"
-            "╭━━━━❰ᴘʀᴏɢʀᴇss ʙᴀʀ❱━➣\n"
-            "┣⪼ 🗃️ Sɪᴢᴇ: Waiting... \n"
-            "┣⪼ ⏳️ Dᴏɴᴇ : 0%\n"
-            "┣⪼ 🚀 Sᴩᴇᴇᴅ: Calculating...\n"
-            "┣⪼ ⏰️ Eᴛᴀ: Calculating...\n"
-            "╰━━━━━━━━━━━━━━━➣",
-            reply_markup=InlineKeyboardMarkup(
-                [[InlineKeyboardButton("❌ Cancel", callback_data="cancel_download")]]
-            ),
-        )
-
-        # Save status message for potential cancellation and updates
-        USER_STATES[user_id]["current_task"]["status_message"] = status_message
-        USER_STATES[user_id]["current_task"]["message_id"] = status_message.id
-        USER_STATES[user_id]["current_task"]["chat_id"] = status_message.chat.id
-        
-        # Progress callback - updates the status message
-        async def progress_callback(
-            progress, speed, total_size, downloaded_size, eta, filename=""
-        ):
-            try:
-                # Check if user has canceled
-                if user_id not in USER_STATES or USER_STATES[user_id].get(
-                    "canceled", False
-                ):
-                    return
-
-                # Get current task info
-                current_task = USER_STATES[user_id].get("current_task", {})
-                current_message = current_task.get("status_message")
-
-                # If no message to update, exit
-                if not current_message:
-                    logger.warning(f"No status message found for user {user_id}")
-                    return
-                
-                # Use lock to prevent multiple concurrent updates
-                with update_locks[user_id]:
-                    # Only update if enough time has passed since last update (rate limiting)
-                    now = time.time()
-                    last_update = current_task.get("last_update_time", 0)
-                    if now - last_update < 0.5:  # 0.5 seconds minimum between updates
-                        return
-                
-                    # Update progress info
-                    current_task.update({
-                        "progress": progress,
-                        "downloaded_size": downloaded_size,
-                        "total_size": total_size,
-                        "speed": speed,
-                        "eta": eta
-                    })
-                
-                    # Create progress text
-                    progress_bar = create_progress_bar(progress)
-                    status_text = (
-                        f"{'🔐 Dᴇᴄʀʏᴘᴛɪɴɢ & ' if is_encrypted else ''}Dᴏᴡɴʟᴏᴀᴅɪɴɢ....\n\n"
-                        f"{progress_bar}\n\n"
-                        "╭━━━━❰ᴘʀᴏɢʀᴇss ʙᴀʀ❱━➣\n"
-                        f"┣⪼ 🗃️ Sɪᴢᴇ: {format_size(downloaded_size)} / {format_size(total_size)}\n"
-                        f"┣⪼ ⏳️ Dᴏɴᴇ : {progress:.1f}%\n"
-                        f"┣⪼ 🚀 Sᴩᴇᴇᴅ: {format_size(speed)}/s\n"
-                        f"┣⪼ ⏰️ Eᴛᴀ: {format_eta(eta)}\n"
-                        "╰━━━━━━━━━━━━━━━➣"
-                    )
-    
-                    # Update the message with new progress
-                    try:
-                        await current_message.edit_text(
-                            status_text,
-                            reply_markup=InlineKeyboardMarkup(
-                                [
-                                    [
-                                        InlineKeyboardButton(
-                                            "❌ Cancel", callback_data="cancel_download"
-                                        )
-                                    ]
-                                ]
-                            ),
-                        )
-                        # Log successful update
-                        logger.info(f"Updated progress for user {user_id}: {progress:.1f}%")
-                        # Store the last update time
-                        current_task["last_update_time"] = now
-                    except Exception as e:
-                        logger.error(f"Failed to update progress message: {e}")
-
-            except Exception as e:
-                # Log the full exception with traceback
-                logger.error(f"Progress callback error: {e}")
-                logger.error(traceback.format_exc())
-
-        try:
-            # Create and start downloader
-            downloader = Downloader(url, filename, progress_callback)
-            success, result, video_info = await downloader.download()
-
-            # Check if user has canceled during download
-            if user_id not in USER_STATES or USER_STATES[user_id].get(
-                "canceled", False
-            ):
-                if result and os.path.exists(result):
-                    os.remove(result)
-                if (
-                    video_info
-                    and video_info.thumbnail
-                    and os.path.exists(video_info.thumbnail)
-                ):
-                    os.remove(video_info.thumbnail)
-                return
-
-            if not success:
-                await status_message.edit_text(
-                    f"❌ Download failed!\n\n"
-                    f"Error: {result}\n\n"
-                    f"Please try again or contact support if the problem persists.",
-                    reply_markup=InlineKeyboardMarkup(
-                        [
-                            [
-                                InlineKeyboardButton(
-                                    "🔄 Try Again", callback_data="continue"
-                                )
-                            ]
-                        ]
-                    ),
-                )
-                return
-
-            await status_message.edit_text(
-                "📤 Uploading to Telegram...\n\n"
-                "Please wait while we upload your file."
-            )
-
-            # Different caption formats for different file types
-            caption = (
-                "➖➖➖➖➖➖➖➖➖➖\n"
-                "📂 **File Details**\n"
-                "➖➖➖➖➖➖➖➖➖➖\n"
-                f"📝 **File Name:** `{filename}`\n"
-                f"👤 **Downloaded By:** {USER_STATES[user_id]['username']}\n"
-                f"🎯 **Batch:** `{USER_STATES[user_id]['batch_name']}`\n"
-                f"⚡ **Status:** ✅ __Successfully Processed__\n"
-                "\n"
-                "🔗 __Stay Connected:__ [@MrGadhvii](https://t.me/MrGadhvii)\n"
-                "➖➖➖➖➖➖➖➖➖➖"
-            )
-
-            # Last upload update time
-            last_upload_update_time = time.time()
-            update_interval = 1  # seconds between updates
-
-            # Upload progress callback
-            last_upload_update_time = time.time()
-            update_interval = 1  # seconds
-            
-            async def upload_progress(current, total):
-                nonlocal last_upload_update_time
-                
-                current_time = time.time()
-                if (current_time - last_upload_update_time) < update_interval:
-                    return
-                
-                last_upload_update_time = current_time
-                
-                try:
-                    # Check if user has canceled
-                    if user_id not in USER_STATES or USER_STATES[user_id].get("canceled", False):
-                        return
-
-                    progress = (current / total) * 100
-                    progress_bar = create_progress_bar(progress)
-                    status_text = (
-                        "📤 Uᴘʟᴏᴀᴅɪɴɢ....\n\n"
-                        f"{progress_bar}\n\n"
-                        "╭━━━━❰ᴘʀᴏɢʀᴇss ʙᴀʀ❱━➣\n"
-                        f"┣⪼ 🗃️ Sɪᴢᴇ: {format_size(current)} / {format_size(total)}\n"
-                        f"┣⪼ ⏳️ Dᴏɴᴇ : {progress:.1f}%\n"
-                        "╰━━━━━━━━━━━━━━━➣"
-                    )
-                    await status_message.edit_text(status_text)
-                    
-                    # Minimal terminal log
-                    if current_time - last_upload_update_time >= 3.0:  # Log every 3 seconds
-                        logger.info(f"⬆️ {progress:.1f}%")
-                    
-                except Exception as e:
-                    pass  # Suppress upload progress errors
-
-            # Get custom thumbnail if exists, otherwise use video thumbnail
-            thumbnail_path = USER_THUMBNAILS.get(user_id)
-            if not thumbnail_path and video_info and video_info.thumbnail:
-                thumbnail_path = video_info.thumbnail
-
-            # Send as video if it's a video file, otherwise as document
-            if is_video_file(result):
-                try:
-                    # Process video metadata
-                    logger.info("Processing video metadata...")
-                    metadata = await ensure_video_metadata(result)
-                    
-                    if not metadata:
-                        raise ValueError("Failed to process video metadata")
-                    
-                    # Get custom thumbnail if exists, otherwise use generated one
-                    thumbnail_path = USER_THUMBNAILS.get(user_id) or metadata['thumbnail']
-                    
-                    # Enhanced caption with duration
-                    caption = (
-                        "➖➖➖➖➖➖➖➖➖➖\n"
-                        "📂 **Video Details**\n"
-                        "➖➖➖➖➖➖➖➖➖➖\n"
-                        f"📝 **File Name:** `{filename}`\n"
-                        f"⏱️ **Duration:** `{metadata['duration_text']}`\n"
-                        f"📊 **Quality:** `{metadata['height']}p`\n"
-                        f"👤 **Downloaded By:** {USER_STATES[user_id]['username']}\n"
-                        f"🎯 **Batch:** `{USER_STATES[user_id]['batch_name']}`\n"
-                        f"⚡ **Status:** ✅ __Successfully Processed__\n"
-                        "\n"
-                        "🔗 __Stay Connected:__ [@MrGadhvii](https://t.me/MrGadhvii)\n"
-                        "➖➖➖➖➖➖➖➖➖➖"
-                    )
-                    
-                    try:
-                        # First attempt with all parameters
-                        logger.info("Attempting to send video with full parameters...")
-                        await message.reply_video(
-                            video=result,
-                            caption=caption,
-                            parse_mode=ParseMode.MARKDOWN,
-                            duration=metadata['duration'],
-                            width=metadata['width'],
-                            height=metadata['height'],
-                            thumb=thumbnail_path,
-                            supports_streaming=True,
-                            progress=upload_progress
-                        )
-                        logger.info(f"Video sent successfully: {filename}")
-                    except Exception as e:
-                        logger.error(f"First attempt failed: {str(e)}")
-                        try:
-                            # Second attempt with minimal parameters
-                            logger.info("Attempting to send video with minimal parameters...")
-                            await message.reply_video(
-                                video=result,
-                                caption=caption,
-                                parse_mode=ParseMode.MARKDOWN,
-                                duration=metadata['duration'],
-                                thumb=thumbnail_path,
-                                supports_streaming=True
-                            )
-                            logger.info(f"Video sent successfully with minimal parameters: {filename}")
-                        except Exception as e:
-                            logger.error(f"Second attempt failed: {str(e)}")
-                            try:
-                                # Final attempt with bare minimum
-                                logger.info("Final attempt with bare minimum parameters...")
-                                await message.reply_video(
-                                    video=result,
-                                    caption=caption,
-                                    supports_streaming=True
-                                )
-                                logger.info(f"Video sent with bare minimum parameters: {filename}")
-                            except Exception as e:
-                                logger.error(f"All attempts failed: {str(e)}")
-                                raise e
-                except Exception as e:
-                    logger.error(f"Error processing video: {e}")
-                    logger.error(traceback.format_exc())
-                    raise e
-            else:
-                logger.info(f"Sending document: {filename}")
-                
-                # Get custom thumbnail for PDFs
-                thumbnail_path = None
-                if filename.lower().endswith('.pdf'):
-                    thumbnail_path = USER_THUMBNAILS.get(user_id)
-                    if thumbnail_path:
-                        logger.info(f"Using custom thumbnail for PDF: {thumbnail_path}")
-                
-                # FORCE PDF EXTENSION FOR PDF FILES - Final check before sending
-                if ('pdf' in url.lower() or '.pdf*' in url.lower()):
-                    if not filename.lower().endswith('.pdf'):
-                        old_filename = filename
-                        filename = f"{os.path.splitext(filename)[0]}.pdf"
-                        logger.info(f"FORCED PDF extension before sending: {old_filename} -> {filename}")
-                
-                try:
-                    # Simplified caption for PDFs
-                    if filename.lower().endswith('.pdf'):
-                        caption = (
-                            f"📝 **{filename}**\n"
-                            f"👤 **By:** {USER_STATES[user_id]['username']}\n"
-                            f"🎯 **Batch:** `{USER_STATES[user_id]['batch_name']}`\n"
-                            "🔗 [@MrGadhvii](https://t.me/MrGadhvii)"
-                        )
-                    else:
-                        caption = (
-                            f"📝 **{filename}**\n"
-                            f"👤 **By:** {USER_STATES[user_id]['username']}\n"
-                            f"🎯 **Batch:** `{USER_STATES[user_id]['batch_name']}`"
-                        )
-                    
-                    await message.reply_document(
-                        document=result,
-                        caption=caption,
-                        parse_mode=ParseMode.MARKDOWN,
-                        thumb=thumbnail_path,
-                        progress=upload_progress,
-                        file_name=filename
-                    )
-                    logger.info(f"Document sent successfully: {filename}")
-                    
-                    # Clean up files after successful upload
-                    clean_all_files()
-                    
-                except Exception as e:
-                    logger.error(f"Error sending document: {e}")
-                    try:
-                        # If sending fails, try once more with explicit PDF extension
-                        if ('pdf' in url.lower() or '.pdf*' in url.lower()) and not filename.lower().endswith('.pdf'):
-                            filename = f"{filename}.pdf"
-                            logger.info(f"Emergency PDF fix - Adding extension: {filename}")
-                        
-                        await message.reply_document(
-                            document=result,
-                            caption=caption,
-                            parse_mode=ParseMode.MARKDOWN,
-                            thumb=thumbnail_path,
-                            progress=upload_progress,
-                            file_name=filename
-                        )
-                        logger.info(f"Document sent successfully on retry: {filename}")
-                        
-                        # Clean up files after successful upload
-                        clean_all_files()
-                        
-                    except Exception as e:
-                        logger.error(f"Error sending document on retry: {e}")
-                        raise e
-
-            # Clean up files
-            if os.path.exists(result):
-                os.remove(result)
-                logger.info(f"Removed downloaded file: {result}")
-            if thumbnail_path and os.path.exists(thumbnail_path) and thumbnail_path != USER_THUMBNAILS.get(user_id):
-                # Only remove auto-generated thumbnails, not user's custom thumbnail
-                os.remove(thumbnail_path)
-                logger.info(f"Removed thumbnail: {thumbnail_path}")
-
-            # Clean any JSON files
-            clean_downloads_dir()
-            
-            # Clean logs after successful upload
-            clean_logs()
-
-            # Delete status message
-            try:
-                await status_message.delete()
-            except Exception as e:
-                logger.error(f"Failed to delete status message: {e}")
 
+        # Single URLs take the batch path: the same dedup lookup, journal and
+        # delivery record
+        if await process_url_line(client, message, message.text, user_id):
             await message.reply_text(
                 "✅ File uploaded successfully!\n\n"
                 "Would you like to download another file?",
@@ -1025,13 +666,11 @@ async def handle_messages(client: Client, message: Message):
                     ]
                 ),
             )
-        except Exception as e:
-            logger.error(f"Download/upload error: {e}")
-            logger.error(traceback.format_exc())
-            await status_message.edit_text(
-                f"❌ An error occurred!\n\n"
-                f"Error: {str(e)}\n\n"
-                f"Please try again or contact support if the problem persists.",
+        elif user_id in USER_STATES and not USER_STATES[user_id].get("canceled", False):
+            await message.reply_text(
+                "❌ The file could not be processed.\n\n"
+                "Only videos and PDFs are supported. Please try again or contact "
+                "support if the problem persists.",
                 reply_markup=InlineKeyboardMarkup(
                     [[InlineKeyboardButton("🔄 Try Again", callback_data="continue")]]
                 ),
@@ -1176,396 +815,599 @@ def clean_downloads_dir():
         logger.error(f"Error cleaning downloads directory: {e}")
 
 
-def parse_line(line):
-    """Parse a line to extract filename and URL regardless of format"""
-    try:
-        # Handle format like "TEST:https://..."
-        if ':http' in line:
-            parts = line.split(':http', 1)
-            if len(parts) == 2:
-                filename = parts[0].strip()
-                url = 'http' + parts[1].strip()
-                logger.info(f"Parsed line - Filename: {filename}, URL: {url}")
-                
-                # Handle encrypted PDF URLs (pdf*key format)
-                if '.pdf*' in url.lower():
-                    logger.info("Encrypted PDF URL detected")
-                    if not filename.lower().endswith('.pdf'):
-                        filename = f"{filename}.pdf"
-                        logger.info(f"Added .pdf extension for encrypted PDF: {filename}")
-                # Regular PDF handling
-                elif url.lower().endswith('.pdf'):
-                    if not filename.lower().endswith('.pdf'):
-                        filename = f"{filename}.pdf"
-                        logger.info(f"Added .pdf extension for PDF: {filename}")
-                
-                return filename, url
+def make_job_dir(name):
+    """Create the download directory for one batch item"""
+    job_dir = os.path.join("downloads", f"job_{name}")
+    os.makedirs(job_dir, exist_ok=True)
+    return job_dir
+
+
+def open_job(message: Message, entry: ListEntry, url: str, filename: str, user_id: int):
+    """Journal a download and create its directory, returns (job_id, job_dir).
+
+    The job directory is derived from the line so a retry or a restart
+    finds the partial download; duplicate lines running now get their own,
+    unjournaled one and job_id None.
+    """
+    job_id = journal.job_id_for(message.chat.id, url, filename)
+    if journal.claim(job_id):
+        job_dir = make_job_dir(job_id)
+        journal.start(
+            job_id,
+            url=url,
+            line=entry.line,
+            filename=filename,
+            chat_id=message.chat.id,
+            message_id=message.id,
+            user_id=user_id,
+            username=USER_STATES.get(user_id, {}).get("username"),
+            batch_name=USER_STATES.get(user_id, {}).get("batch_name"),
+            job_dir=job_dir,
+        )
+        return job_id, job_dir
+    return None, make_job_dir(uuid.uuid4().hex[:16])
+
+
+def clean_job(job):
+    """Remove every file a batch item left on disk"""
+    if not job:
+        return
+    if job.get("thumbnail_task"):
+        job["thumbnail_task"].cancel()
+    if job.get("job_id"):
+        journal.finish(job["job_id"])
+    job_dir = job.get("job_dir")
+    if job_dir and os.path.isdir(job_dir):
+        shutil.rmtree(job_dir, ignore_errors=True)
+        logger.info(f"Removed job directory: {job_dir}")
+    if job.get("reservation"):
+        job["reservation"].release()
+
+
+async def download_url_line(
+    client: Client, message: Message, entry: ListEntry, user_id: int, resend: bool = True, order=None
+):
+    """Download stage: fetch a parsed list entry into a job directory.
+    order is the entry's (batch, position), disk space is admitted in list order."""
+    filename, url = entry.name, entry.download_url
+    
+    # Links without a telling extension are typed by the server first
+    if entry.kind == "unknown":
+        file_type = await file_types.classify(entry.url, entry.is_encrypted)
+        entry.kind = file_type.kind
+        if entry.is_supported and file_type.extension and not filename.lower().endswith(file_type.extension):
+            filename = f"{filename}{file_type.extension}"
+    
+    # Only videos and PDFs (including encrypted ones) are downloaded
+    if not entry.is_supported:
+        logger.info(f"Skipping {entry.kind} entry: {url}")
+        return None
+    
+    # URLs delivered before are re-sent by the upload stage, not downloaded
+    if resend and DEDUP_MODE != "off":
+        delivered = await delivery_index.lookup(url)
+        if delivered:
+            logger.info(f"Already delivered: {filename} (message {delivered['message_id']})")
+            return {
+                "filename": filename,
+                "url": url,
+                "user_id": user_id,
+                "entry": entry,
+                "order": order,
+                "delivered": delivered,
+            }
+
+    # Per-item task state, batch items download concurrently
+    task = {
+        "filename": filename,
+        "url": url,
+        "user_id": user_id,
+        "is_encrypted": entry.is_encrypted,
+        "status_message": None,
+        "last_update_time": 0,
+        "progress": 0,
+        "downloaded_size": 0,
+        "total_size": 0,
+        "speed": 0,
+        "eta": 0
+    }
+    
+    # Send initial status message with encryption indicator
+    status_message = await message.reply_text(
+        f"{'🔐 Dᴇᴄʀʏᴘᴛɪɴɢ & ' if '*' in url else ''}Dᴏᴡɴʟᴏᴀᴅ Sᴛᴀʀᴛᴇᴅ....\n\n"
+        f"{create_progress_bar(0)}\n\n"
+        "╭━━━━❰ᴘʀᴏɢʀᴇss ʙᴀʀ❱━➣\n"
+        "┣⪼ 🗃️ Sɪᴢᴇ: Waiting... \n"
+        "┣⪼ ⏳️ Dᴏɴᴇ : 0%\n"
+        "┣⪼ 🚀 Sᴩᴇᴇᴅ: Calculating...\n"
+        "┣⪼ ⏰️ Eᴛᴀ: Calculating...\n"
+        "╰━━━━━━━━━━━━━━━➣",
+        reply_markup=InlineKeyboardMarkup(
+            [[InlineKeyboardButton("❌ Cancel", callback_data="cancel_download")]]
+        )
+    )
+    
+    task["status_message"] = status_message
+    
+    # Progress callback
+    async def progress_callback(progress, speed, total_size, downloaded_size, eta, filename=""):
+        try:
+            if user_id not in USER_STATES or USER_STATES[user_id].get("canceled", False):
+                return
                 
-        # Find the first occurrence of http:// or https://
-        url_start = line.find('http://')
-        if url_start == -1:
-            url_start = line.find('https://')
-        
-        if url_start == -1:
-            logger.warning(f"No URL found in line: {line}")
-            return None, None
+            # Update progress info
+            task.update({
+                "progress": progress,
+                "downloaded_size": downloaded_size,
+                "total_size": total_size,
+                "speed": speed,
+                "eta": eta
+            })
+            
+            # Only update message if enough time has passed
+            now = time.time()
+            last_update = task.get("last_update_time", 0)
+            if now - last_update < 0.5:
+                return
             
-        # Everything before the URL is the filename, everything after is the URL
-        filename = line[:url_start].strip()
-        url = line[url_start:].strip()
-        
-        # Clean up filename (remove trailing colons and spaces)
-        filename = filename.rstrip(':').strip()
-        
-        # If filename is empty, use a default name
-        if not filename:
-            filename = "File_" + datetime.now().strftime("%Y%m%d_%H%M%S")
-        
-        # Handle encrypted PDF URLs
-        if '.pdf*' in url.lower():
-            logger.info("Encrypted PDF URL detected")
-            if not filename.lower().endswith('.pdf'):
-                filename = f"{filename}.pdf"
-                logger.info(f"Added .pdf extension for encrypted PDF: {filename}")
-        # Regular PDF handling
-        elif url.lower().endswith('.pdf'):
-            if not filename.lower().endswith('.pdf'):
-                filename = f"{filename}.pdf"
-                logger.info(f"Added .pdf extension for PDF: {filename}")
+            progress_bar = create_progress_bar(progress)
+            status_text = (
+                f"{'🔐 Dᴇᴄʀʏᴘᴛɪɴɢ & ' if '*' in url else ''}Dᴏᴡɴʟᴏᴀᴅɪɴɢ....\n\n"
+                f"{progress_bar}\n\n"
+                "╭━━━━❰ᴘʀᴏɢʀᴇss ʙᴀʀ❱━➣\n"
+                f"┣⪼ 🗃️ Sɪᴢᴇ: {format_size(downloaded_size)} / {format_size(total_size)}\n"
+                f"┣⪼ ⏳️ Dᴏɴᴇ : {progress:.1f}%\n"
+                f"┣⪼ 🚀 Sᴩᴇᴇᴅ: {format_size(speed)}/s\n"
+                f"┣⪼ ⏰️ Eᴛᴀ: {format_eta(eta)}\n"
+                "╰━━━━━━━━━━━━━━━➣"
+            )
             
-        logger.info(f"Parsed line - Filename: {filename}, URL: {url}")
-        return filename, url
+            try:
+                await status_message.edit_text(
+                    status_text,
+                    reply_markup=InlineKeyboardMarkup(
+                        [[InlineKeyboardButton("❌ Cancel", callback_data="cancel_download")]]
+                    )
+                )
+                task["last_update_time"] = now
+                logger.info(f"Progress update: {progress:.1f}% at {format_size(speed)}/s")
+            except Exception as e:
+                logger.error(f"Failed to update progress message: {e}")
+                
+        except Exception as e:
+            logger.error(f"Progress callback error: {e}")
+            logger.error(traceback.format_exc())
+    
+    job_id, job_dir = open_job(message, entry, url, filename, user_id)
+    
+    # Create and start downloader with proper handling for encrypted files
+    downloader = Downloader(
+        url, filename, progress_callback, download_path=job_dir, job_id=job_id, disk_order=order
+    )
+    success, result, video_info = await downloader.download()
+    
+    if not success:
+        if job_id and downloader.interrupted:
+            # Keep the partial files, the next attempt resumes from them
+            journal.release(job_id)
+        else:
+            clean_job({"job_id": job_id, "job_dir": job_dir})
+        await status_message.edit_text(f"❌ Download failed!\n\nError: {result}")
+        return None
+    
+    task.update({
+        "job_id": job_id,
+        "job_dir": job_dir,
+        "path": result,
+        "video_info": video_info,
+        "metadata": None,
+        "reservation": downloader.reservation,
+        "checksum": downloader.finalized.checksum if downloader.finalized else None,
+    })
+    return task
+
+
+async def postprocess_download(task: dict):
+    """Post-process stage: probe video metadata and build the thumbnail"""
+    if task.get("delivered"):
+        return task
+    
+    # Videos get a local frame and a user thumbnail always wins. PDFs get their
+    # first page, other documents the remote thumbnail if there is one. It runs
+    # next to the rest of post-processing and upload awaits it.
+    video_info = task.get("video_info")
+    user_thumbnail = cover_store.get(task.get("user_id"))
+    if task["path"].lower().endswith(".pdf") and not user_thumbnail:
+        task["thumbnail_task"] = asyncio.create_task(
+            generate_pdf_thumbnail(task["path"], f"{task['path']}_thumb.jpg")
+        )
+    elif (
+        video_info
+        and video_info.thumbnail_url
+        and not is_video_file(task["path"])
+        and not user_thumbnail
+    ):
+        task["thumbnail_task"] = asyncio.create_task(
+            fetch_remote_thumbnail(video_info.thumbnail_url, f"{task['path']}_thumb.jpg")
+        )
+    
+    if is_video_file(task["path"]):
+        logger.info("Processing video metadata...")
+        task["metadata"] = await ensure_video_metadata(task["path"])
+        
+        if not task["metadata"]:
+            await task["status_message"].edit_text(
+                "❌ Upload failed!\n\nError: Failed to process video metadata"
+            )
+            return None
+    return task
+
+
+# Errors Telegram answers a stored file_id with once it can no longer be sent
+STALE_FILE_ID_ERRORS = (
+    FileIdInvalid,
+    FileReferenceEmpty,
+    FileReferenceExpired,
+    FileReferenceInvalid,
+    MediaEmpty,
+)
+
+
+def video_caption(filename: str, metadata: dict, user_id: int):
+    return (
+        "➖➖➖➖➖➖➖➖➖➖\n"
+        "📂 **Video Details**\n"
+        "➖➖➖➖➖➖➖➖➖➖\n"
+        f"📝 **File Name:** `{filename}`\n"
+        f"⏱️ **Duration:** `{metadata['duration_text']}`\n"
+        f"📊 **Quality:** `{metadata['height']}p`\n"
+        f"👤 **Downloaded By:** {USER_STATES[user_id]['username']}\n"
+        f"🎯 **Batch:** `{USER_STATES[user_id]['batch_name']}`\n"
+        f"⚡ **Status:** ✅ __Successfully Processed__\n"
+        "\n"
+        "🔗 __Stay Connected:__ [@MrGadhvii](https://t.me/MrGadhvii)\n"
+        "➖➖➖➖➖➖➖➖➖➖"
+    )
+
+
+def document_caption(filename: str, user_id: int):
+    return (
+        f"📝 **{filename}**\n"
+        f"👤 **By:** {USER_STATES[user_id]['username']}\n"
+        f"🎯 **Batch:** `{USER_STATES[user_id]['batch_name']}`\n"
+        "🔗 [@MrGadhvii](https://t.me/MrGadhvii)"
+    )
+
+
+def sent_media(sent: Message):
+    """file_id and metadata of an uploaded video or document, enough to send it again"""
+    media = sent.video or sent.document if sent else None
+    if not media:
+        return None
+    return {
+        "type": "video" if sent.video else "document",
+        "file_id": media.file_id,
+        "file_unique_id": media.file_unique_id,
+        "duration": getattr(media, "duration", None),
+        "width": getattr(media, "width", None),
+        "height": getattr(media, "height", None),
+        "thumb": media.thumbs[0].file_id if media.thumbs else None,
+    }
+
+
+async def send_by_file_id(message: Message, media: dict, filename: str, user_id: int):
+    """Send stored media by its file_id, without downloading or uploading.
+    Returns the sent message, or None if the file_id failed; a stale one is
+    dropped from the delivery index."""
+    # pyrogram reports an undecodable file_id as a plain ValueError, so it is
+    # checked up front rather than catching every ValueError of the send
+    try:
+        FileId.decode(media["file_id"])
+    except Exception as e:
+        logger.warning(f"Stored file_id for {filename} cannot be decoded: {e}")
+        await delivery_index.drop_media(media["file_id"])
+        return None
+    
+    try:
+        if media["type"] == "video":
+            metadata = {
+                "duration_text": format_duration(media.get("duration") or 0),
+                "height": media.get("height") or 0,
+            }
+            sent = await message.reply_video(
+                video=media["file_id"],
+                caption=video_caption(filename, metadata, user_id),
+                parse_mode=ParseMode.MARKDOWN,
+                duration=media.get("duration") or 0,
+                width=media.get("width") or 0,
+                height=media.get("height") or 0,
+                supports_streaming=True
+            )
+        else:
+            sent = await message.reply_document(
+                document=media["file_id"],
+                caption=document_caption(filename, user_id),
+                parse_mode=ParseMode.MARKDOWN,
+                file_name=filename
+            )
+        logger.info(f"Sent {filename} by file_id")
+        return sent
+    except STALE_FILE_ID_ERRORS as e:
+        logger.warning(f"Stored file_id for {filename} was rejected: {e}")
+        await delivery_index.drop_media(media["file_id"])
     except Exception as e:
-        logger.error(f"Error parsing line: {e}")
-        return None, None
+        logger.warning(f"Could not send {filename} by file_id: {e}")
+    return None
 
 
-async def process_url_line(client: Client, message: Message, line: str, user_id: int):
+async def content_hash_of(path: str, filename: str):
+    """Whole-file hash of a download, None if it failed"""
     try:
-        if not line.strip():
-            return False
-        
-        filename, url = parse_line(line)
-        if not filename or not url:
-            logger.info(f"Invalid line format: {line}")
-            return False
-        
-        # Skip zip files
-        if url.lower().endswith('.zip'):
-            logger.info(f"Skipping zip file: {url}")
-            return False
-            
-        # Skip YouTube URLs
-        if "youtube.com" in url.lower() or "youtu.be" in url.lower():
-            logger.info(f"Skipping YouTube URL: {url}")
-            return False
-            
-        # Check for video files and PDFs (including encrypted ones)
-        base_url = url.split('*')[0].lower()  # Get URL without encryption key
-        is_video = any(base_url.endswith(ext) for ext in ['.mkv', '.mp4', '.avi', '.mov', '.wmv', '.flv', '.webm'])
-        is_pdf = base_url.endswith('.pdf') or ('pdf' in base_url and '*' in url)  # Handle both normal and encrypted PDFs
-        
-        if not (is_video or is_pdf):
-            logger.info(f"Skipping unsupported file type: {url}")
-            return False
+        return await execution_service.run(full_checksum, path)
+    except Exception as e:
+        logger.warning(f"Could not hash {filename}: {e}")
+        return None
 
-        # Store current download info
-        USER_STATES[user_id]["current_task"] = {
-            "filename": filename,
-            "url": url,
-            "is_encrypted": '*' in url,
-            "status_message": None,
-            "last_update_time": 0,
-            "progress": 0,
-            "downloaded_size": 0,
-            "total_size": 0,
-            "speed": 0,
-            "eta": 0
-        }
-        
-        # Send initial status message with encryption indicator
-        status_message = await message.reply_text(
-            f"{'🔐 Dᴇᴄʀʏᴘᴛɪɴɢ & ' if '*' in url else ''}Dᴏᴡɴʟᴏᴀᴅ Sᴛᴀʀᴛᴇᴅ....\n\n"
-            f"{create_progress_bar(0)}\n\n"
-            "╭━━━━❰ᴘʀᴏɢʀᴇss ʙᴀʀ❱━➣\n"
-            "┣⪼ 🗃️ Sɪᴢᴇ: Waiting... \n"
-            "┣⪼ ⏳️ Dᴏɴᴇ : 0%\n"
-            "┣⪼ 🚀 Sᴩᴇᴇᴅ: Calculating...\n"
-            "┣⪼ ⏰️ Eᴛᴀ: Calculating...\n"
-            "╰━━━━━━━━━━━━━━━➣",
-            reply_markup=InlineKeyboardMarkup(
-                [[InlineKeyboardButton("❌ Cancel", callback_data="cancel_download")]]
+
+async def upload_download(client: Client, message: Message, task: dict, user_id: int):
+    """Upload stage: send the processed file to the chat. The job's files are
+    removed by whoever started the download, once this returns."""
+    filename = task["filename"]
+    url = task["url"]
+    result = task["path"]
+    status_message = task["status_message"]
+    checksum = task.get("checksum")
+    content_hash = None
+    
+    # The same content delivered before under another URL is sent by file_id.
+    # The whole file is only hashed when a delivery shares the sampled
+    # checksum; the hash is stored with the upload, so the next copy matches.
+    if checksum and DEDUP_MODE != "off" and await delivery_index.may_have_content(checksum):
+        content_hash = await content_hash_of(result, filename)
+        known = content_hash and await delivery_index.lookup_content(content_hash)
+        sent = known and await send_by_file_id(message, known["media"], filename, user_id)
+        if sent:
+            await delivery_index.record(
+                url, filename, os.path.getsize(result), sent.chat.id, sent.id, user_id,
+                checksum=checksum, media=sent_media(sent), content_hash=content_hash
             )
-        )
-        
-        USER_STATES[user_id]["current_task"]["status_message"] = status_message
-        
-        # Progress callback
-        async def progress_callback(progress, speed, total_size, downloaded_size, eta, filename=""):
             try:
-                if user_id not in USER_STATES or USER_STATES[user_id].get("canceled", False):
-                    return
-                
-                current_task = USER_STATES[user_id].get("current_task", {})
-                if not current_task:
-                    return
-                    
-                # Update progress info
-                current_task.update({
-                    "progress": progress,
-                    "downloaded_size": downloaded_size,
-                    "total_size": total_size,
-                    "speed": speed,
-                    "eta": eta
-                })
-                
-                # Only update message if enough time has passed
-                now = time.time()
-                last_update = current_task.get("last_update_time", 0)
-                if now - last_update < 0.5:
-                    return
-                
-                current_message = current_task.get("status_message")
-                if not current_message:
-                    return
-                
-                progress_bar = create_progress_bar(progress)
-                status_text = (
-                    f"{'🔐 Dᴇᴄʀʏᴘᴛɪɴɢ & ' if '*' in url else ''}Dᴏᴡɴʟᴏᴀᴅɪɴɢ....\n\n"
-                    f"{progress_bar}\n\n"
-                    "╭━━━━❰ᴘʀᴏɢʀᴇss ʙᴀʀ❱━➣\n"
-                    f"┣⪼ 🗃️ Sɪᴢᴇ: {format_size(downloaded_size)} / {format_size(total_size)}\n"
-                    f"┣⪼ ⏳️ Dᴏɴᴇ : {progress:.1f}%\n"
-                    f"┣⪼ 🚀 Sᴩᴇᴇᴅ: {format_size(speed)}/s\n"
-                    f"┣⪼ ⏰️ Eᴛᴀ: {format_eta(eta)}\n"
-                    "╰━━━━━━━━━━━━━━━➣"
-                )
-                
-                try:
-                    await current_message.edit_text(
-                        status_text,
-                        reply_markup=InlineKeyboardMarkup(
-                            [[InlineKeyboardButton("❌ Cancel", callback_data="cancel_download")]]
-                        )
-                    )
-                    current_task["last_update_time"] = now
-                    logger.info(f"Progress update: {progress:.1f}% at {format_size(speed)}/s")
-                except Exception as e:
-                    logger.error(f"Failed to update progress message: {e}")
-                    
+                await status_message.delete()
             except Exception as e:
-                logger.error(f"Progress callback error: {e}")
-                logger.error(traceback.format_exc())
-        
-        # Create and start downloader with proper handling for encrypted files
-        downloader = Downloader(url, filename, progress_callback)
-        success, result, video_info = await downloader.download()
-        
-        if not success:
-            await status_message.edit_text(f"❌ Download failed!\n\nError: {result}")
-            return False
-        
-        # For encrypted files, add a small delay to ensure decryption is complete
-        if '*' in url:
-            logger.info("Waiting for encrypted file decryption...")
-            await asyncio.sleep(3)
+                logger.error(f"Failed to delete status message: {e}")
+            return True
+    
+    await status_message.edit_text(
+        "📤 Uploading to Telegram...\n\n"
+        f"{create_progress_bar(0)}\n\n"
+        "╭━━━━❰ᴘʀᴏɢʀᴇss ʙᴀʀ❱━➣\n"
+        "┣⪼ 🗃️ Sɪᴢᴇ: Calculating...\n"
+        "┣⪼ ⏳️ Dᴏɴᴇ : 0%\n"
+        "╰━━━━━━━━━━━━━━━➣"
+    )
+    
+    # Upload progress callback
+    last_upload_update_time = time.time()
+    update_interval = 1  # seconds
+    
+    async def upload_progress(current, total):
+        nonlocal last_upload_update_time
         
-        await status_message.edit_text(
-            "📤 Uploading to Telegram...\n\n"
-            f"{create_progress_bar(0)}\n\n"
-            "╭━━━━❰ᴘʀᴏɢʀᴇss ʙᴀʀ❱━➣\n"
-            "┣⪼ 🗃️ Sɪᴢᴇ: Calculating...\n"
-            "┣⪼ ⏳️ Dᴏɴᴇ : 0%\n"
-            "╰━━━━━━━━━━━━━━━➣"
-        )
+        current_time = time.time()
+        if (current_time - last_upload_update_time) < update_interval:
+            return
         
-        # Upload progress callback
-        last_upload_update_time = time.time()
-        update_interval = 1  # seconds
+        last_upload_update_time = current_time
         
-        async def upload_progress(current, total):
-            nonlocal last_upload_update_time
-            
-            current_time = time.time()
-            if (current_time - last_upload_update_time) < update_interval:
+        try:
+            # Check if user has canceled
+            if user_id not in USER_STATES or USER_STATES[user_id].get("canceled", False):
                 return
+
+            progress = (current / total) * 100
+            progress_bar = create_progress_bar(progress)
+            status_text = (
+                "📤 Uᴘʟᴏᴀᴅɪɴɢ....\n\n"
+                f"{progress_bar}\n\n"
+                "╭━━━━❰ᴘʀᴏɢʀᴇss ʙᴀʀ❱━➣\n"
+                f"┣⪼ 🗃️ Sɪᴢᴇ: {format_size(current)} / {format_size(total)}\n"
+                f"┣⪼ ⏳️ Dᴏɴᴇ : {progress:.1f}%\n"
+                "╰━━━━━━━━━━━━━━━➣"
+            )
+            await status_message.edit_text(status_text)
             
-            last_upload_update_time = current_time
+            # Minimal terminal log
+            if current_time - last_upload_update_time >= 3.0:  # Log every 3 seconds
+                logger.info(f"⬆️ {progress:.1f}%")
             
-            try:
-                # Check if user has canceled
-                if user_id not in USER_STATES or USER_STATES[user_id].get("canceled", False):
-                    return
+        except Exception as e:
+            pass  # Suppress upload progress errors
 
-                progress = (current / total) * 100
-                progress_bar = create_progress_bar(progress)
-                status_text = (
-                    "📤 Uᴘʟᴏᴀᴅɪɴɢ....\n\n"
-                    f"{progress_bar}\n\n"
-                    "╭━━━━❰ᴘʀᴏɢʀᴇss ʙᴀʀ❱━➣\n"
-                    f"┣⪼ 🗃️ Sɪᴢᴇ: {format_size(current)} / {format_size(total)}\n"
-                    f"┣⪼ ⏳️ Dᴏɴᴇ : {progress:.1f}%\n"
-                    "╰━━━━━━━━━━━━━━━➣"
-                )
-                await status_message.edit_text(status_text)
+    sent = None
+    try:
+        # Get custom thumbnail if exists
+        thumbnail_path = cover_store.get(user_id)
+
+        # Send as video if it's a video file, otherwise as document
+        if is_video_file(result):
+            try:
+                metadata = task["metadata"]
                 
-                # Minimal terminal log
-                if current_time - last_upload_update_time >= 3.0:  # Log every 3 seconds
-                    logger.info(f"⬆️ {progress:.1f}%")
+                # Get custom thumbnail if exists, otherwise use generated one
+                thumbnail_path = cover_store.get(user_id) or metadata['thumbnail']
+                
+                # Enhanced caption with duration
+                caption = video_caption(filename, metadata, user_id)
                 
-            except Exception as e:
-                pass  # Suppress upload progress errors
-
-        try:
-            # Get custom thumbnail if exists
-            thumbnail_path = USER_THUMBNAILS.get(user_id)
-
-            # Send as video if it's a video file, otherwise as document
-            if is_video_file(result):
                 try:
-                    # Process video metadata
-                    logger.info("Processing video metadata...")
-                    metadata = await ensure_video_metadata(result)
-                    
-                    if not metadata:
-                        raise ValueError("Failed to process video metadata")
-                    
-                    # Get custom thumbnail if exists, otherwise use generated one
-                    thumbnail_path = USER_THUMBNAILS.get(user_id) or metadata['thumbnail']
-                    
-                    # Enhanced caption with duration
-                    caption = (
-                        "➖➖➖➖➖➖➖➖➖➖\n"
-                        "📂 **Video Details**\n"
-                        "➖➖➖➖➖➖➖➖➖➖\n"
-                        f"📝 **File Name:** `{filename}`\n"
-                        f"⏱️ **Duration:** `{metadata['duration_text']}`\n"
-                        f"📊 **Quality:** `{metadata['height']}p`\n"
-                        f"👤 **Downloaded By:** {USER_STATES[user_id]['username']}\n"
-                        f"🎯 **Batch:** `{USER_STATES[user_id]['batch_name']}`\n"
-                        f"⚡ **Status:** ✅ __Successfully Processed__\n"
-                        "\n"
-                        "🔗 __Stay Connected:__ [@MrGadhvii](https://t.me/MrGadhvii)\n"
-                        "➖➖➖➖➖➖➖➖➖➖"
+                    # First attempt with all parameters
+                    logger.info("Attempting to send video with full parameters...")
+                    sent = await message.reply_video(
+                        video=result,
+                        caption=caption,
+                        parse_mode=ParseMode.MARKDOWN,
+                        duration=metadata['duration'],
+                        width=metadata['width'],
+                        height=metadata['height'],
+                        thumb=thumbnail_path,
+                        supports_streaming=True,
+                        progress=upload_progress
                     )
-                    
+                    logger.info(f"Video sent successfully: {filename}")
+                except Exception as e:
+                    logger.error(f"First attempt failed: {str(e)}")
                     try:
-                        # First attempt with all parameters
-                        logger.info("Attempting to send video with full parameters...")
-                        await message.reply_video(
+                        # Second attempt with minimal parameters
+                        logger.info("Attempting to send video with minimal parameters...")
+                        sent = await message.reply_video(
                             video=result,
                             caption=caption,
                             parse_mode=ParseMode.MARKDOWN,
                             duration=metadata['duration'],
-                            width=metadata['width'],
-                            height=metadata['height'],
                             thumb=thumbnail_path,
-                            supports_streaming=True,
-                            progress=upload_progress
+                            supports_streaming=True
                         )
-                        logger.info(f"Video sent successfully: {filename}")
+                        logger.info(f"Video sent successfully with minimal parameters: {filename}")
                     except Exception as e:
-                        logger.error(f"First attempt failed: {str(e)}")
+                        logger.error(f"Second attempt failed: {str(e)}")
                         try:
-                            # Second attempt with minimal parameters
-                            logger.info("Attempting to send video with minimal parameters...")
-                            await message.reply_video(
+                            # Final attempt with bare minimum
+                            logger.info("Final attempt with bare minimum parameters...")
+                            sent = await message.reply_video(
                                 video=result,
                                 caption=caption,
-                                parse_mode=ParseMode.MARKDOWN,
-                                duration=metadata['duration'],
-                                thumb=thumbnail_path,
                                 supports_streaming=True
                             )
-                            logger.info(f"Video sent successfully with minimal parameters: {filename}")
+                            logger.info(f"Video sent with bare minimum parameters: {filename}")
                         except Exception as e:
-                            logger.error(f"Second attempt failed: {str(e)}")
-                            try:
-                                # Final attempt with bare minimum
-                                logger.info("Final attempt with bare minimum parameters...")
-                                await message.reply_video(
-                                    video=result,
-                                    caption=caption,
-                                    supports_streaming=True
-                                )
-                                logger.info(f"Video sent with bare minimum parameters: {filename}")
-                            except Exception as e:
-                                logger.error(f"All attempts failed: {str(e)}")
-                                raise e
-                except Exception as e:
-                    logger.error(f"Error processing video: {e}")
-                    logger.error(traceback.format_exc())
-                    raise e
-            else:
-                logger.info(f"Sending document: {filename}")
-                
-                # Get custom thumbnail for PDFs
-                thumbnail_path = None
-                if filename.lower().endswith('.pdf'):
-                    thumbnail_path = USER_THUMBNAILS.get(user_id)
-                    if thumbnail_path:
-                        logger.info(f"Using custom thumbnail for PDF: {thumbnail_path}")
-                
-                # Ensure PDF extension for encrypted PDFs
-                if ('pdf' in url.lower() or '.pdf*' in url.lower()):
-                    if not filename.lower().endswith('.pdf'):
-                        old_filename = filename
-                        filename = f"{os.path.splitext(filename)[0]}.pdf"
-                        logger.info(f"Added .pdf extension: {old_filename} -> {filename}")
-                
-                try:
-                    # Simplified caption for PDFs
-                    caption = (
-                        f"📝 **{filename}**\n"
-                        f"👤 **By:** {USER_STATES[user_id]['username']}\n"
-                        f"🎯 **Batch:** `{USER_STATES[user_id]['batch_name']}`\n"
-                        "🔗 [@MrGadhvii](https://t.me/MrGadhvii)"
-                    )
-                    
-                    await message.reply_document(
-                        document=result,
-                        caption=caption,
-                        parse_mode=ParseMode.MARKDOWN,
-                        thumb=thumbnail_path,
-                        progress=upload_progress,
-                        file_name=filename
-                    )
-                    logger.info(f"Document sent successfully: {filename}")
-                    
-                    # Clean up files after successful upload
-                    clean_all_files()
-                    
-                except Exception as e:
-                    logger.error(f"Error sending document: {e}")
-                    raise e
+                            logger.error(f"All attempts failed: {str(e)}")
+                            raise e
+            except Exception as e:
+                logger.error(f"Error processing video: {e}")
+                logger.error(traceback.format_exc())
+                raise e
+        else:
+            logger.info(f"Sending document: {filename}")
             
-            # Clean up files
-            if os.path.exists(result):
-                os.remove(result)
-                logger.info(f"Removed downloaded file: {result}")
-            if thumbnail_path and os.path.exists(thumbnail_path) and thumbnail_path != USER_THUMBNAILS.get(user_id):
-                os.remove(thumbnail_path)
-                logger.info(f"Removed thumbnail: {thumbnail_path}")
+            # Get custom thumbnail for PDFs
+            thumbnail_path = None
+            if filename.lower().endswith('.pdf'):
+                thumbnail_path = cover_store.get(user_id)
+                if thumbnail_path:
+                    logger.info(f"Using custom thumbnail for PDF: {thumbnail_path}")
             
-            # Clean any JSON files
-            clean_downloads_dir()
+            # Otherwise use the remote thumbnail fetched during post-processing
+            if not thumbnail_path and task.get("thumbnail_task"):
+                thumbnail_path = await task["thumbnail_task"]
             
-            # Clean logs after successful upload
-            clean_logs()
+            # Ensure PDF extension for encrypted PDFs
+            if ('pdf' in url.lower() or '.pdf*' in url.lower()):
+                if not filename.lower().endswith('.pdf'):
+                    old_filename = filename
+                    filename = f"{os.path.splitext(filename)[0]}.pdf"
+                    logger.info(f"Added .pdf extension: {old_filename} -> {filename}")
             
-            # Delete status message
             try:
-                await status_message.delete()
+                # Simplified caption for PDFs
+                caption = document_caption(filename, user_id)
+                
+                sent = await message.reply_document(
+                    document=result,
+                    caption=caption,
+                    parse_mode=ParseMode.MARKDOWN,
+                    thumb=thumbnail_path,
+                    progress=upload_progress,
+                    file_name=filename
+                )
+                logger.info(f"Document sent successfully: {filename}")
+                
             except Exception as e:
-                logger.error(f"Failed to delete status message: {e}")
-            
-            return True
-            
+                logger.error(f"Error sending document: {e}")
+                raise e
+        
+        # Remember the delivery and its file_id, the next list with this URL
+        # or this content sends it again without uploading
+        if sent:
+            await delivery_index.record(
+                url, filename, os.path.getsize(result), sent.chat.id, sent.id, user_id,
+                checksum=checksum, media=sent_media(sent), content_hash=content_hash
+            )
+        
+        # Clean any JSON files
+        clean_downloads_dir()
+        
+        # Clean logs after successful upload
+        clean_logs()
+        
+        # Delete status message
+        try:
+            await status_message.delete()
         except Exception as e:
-            logger.error(f"Upload error: {e}")
-            logger.error(traceback.format_exc())
-            await status_message.edit_text(f"❌ Upload failed!\n\nError: {str(e)}")
+            logger.error(f"Failed to delete status message: {e}")
+        
+        return True
+        
+    except Exception as e:
+        logger.error(f"Upload error: {e}")
+        logger.error(traceback.format_exc())
+        await status_message.edit_text(f"❌ Upload failed!\n\nError: {str(e)}")
+        return False
+
+
+async def resend_delivered(client: Client, message: Message, task: dict):
+    """Send an earlier upload of the URL again: by its file_id, or by copying
+    the message it produced into this chat"""
+    delivered = task["delivered"]
+    if delivered.get("media"):
+        if await send_by_file_id(message, delivered["media"], task["filename"], task["user_id"]):
+            return True
+    try:
+        await client.copy_message(message.chat.id, delivered["chat_id"], delivered["message_id"])
+        logger.info(f"Re-sent {task['filename']} from message {delivered['message_id']}")
+        return True
+    except Exception as e:
+        logger.warning(f"Could not re-send {task['filename']}: {e}")
+        await delivery_index.forget(task["url"])
+        return False
+
+
+async def deliver_download(client: Client, message: Message, task: dict, user_id: int):
+    """Upload stage: re-send an earlier delivery or upload the downloaded file"""
+    if task.get("delivered"):
+        if DEDUP_MODE == "skip" or await resend_delivered(client, message, task):
+            return True
+        # The earlier message is gone, fetch the file after all; this download
+        # is ours to clean up
+        task = await download_url_line(client, message, task["entry"], user_id, resend=False, order=task["order"])
+        if not task:
+            return False
+        try:
+            if not await postprocess_download(task):
+                return False
+            return await upload_download(client, message, task, user_id)
+        finally:
+            clean_job(task)
+    return await upload_download(client, message, task, user_id)
+
+
+async def process_url_line(client: Client, message: Message, line: str, user_id: int):
+    try:
+        entry = parse_line(line)
+        if not entry:
+            logger.info(f"Invalid line format: {line}")
+            return False
+        task = await download_url_line(client, message, entry, user_id)
+        if not task:
             return False
+        
+        try:
+            if user_id not in USER_STATES or USER_STATES[user_id].get("canceled", False):
+                return False
+            if not await postprocess_download(task):
+                return False
+            return await deliver_download(client, message, task, user_id)
+        finally:
+            clean_job(task)
             
     except Exception as e:
         logger.error(f"Error processing URL line: {e}")
@@ -1573,6 +1415,73 @@ async def process_url_line(client: Client, message: Message, line: str, user_id:
         return False
 
 
+async def resume_interrupted_jobs(client: Client):
+    """Resume downloads left unfinished by a previous run"""
+    jobs = journal.pending()
+    if not jobs:
+        return
+    
+    logger.info(f"♻️ Resuming {len(jobs)} interrupted download(s)")
+    by_chat = {}
+    for job in jobs:
+        by_chat.setdefault(job.get("chat_id"), []).append(job)
+    
+    for chat_id, chat_jobs in by_chat.items():
+        asyncio.create_task(resume_chat_jobs(client, chat_id, chat_jobs))
+
+
+async def resume_chat_jobs(client: Client, chat_id: int, jobs):
+    """Resume one chat's interrupted jobs in their original order"""
+    for job in jobs:
+        try:
+            message = await client.get_messages(chat_id, job["message_id"])
+            if not message or message.empty:
+                raise ValueError("original message is gone")
+            
+            user_id = job["user_id"]
+            if user_id not in USER_STATES:
+                USER_STATES[user_id] = {
+                    "state": "processing_txt",
+                    "username": job.get("username") or "Anonymous",
+                    "batch_name": job.get("batch_name") or "Resumed Batch",
+                    "canceled": False
+                }
+            
+            await client.send_message(
+                chat_id,
+                f"♻️ Resuming interrupted download: `{job['filename']}`\n"
+                f"📦 Already downloaded: {format_size(job.get('bytes_done'))}"
+                f" / {format_size(job.get('total_bytes'))}",
+                parse_mode=ParseMode.MARKDOWN
+            )
+            await process_url_line(client, message, job["line"], user_id)
+        except Exception as e:
+            logger.error(f"Could not resume job {job.get('job_id')}: {e}")
+            clean_job(job)
+
+
+async def run_batch(client: Client, message: Message, entries, user_id: int, on_item_done=None):
+    """Process parsed list entries through the download/post-process/upload pipeline"""
+    batch_id = uuid.uuid4().hex
+    pipeline = BatchPipeline(
+        download=lambda item: download_url_line(client, message, item.entry, user_id, order=(batch_id, item.index)),
+        postprocess=postprocess_download,
+        upload=lambda task: deliver_download(client, message, task, user_id),
+        cleanup=clean_job,
+        download_workers=DOWNLOAD_WORKERS,
+        postprocess_workers=POSTPROCESS_WORKERS,
+        upload_workers=UPLOAD_WORKERS,
+        queue_size=PIPELINE_QUEUE_SIZE,
+        is_canceled=lambda: user_id not in USER_STATES or USER_STATES[user_id].get("canceled", False),
+        on_item_done=on_item_done,
+    )
+    if DEDUP_MODE != "off":
+        await delivery_index.prefetch(entry.download_url for entry in entries if entry.is_supported)
+    await pipeline.run(entries)
+    clean_downloads_dir()
+    return pipeline
+
+
 @app.on_message(filters.command("txt"))
 async def process_txt_file(client: Client, message: Message):
     try:
@@ -1615,26 +1524,10 @@ async def process_txt_file(client: Client, message: Message):
                     await status_msg.edit_text("❌ Failed to download the txt file.")
                     return
                 
-                # Read URLs from file with proper encoding detection
+                # Read URLs from file, the encoding is detected while reading
                 try:
-                    encodings = ['utf-8', 'latin-1', 'ascii']
-                    content = None
-                    
-                    for encoding in encodings:
-                        try:
-                            with open(txt_path, 'r', encoding=encoding) as f:
-                                content = f.read()
-                            break
-                        except UnicodeDecodeError:
-                            continue
-                    
-                    if content is None:
-                        await status_msg.edit_text("❌ Could not read the text file. Invalid encoding.")
-                        os.remove(txt_path)
-                        return
-                    
-                    # Split content into lines and filter empty lines
-                    urls = [line.strip() for line in content.splitlines() if line.strip()]
+                    # Parse once, the manifest drives validation, scheduling and reporting
+                    manifest = await read_manifest(txt_path)
                     
                 except Exception as e:
                     await status_msg.edit_text(f"❌ Failed to read the txt file: {str(e)}")
@@ -1645,7 +1538,7 @@ async def process_txt_file(client: Client, message: Message):
                 # Clean up txt file
                 os.remove(txt_path)
                 
-                if not urls:
+                if not manifest.total:
                     await status_msg.edit_text(
                         "❌ No valid URLs found in the text file.\n\n"
                         "**File Format:**\n"
@@ -1655,19 +1548,8 @@ async def process_txt_file(client: Client, message: Message):
                     )
                     return
                 
-                # Validate URL format
-                valid_urls = []
-                invalid_urls = []
-                
-                for line in urls:
-                    if ":" in line:
-                        filename, url = [x.strip() for x in line.split(":", 1)]
-                        if filename and url:
-                            valid_urls.append(line)
-                        else:
-                            invalid_urls.append(line)
-                    else:
-                        invalid_urls.append(line)
+                valid_urls = manifest.entries
+                invalid_urls = manifest.invalid
                 
                 if not valid_urls:
                     await status_msg.edit_text(
@@ -1693,86 +1575,47 @@ async def process_txt_file(client: Client, message: Message):
                 if user_id not in update_locks:
                     update_locks[user_id] = threading.Lock()
                 
-                # Show batch processing status with server health mode notice
+                # Show batch processing status
                 await status_msg.edit_text(
                     "🔄 Starting batch download...\n\n"
                     f"📚 Total valid URLs: {len(valid_urls)}\n"
                     f"⚠️ Invalid URLs: {len(invalid_urls)}\n\n"
-                    "**Processing will start in 3 seconds...**\n\n"
-                    "⚡ **SERVER HEALTH MODE:**\n"
-                    "• **60-second delay** between files\n"
-                    "• Helps prevent server overload\n"
-                    "• Ensures stable processing",
+                    "⚡ **PIPELINE MODE:**\n"
+                    f"• Up to **{DOWNLOAD_WORKERS}** downloads run while files upload\n"
+                    "• Files are posted in list order",
                     parse_mode=ParseMode.MARKDOWN,
                     reply_markup=InlineKeyboardMarkup([
                         [InlineKeyboardButton("❌ Cancel", callback_data="cancel_batch")]
                     ])
                 )
                 
-                # Wait 3 seconds before starting
-                await asyncio.sleep(3)
-                
-                success_count = 0
-                failed_count = 0
-                
-                # Process each URL
-                for i, line in enumerate(valid_urls, 1):
-                    if USER_STATES[user_id].get("canceled", False):
-                        await status_msg.edit_text(
-                            "❌ Batch processing cancelled!\n\n"
-                            f"📚 Total files: {len(valid_urls)}\n"
-                            f"✅ Processed: {success_count}\n"
-                            f"❌ Failed: {failed_count}\n"
-                            f"⏹ Cancelled at: {i}/{len(valid_urls)}"
-                        )
-                        return
-                    
-                    # Update status with progress
-                    progress_text = (
-                        f"🔄 Processing file {i}/{len(valid_urls)}\n\n"
+                async def on_item_done(item, success_count, failed_count):
+                    done = success_count + failed_count
+                    await status_msg.edit_text(
+                        f"🔄 Processed file {done}/{len(valid_urls)}\n\n"
                         f"✅ Successful: {success_count}\n"
                         f"❌ Failed: {failed_count}\n"
-                        f"⏳ Progress: {(i/len(valid_urls))*100:.1f}%\n\n"
-                        f"🔄 Server Health Mode: Active"
-                    )
-                    
-                    await status_msg.edit_text(
-                        progress_text,
+                        f"⏳ Progress: {(done/len(valid_urls))*100:.1f}%\n\n"
+                        f"🔄 Pipeline Mode: Active",
                         reply_markup=InlineKeyboardMarkup([
                             [InlineKeyboardButton("❌ Cancel", callback_data="cancel_batch")]
                         ])
                     )
-                    
-                    # Process current URL
-                    result = await process_url_line(client, message, line, user_id)
-                    if result:
-                        success_count += 1
-                    else:
-                        failed_count += 1
-                    
-                    # Clean downloads directory after each file
-                    clean_downloads_dir()
-                    
-                    # Add cooldown between files (60 seconds)
-                    if i < len(valid_urls):  # Don't delay after the last file
-                        # Show cooling down message
-                        cooldown_time = 60  # 60 seconds cooldown
-                        cooldown_msg = await message.reply_text(
-                            f"⏳ **SERVER COOLING DOWN**\n\n"
-                            f"• Processed: {i}/{len(valid_urls)} files\n"
-                            f"• Waiting 60 seconds before next file\n"
-                            f"• Progress: {(i/len(valid_urls))*100:.1f}%\n\n"
-                            f"This helps prevent server overload."
-                        )
-                        
-                        # Wait for cooldown period
-                        await asyncio.sleep(cooldown_time)
-                        
-                        # Delete cooldown message
-                        try:
-                            await cooldown_msg.delete()
-                        except Exception:
-                            pass
+                
+                # Process all URLs through the pipeline
+                pipeline = await run_batch(client, message, valid_urls, user_id, on_item_done)
+                success_count = pipeline.success_count
+                failed_count = pipeline.failed_count
+                
+                if pipeline.canceled:
+                    await status_msg.edit_text(
+                        "❌ Batch processing cancelled!\n\n"
+                        f"📚 Total files: {len(valid_urls)}\n"
+                        f"✅ Processed: {success_count}\n"
+                        f"❌ Failed: {failed_count}\n"
+                        f"⏹ Cancelled at: {success_count + failed_count}/{len(valid_urls)}"
+                    )
+                    return
                 
                 # Final status
                 await status_msg.edit_text(
@@ -1852,26 +1695,10 @@ async def handle_document(client: Client, message: Message):
                 await status_msg.edit_text("❌ Failed to download the txt file.")
                 return
             
-            # Read URLs from file with proper encoding detection
+            # Read URLs from file, the encoding is detected while reading
             try:
-                encodings = ['utf-8', 'latin-1', 'ascii']
-                content = None
-                
-                for encoding in encodings:
-                    try:
-                        with open(txt_path, 'r', encoding=encoding) as f:
-                            content = f.read()
-                        break
-                    except UnicodeDecodeError:
-                        continue
-                
-                if content is None:
-                    await status_msg.edit_text("❌ Could not read the text file. Invalid encoding.")
-                    os.remove(txt_path)
-                    return
-                
-                # Split content into lines and filter empty lines
-                urls = [line.strip() for line in content.splitlines() if line.strip()]
+                # Parse once, the manifest drives validation, scheduling and reporting
+                manifest = await read_manifest(txt_path)
                 
             except Exception as e:
                 await status_msg.edit_text(f"❌ Failed to read the txt file: {str(e)}")
@@ -1882,7 +1709,7 @@ async def handle_document(client: Client, message: Message):
             # Clean up txt file
             os.remove(txt_path)
             
-            if not urls:
+            if not manifest.total:
                 await status_msg.edit_text(
                     "❌ No URLs found in the text file.\n\n"
                     "**Required Format:**\n"
@@ -1892,22 +1719,8 @@ async def handle_document(client: Client, message: Message):
                 )
                 return
             
-            # Validate URL format
-            valid_urls = []
-            invalid_urls = []
-            
-            await status_msg.edit_text(
-                "🔍 **Validating URLs**\n\n"
-                "⏳ Checking format and validity...",
-                parse_mode=ParseMode.MARKDOWN
-            )
-            
-            for line in urls:
-                filename, url = parse_line(line)
-                if filename and url:
-                    valid_urls.append(line)
-                else:
-                    invalid_urls.append(line)
+            valid_urls = manifest.entries
+            invalid_urls = manifest.invalid
             
             if not valid_urls:
                 invalid_examples = "\n".join([f"❌ `{line}`" for line in invalid_urls[:5]])
@@ -1937,7 +1750,7 @@ async def handle_document(client: Client, message: Message):
             await status_msg.edit_text(
                 f"✅ **Found {len(valid_urls)} Valid URLs**\n"
                 f"⚠️ Skipped {len(invalid_urls)} Invalid URLs\n\n"
-                "🔄 Starting batch download in 3 seconds...\n\n"
+                "🔄 Starting batch download...\n\n"
                 "**Note:** Press /stop to cancel anytime",
                 parse_mode=ParseMode.MARKDOWN,
                 reply_markup=InlineKeyboardMarkup([
@@ -1945,51 +1758,40 @@ async def handle_document(client: Client, message: Message):
                 ])
             )
             
-            # Wait 3 seconds before starting
-            await asyncio.sleep(3)
-            
-            success_count = 0
-            failed_count = 0
-            
-            # Process each URL
-            for i, line in enumerate(valid_urls, 1):
-                if USER_STATES[user_id].get("canceled", False):
-                    await status_msg.edit_text(
-                        "❌ **Batch Processing Cancelled**\n\n"
-                        f"📊 **Progress Report:**\n"
-                        f"• Total Files: `{len(valid_urls)}`\n"
-                        f"• Processed: `{i-1}/{len(valid_urls)}`\n"
-                        f"• Successful: `{success_count}`\n"
-                        f"• Failed: `{failed_count}`\n"
-                        f"• Completion: `{((i-1)/len(valid_urls))*100:.1f}%`",
-                        parse_mode=ParseMode.MARKDOWN
-                    )
-                    return
-                
+            async def on_item_done(item, success_count, failed_count):
+                done = success_count + failed_count
                 await status_msg.edit_text(
                     f"🔄 **Batch Processing**\n\n"
                     f"📊 **Progress Report:**\n"
-                    f"• Processing: `{i}/{len(valid_urls)}`\n"
+                    f"• Processed: `{done}/{len(valid_urls)}`\n"
                     f"• Successful: `{success_count}`\n"
                     f"• Failed: `{failed_count}`\n"
-                    f"• Progress: `{(i/len(valid_urls))*100:.1f}%`\n\n"
+                    f"• Progress: `{(done/len(valid_urls))*100:.1f}%`\n\n"
                     "**Note:** Press /stop to cancel",
                     parse_mode=ParseMode.MARKDOWN,
                     reply_markup=InlineKeyboardMarkup([
                         [InlineKeyboardButton("❌ Cancel", callback_data="cancel_batch")]
                     ])
                 )
-                
-                if await process_url_line(client, message, line, user_id):
-                    success_count += 1
-                else:
-                    failed_count += 1
-                
-                # Clean downloads directory after each file
-                clean_downloads_dir()
-                
-                # Small delay between files
-                await asyncio.sleep(1)
+            
+            # Process all URLs through the pipeline
+            pipeline = await run_batch(client, message, valid_urls, user_id, on_item_done)
+            success_count = pipeline.success_count
+            failed_count = pipeline.failed_count
+            
+            if pipeline.canceled:
+                done = success_count + failed_count
+                await status_msg.edit_text(
+                    "❌ **Batch Processing Cancelled**\n\n"
+                    f"📊 **Progress Report:**\n"
+                    f"• Total Files: `{len(valid_urls)}`\n"
+                    f"• Processed: `{done}/{len(valid_urls)}`\n"
+                    f"• Successful: `{success_count}`\n"
+                    f"• Failed: `{failed_count}`\n"
+                    f"• Completion: `{(done/len(valid_urls))*100:.1f}%`",
+                    parse_mode=ParseMode.MARKDOWN
+                )
+                return
             
             # Final status
             await status_msg.edit_text(
@@ -2041,32 +1843,19 @@ async def save_thumbnail(client: Client, message: Message):
             os.makedirs("downloads")
 
         # Download the photo
-        thumb_path = f"downloads/thumb_{user_id}.jpg"
+        download_path = f"downloads/thumb_{user_id}.jpg"
         
-        # Remove old thumbnail if exists
-        if os.path.exists(thumb_path):
-            os.remove(thumb_path)
+        # Remove old download if exists
+        if os.path.exists(download_path):
+            os.remove(download_path)
         
         # Download and process new thumbnail
-        await message.download(file_name=thumb_path)
+        await message.download(file_name=download_path)
 
-        # Optimize thumbnail
+        # Render once to Telegram's thumbnail limits and keep it across restarts
         try:
-            img = Image.open(thumb_path)
-            # Convert to RGB if necessary
-            if img.mode != 'RGB':
-                img = img.convert('RGB')
-            # Resize maintaining aspect ratio
-            img.thumbnail((320, 320), Image.Resampling.LANCZOS)
-            # Save with optimal settings
-            img.save(thumb_path, "JPEG", quality=95, optimize=True)
-            
-            # Verify the thumbnail
-            with Image.open(thumb_path) as verify_img:
-                verify_img.verify()
-            
-            # Store thumbnail path for user
-            USER_THUMBNAILS[user_id] = thumb_path
+            thumb_path = await cover_store.set(user_id, download_path)
+            os.remove(download_path)
             
             # Send confirmation with thumbnail preview
             await message.reply_photo(
@@ -2084,8 +1873,8 @@ async def save_thumbnail(client: Client, message: Message):
             
         except Exception as e:
             logger.error(f"Error processing thumbnail: {e}")
-            if os.path.exists(thumb_path):
-                os.remove(thumb_path)
+            if os.path.exists(download_path):
+                os.remove(download_path)
             await message.reply_text(
                 "❌ Failed to process thumbnail image.\n"
                 "Please make sure you're sending a valid image file."
@@ -2108,12 +1897,8 @@ async def delete_thumbnail(client: Client, message: Message):
             await message.reply_text("⚠️ You are not authorized to use this bot.")
             return
 
-        if user_id in USER_THUMBNAILS:
-            thumb_path = USER_THUMBNAILS[user_id]
-            if os.path.exists(thumb_path):
-                os.remove(thumb_path)
-                logger.info(f"Deleted thumbnail file: {thumb_path}")
-            del USER_THUMBNAILS[user_id]
+        if await cover_store.delete(user_id):
+            logger.info(f"Deleted thumbnail for user {user_id}")
             await message.reply_text(
                 "✅ **Custom Thumbnail Removed!**\n\n"
                 "• Bot will generate thumbnails automatically\n"
@@ -2239,376 +2024,32 @@ def clean_logs():
         logger.error(f"Error cleaning logs: {e}")
 
 
-async def format_duration(seconds):
-    """Format duration in a modern way"""
-    try:
-        hours = seconds // 3600
-        minutes = (seconds % 3600) // 60
-        seconds = seconds % 60
-        
-        if hours > 0:
-            return f"{hours:02d}:{minutes:02d}:{seconds:02d}"
-        else:
-            return f"{minutes:02d}:{seconds:02d}"
-    except:
-        return "00:00"
-
 async def get_video_info(video_path):
-    """Get video metadata using multiple methods to ensure accuracy"""
+    """Get video width, height and duration from the shared metadata cache"""
     try:
         logger.info(f"Getting video info for: {video_path}")
-        
-        # Enhanced handling for encrypted videos
-        if '*' in video_path:
-            logger.info("Encrypted video detected, waiting 8 seconds for decryption...")
-            await asyncio.sleep(8)  # Increased initial delay for decryption
-            max_attempts = 8  # More attempts for encrypted files
-        else:
-            max_attempts = 5
-        
-        width = height = duration = None
-        
-        for attempt in range(max_attempts):
-            try:
-                # Method 1: Try ffprobe with detailed video stream analysis
-                cmd = [
-                    'ffprobe',
-                    '-v', 'error',
-                    '-select_streams', 'v:0',
-                    '-show_entries', 'stream=width,height,duration,r_frame_rate',
-                    '-show_entries', 'format=duration',
-                    '-of', 'json',
-                    video_path
-                ]
-                
-                process = await asyncio.create_subprocess_exec(
-                    *cmd,
-                    stdout=asyncio.subprocess.PIPE,
-                    stderr=asyncio.subprocess.PIPE
-                )
-                
-                stdout, stderr = await process.communicate()
-                if process.returncode == 0:
-                    probe = json.loads(stdout.decode())
-                    
-                    # Get video stream info
-                    stream_info = probe.get('streams', [{}])[0]
-                    format_info = probe.get('format', {})
-                    
-                    # Calculate duration from multiple sources
-                    duration_sources = [
-                        float(stream_info.get('duration', 0)),
-                        float(format_info.get('duration', 0)),
-                        await get_duration_ffmpeg(video_path)  # Fallback to ffmpeg
-                    ]
-                    duration = max(d for d in duration_sources if d > 0)
-                    
-                    # Get dimensions
-                    width = int(stream_info.get('width', 1280))
-                    height = int(stream_info.get('height', 720))
-                    
-                    # For encrypted videos, add extra validation
-                    if '*' in video_path:
-                        if duration <= 0 or width <= 0 or height <= 0:
-                            raise ValueError("Invalid metadata from encrypted file")
-                    
-                    # Scale dimensions properly
-                    if width < 1280:
-                        scale_factor = 1280 / width
-                        width = 1280
-                        height = int(height * scale_factor)
-                    
-                    # Ensure even dimensions
-                    width = width // 2 * 2
-                    height = height // 2 * 2
-                    
-                    logger.info(f"Video metadata: {width}x{height}, {duration}s")
-                    return width, height, int(duration)
-                
-                # If ffprobe failed, try alternative method with ffmpeg
-                logger.info("Falling back to ffmpeg for metadata extraction...")
-                duration = await get_duration_ffmpeg(video_path)
-                cmd = [
-                    'ffmpeg',
-                    '-i', video_path,
-                    '-f', 'null',
-                    '-'
-                ]
-                
-                process = await asyncio.create_subprocess_exec(
-                    *cmd,
-                    stdout=asyncio.subprocess.PIPE,
-                    stderr=asyncio.subprocess.PIPE
-                )
-                
-                _, stderr = await process.communicate()
-                stderr = stderr.decode()
-                
-                # Extract dimensions from ffmpeg output
-                dimension_match = re.search(r'(\d{3,4})x(\d{3,4})', stderr)
-                if dimension_match:
-                    width, height = map(int, dimension_match.groups())
-                
-                if width and height and duration:
-                    return width, height, int(duration)
-                
-                await asyncio.sleep(2 ** attempt)  # Exponential backoff
-                
-            except Exception as e:
-                logger.error(f"Attempt {attempt+1} failed: {str(e)}")
-                if attempt == max_attempts - 1:
-                    raise
-                await asyncio.sleep(2 ** attempt)
-        
-        # Final fallback for encrypted videos
-        return 1280, 720, int(duration if duration else 60)
+        metadata = await get_video_metadata(video_path, with_thumbnail=False)
+        width = metadata.width or 1280
+        height = metadata.height or 720
+        duration = metadata.duration or 60
+        
+        # Scale dimensions properly
+        if width < 1280:
+            scale_factor = 1280 / width
+            width = 1280
+            height = int(height * scale_factor)
+        
+        # Ensure even dimensions
+        width = width // 2 * 2
+        height = height // 2 * 2
+        
+        logger.info(f"Video metadata: {width}x{height}, {duration}s")
+        return width, height, int(duration)
     
     except Exception as e:
         logger.error(f"Video info error: {str(e)}")
         return 1280, 720, 60
 
-async def get_duration_ffmpeg(video_path):
-    """Get video duration using ffmpeg as fallback"""
-    try:
-        cmd = [
-            'ffmpeg',
-            '-i', video_path,
-            '-f', 'null',
-            '-'
-        ]
-        
-        process = await asyncio.create_subprocess_exec(
-            *cmd,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE
-        )
-        
-        stdout, stderr = await process.communicate()
-        stderr = stderr.decode()
-        
-        # Try to extract duration from ffmpeg output
-        duration_match = re.search(r"Duration: (\d{2}):(\d{2}):(\d{2})", stderr)
-        if duration_match:
-            hours, minutes, seconds = map(int, duration_match.groups())
-            duration = hours * 3600 + minutes * 60 + seconds
-            logger.info(f"Got duration from ffmpeg: {duration}s")
-            return duration
-            
-        return 60
-        
-    except Exception as e:
-        logger.error(f"Error getting duration with ffmpeg: {e}")
-        return 60
-
-async def generate_thumbnail(video_path, timestamp=1):
-    """Generate thumbnail with enhanced handling for encrypted videos"""
-    try:
-        thumbnail_path = f"{video_path}_thumb.jpg"
-        max_attempts = 8 if '*' in video_path else 5
-        
-        for attempt in range(max_attempts):
-            try:
-                current_ts = timestamp + (attempt * 5)  # Try different timestamps
-                cmd = [
-                    'ffmpeg',
-                    '-ss', str(current_ts),
-                    '-i', video_path,
-                    '-vframes', '1',
-                    '-vf', 'thumbnail,scale=320:320:force_original_aspect_ratio=decrease',
-                    '-y', thumbnail_path
-                ]
-                
-                # Longer timeout for encrypted videos
-                process = await asyncio.create_subprocess_exec(*cmd)
-                await asyncio.wait_for(process.communicate(), timeout=30 if '*' in video_path else 15)
-                
-                if os.path.exists(thumbnail_path):
-                    with Image.open(thumbnail_path) as img:
-                        img.verify()
-                        img.thumbnail((320, 320))
-                        img.save(thumbnail_path, "JPEG", quality=95)
-                    return thumbnail_path
-                
-            except Exception as e:
-                logger.error(f"Thumbnail attempt {attempt+1} failed: {str(e)}")
-                if attempt == max_attempts - 1:
-                    raise
-                await asyncio.sleep(2 ** attempt)
-        
-        return None
-    except Exception as e:
-        logger.error(f"Thumbnail generation failed: {str(e)}")
-        return None
-
-def get_file_extension_from_url(url):
-    """Extract file extension from URL with better PDF detection"""
-    try:
-        # Log original URL for debugging
-        logger.info(f"Extracting extension from URL: {url}")
-        
-        # Handle URL formats with prefixes like TEST: or @
-        if ':' in url and not url.startswith('http'):
-            parts = url.split(':', 1)
-            if len(parts) == 2 and 'http' in parts[1]:
-                url = parts[1].strip()
-                logger.info(f"Removed prefix, new URL: {url}")
-        
-        # Remove @ prefix if present
-        if url.startswith('@'):
-            url = url[1:].strip()
-            logger.info(f"Removed @ prefix, new URL: {url}")
-            
-        # Remove query parameters and decryption key
-        clean_url = url.split('?')[0].split('*')[0].lower().strip()
-        logger.info(f"Cleaned URL: {clean_url}")
-        
-        # STRICT PDF DETECTION - Multiple checks
-        # 1. Check for .pdf extension
-        if clean_url.endswith('.pdf'):
-            logger.info("PDF detected by .pdf extension")
-            return '.pdf'
-            
-        # 2. Check for PDF in path components
-        pdf_indicators = ['/pdf/', 'pdf/', '/pdf', 'application/pdf', 'content-type=pdf']
-        if any(x in clean_url for x in pdf_indicators):
-            logger.info(f"PDF detected by path indicator: {[x for x in pdf_indicators if x in clean_url]}")
-            return '.pdf'
-            
-        # 3. Check for PDF in filename without extension
-        if clean_url.split('/')[-1].lower() == 'pdf':
-            logger.info("PDF detected by filename 'pdf'")
-            return '.pdf'
-            
-        # 4. Check URL for common PDF hosting patterns
-        pdf_hosts = ['docs.google.com/document', 'dropbox.com/pdf', 'drive.google.com']
-        if any(host in clean_url for host in pdf_hosts) and 'pdf' in clean_url:
-            logger.info(f"PDF detected by hosting service: {[x for x in pdf_hosts if x in clean_url]}")
-            return '.pdf'
-        
-        # Extract normal extension from filename in URL
-        url_parts = clean_url.split('/')
-        if url_parts:
-            filename = url_parts[-1]
-            if '.' in filename:
-                ext = '.' + filename.split('.')[-1].lower()
-                if len(ext) <= 5 and ext[1:].isalnum():  # Valid extension check
-                    logger.info(f"Found extension from URL filename: {ext}")
-                    return ext
-        
-        # Last resort check for PDF content
-        if 'pdf' in clean_url:
-            logger.info("PDF detected by 'pdf' keyword in URL")
-            return '.pdf'
-            
-        logger.warning(f"No extension could be determined from URL: {url}")
-        return None
-    except Exception as e:
-        logger.error(f"Error extracting extension from URL: {e}")
-        # Safety fallback for PDF
-        if 'pdf' in url.lower():
-            return '.pdf'
-        return None
-
-def ensure_filename_has_extension(filename, url, file_type=None):
-    """Ensure filename has the correct extension with robust PDF handling"""
-    try:
-        logger.info(f"Processing filename: '{filename}', URL: '{url}', type: '{file_type}'")
-        
-        # PDF detection comes first - multiple checks
-        is_pdf = False
-        
-        # Check URL for PDF indicators (highest priority)
-        if url:
-            # Strong PDF indicator check
-            pdf_strong_indicators = ['.pdf', '/pdf/', 'pdf/', '/pdf', 'application/pdf']
-            if any(indicator in url.lower() for indicator in pdf_strong_indicators):
-                logger.info(f"PDF detected by strong indicator in URL")
-                is_pdf = True
-                
-            # PDF keyword check
-            elif 'pdf' in url.lower():
-                logger.info("PDF detected by 'pdf' keyword in URL")
-                is_pdf = True
-                
-        # Check file_type parameter
-        if file_type and 'pdf' in file_type.lower():
-            logger.info("PDF detected by file_type parameter")
-            is_pdf = True
-            
-        # Get filename parts
-        filename_base, filename_ext = os.path.splitext(filename)
-        filename_ext = filename_ext.lower() if filename_ext else ''
-        logger.info(f"Filename base: '{filename_base}', extension: '{filename_ext}'")
-        
-        # If it's a PDF, ensure PDF extension
-        if is_pdf:
-            logger.info("Setting .pdf extension")
-            return f"{filename_base}.pdf"
-            
-        # If filename already has a PDF extension, keep it
-        if filename_ext == '.pdf':
-            logger.info("Keeping existing .pdf extension")
-            return filename
-            
-        # Try to get extension from URL
-        url_ext = get_file_extension_from_url(url) if url else None
-        logger.info(f"Extension from URL: {url_ext}")
-        
-        # Use URL extension if available
-        if url_ext:
-            logger.info(f"Using extension from URL: {url_ext}")
-            return f"{filename_base}{url_ext}"
-            
-        # If filename already has a valid extension, keep it
-        if filename_ext and len(filename_ext) <= 5 and filename_ext[1:].isalnum():
-            logger.info(f"Keeping existing valid extension: {filename_ext}")
-            return filename
-            
-        # Last resort for PDFs: if URL contains 'pdf' add .pdf extension
-        if url and 'pdf' in url.lower():
-            logger.info("Adding .pdf extension based on URL containing 'pdf'")
-            return f"{filename_base}.pdf"
-            
-        logger.warning(f"No extension could be determined, using original filename: {filename}")
-        return filename
-        
-    except Exception as e:
-        logger.error(f"Error ensuring filename extension: {e}")
-        # In case of any error with PDFs, ensure .pdf extension
-        if url and 'pdf' in url.lower():
-            logger.info("Fallback: Adding .pdf extension after error")
-            if filename.lower().endswith('.pdf'):
-                return filename
-            return f"{filename}.pdf"
-        return filename
-
-# Add this function near other cleanup functions
-def clean_all_files():
-    """Clean all temporary files including thumbnails"""
-    try:
-        # Clean downloads directory
-        if os.path.exists("downloads"):
-            for file in os.listdir("downloads"):
-                try:
-                    file_path = os.path.join("downloads", file)
-                    if os.path.isfile(file_path):
-                        os.remove(file_path)
-                        logger.info(f"Removed file: {file_path}")
-                except Exception as e:
-                    logger.error(f"Error removing file {file}: {e}")
-        
-        # Clean any thumb files in current directory
-        for file in os.listdir():
-            if file.endswith("_thumb.jpg") or "thumb" in file.lower():
-                try:
-                    os.remove(file)
-                    logger.info(f"Removed thumbnail: {file}")
-                except Exception as e:
-                    logger.error(f"Error removing thumbnail {file}: {e}")
-                    
-    except Exception as e:
-        logger.error(f"Error in cleanup: {e}")
-
 @app.on_message(filters.command("filter") & filters.private)
 async def filter_text_file(client: Client, message: Message):
     try:
@@ -2707,7 +2148,22 @@ if __name__ == "__main__":
         logger.info(f"Server Health Management: {'Enabled' if health_manager.is_enabled else 'Disabled'}")
         logger.info(f"Default cooldown: {health_manager.default_cooldown} seconds")
         
-        app.run()
+        async def main():
+            await app.start()
+            await cover_store.load()
+            # Big files go up in parallel parts, stored thumbnails are reused on top
+            upload_engine.attach(app)
+            cover_store.attach(app)
+            await delivery_index.load()
+            await resume_interrupted_jobs(app)
+            await idle()
+            await upload_engine.close()
+            await http_engine.close()
+            await app.stop()
+        
+        app.run(main())
     except Exception as e:
         logger.error(f"Error starting bot: {e}")
         logger.error(traceback.format_exc())
+    finally:
+        execution_service.shutdown()
@@ -53,10 +53,44 @@ OWNER_ID = int(os.getenv("OWNER_ID"))
 
 # Worker Configuration
 WORKERS = int(os.getenv("WORKERS", "6"))
+# Concurrent ffmpeg/ffprobe processes, defaults to half the worker pool
+MEDIA_WORKERS = int(os.getenv("MEDIA_WORKERS", str(max(1, WORKERS // 2))))
+# Threads for chunk-sized disk reads and writes of downloads and uploads
+IO_WORKERS = int(os.getenv("IO_WORKERS", "4"))
+# Media tool priority (nice level for heavy ffmpeg jobs) and timeouts in seconds
+MEDIA_TOOL_NICE = int(os.getenv("MEDIA_TOOL_NICE", "10"))
+FFPROBE_TIMEOUT = int(os.getenv("FFPROBE_TIMEOUT", "30"))
+FFMPEG_TIMEOUT = int(os.getenv("FFMPEG_TIMEOUT", "120"))
+# Pick the most informative of several keyframes for thumbnails (needs numpy)
+THUMBNAIL_BEST_FRAME = os.getenv("THUMBNAIL_BEST_FRAME", "false").lower() == "true"
+
+# Batch Pipeline Configuration (per-stage concurrency and queue depth)
+DOWNLOAD_WORKERS = int(os.getenv("DOWNLOAD_WORKERS", "2"))
+POSTPROCESS_WORKERS = int(os.getenv("POSTPROCESS_WORKERS", "1"))
+UPLOAD_WORKERS = int(os.getenv("UPLOAD_WORKERS", "1"))
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "2"))
+
+# Upload Configuration (media connections to Telegram, most file parts in flight)
+UPLOAD_CONNECTIONS = int(os.getenv("UPLOAD_CONNECTIONS", "4"))
+UPLOAD_MAX_PARTS = int(os.getenv("UPLOAD_MAX_PARTS", "16"))
+
+# yt-dlp Extraction Cache (entries and seconds an info dict stays valid)
+EXTRACTION_CACHE_SIZE = int(os.getenv("EXTRACTION_CACHE_SIZE", "256"))
+EXTRACTION_CACHE_TTL = int(os.getenv("EXTRACTION_CACHE_TTL", "1800"))
 
 # Database Configuration
 DATABASE_URL = os.getenv("DATABASE_URL")
+# URLs uploaded before: "copy" re-sends the earlier message, "skip" leaves them out, "off" downloads again
+DEDUP_MODE = os.getenv("DEDUP_MODE", "copy").lower()
 
 # Download Configuration
 DOWNLOAD_DIR = "downloads"
-os.makedirs(DOWNLOAD_DIR, exist_ok=True) 
\ No newline at end of file
+os.makedirs(DOWNLOAD_DIR, exist_ok=True)
+
+# Disk Admission (free space kept in reserve, seconds a job may wait for space)
+DISK_RESERVE_MARGIN = int(os.getenv("DISK_RESERVE_MARGIN_MB", "512")) * 1024 * 1024
+DISK_WAIT_TIMEOUT = int(os.getenv("DISK_WAIT_TIMEOUT", "1800"))
+
+# Persistent state (job journal and caches), survives download cleanup
+DATA_DIR = os.getenv("DATA_DIR", "data")
+os.makedirs(DATA_DIR, exist_ok=True) 
\ No newline at end of file
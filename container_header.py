@@ -0,0 +1,310 @@
+import logging
+import os
+import struct
+from typing import Iterator, Optional, Tuple
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Header boxes/elements larger than this are not worth reading in Python
+MAX_HEADER_SIZE = 64 * 1024 * 1024
+
+MP4_TOP_LEVEL = {b"ftyp", b"moov", b"mdat", b"free", b"skip", b"wide", b"pdin", b"uuid"}
+
+# Matroska element IDs (marker bits kept)
+EBML_HEADER = 0x1A45DFA3
+MKV_SEGMENT = 0x18538067
+MKV_SEEK_HEAD = 0x114D9B74
+MKV_SEEK = 0x4DBB
+MKV_SEEK_ID = 0x53AB
+MKV_SEEK_POSITION = 0x53AC
+MKV_INFO = 0x1549A966
+MKV_TIMECODE_SCALE = 0x2AD7B1
+MKV_DURATION = 0x4489
+MKV_TRACKS = 0x1654AE6B
+MKV_TRACK_ENTRY = 0xAE
+MKV_TRACK_TYPE = 0x83
+MKV_CODEC_ID = 0x86
+MKV_VIDEO = 0xE0
+MKV_PIXEL_WIDTH = 0xB0
+MKV_PIXEL_HEIGHT = 0xBA
+MKV_CLUSTER = 0x1F43B675
+
+
+class ContainerInfo:
+    """Duration and video dimensions read from a container header"""
+    def __init__(self, container: str):
+        self.container = container
+        self.duration_ms = 0
+        self.width = 0
+        self.height = 0
+        self.video_codec = None
+        self.audio_codec = None
+
+    @property
+    def is_complete(self) -> bool:
+        return bool(self.duration_ms and self.width and self.height)
+
+
+def read_container_info(path: str) -> Optional[ContainerInfo]:
+    """Read duration and resolution from MP4/MOV or Matroska/WebM headers.
+
+    Only the header structures are read, never the media payload, so the
+    cost does not grow with the length of the video. Returns None for other
+    containers or damaged headers; callers fall back to ffprobe then.
+    """
+    try:
+        with open(path, "rb") as f:
+            magic = f.read(8)
+            if len(magic) < 8:
+                return None
+            if struct.unpack(">I", magic[:4])[0] == EBML_HEADER:
+                return _read_matroska(f)
+            if magic[4:8] in MP4_TOP_LEVEL:
+                return _read_mp4(f)
+    except Exception as e:
+        logger.debug(f"Container header not readable for {path}: {e}")
+    return None
+
+
+# MP4 / MOV
+
+def _iter_boxes(data: bytes, start: int, end: int) -> Iterator[Tuple[bytes, int, int]]:
+    """Yield (type, payload_start, payload_end) for the boxes in data[start:end]"""
+    pos = start
+    while pos + 8 <= end:
+        size, box_type = struct.unpack(">I4s", data[pos:pos + 8])
+        header = 8
+        if size == 1:
+            size = struct.unpack(">Q", data[pos + 8:pos + 16])[0]
+            header = 16
+        elif size == 0:
+            size = end - pos
+        if size < header or pos + size > end:
+            raise ValueError(f"Bad box size for {box_type!r}")
+        yield box_type, pos + header, pos + size
+        pos += size
+
+
+def _find_box(data: bytes, start: int, end: int, box_type: bytes) -> Optional[Tuple[int, int]]:
+    for found, payload_start, payload_end in _iter_boxes(data, start, end):
+        if found == box_type:
+            return payload_start, payload_end
+    return None
+
+
+def _read_mp4(f) -> Optional[ContainerInfo]:
+    file_size = os.fstat(f.fileno()).st_size
+    pos = 0
+    while pos + 8 <= file_size:
+        f.seek(pos)
+        header = f.read(16)
+        size, box_type = struct.unpack(">I4s", header[:8])
+        header_len = 8
+        if size == 1:
+            size = struct.unpack(">Q", header[8:16])[0]
+            header_len = 16
+        elif size == 0:
+            size = file_size - pos
+        if size < header_len:
+            return None
+        if box_type == b"moov":
+            if size > MAX_HEADER_SIZE:
+                return None
+            f.seek(pos + header_len)
+            moov = f.read(size - header_len)
+            return _parse_moov(moov)
+        # Skip mdat and everything else without reading it
+        pos += size
+    return None
+
+
+def _parse_moov(moov: bytes) -> Optional[ContainerInfo]:
+    info = ContainerInfo("mp4")
+    timescale = 0
+    track_duration = 0
+
+    for box_type, start, end in _iter_boxes(moov, 0, len(moov)):
+        if box_type == b"mvhd":
+            version = moov[start]
+            if version == 1:
+                timescale, duration = struct.unpack(">IQ", moov[start + 20:start + 32])
+            else:
+                timescale, duration = struct.unpack(">II", moov[start + 12:start + 20])
+            if timescale and duration != 0xFFFFFFFF and duration != 0xFFFFFFFFFFFFFFFF:
+                info.duration_ms = duration * 1000 // timescale
+        elif box_type == b"trak":
+            handler, codec, width, height, duration = _parse_trak(moov, start, end)
+            if handler == b"vide" and not info.width:
+                info.width, info.height = width, height
+                info.video_codec = codec
+                track_duration = max(track_duration, duration)
+            elif handler == b"soun" and not info.audio_codec:
+                info.audio_codec = codec
+
+    # Some muxers leave mvhd empty, the track header still has the length
+    if not info.duration_ms and timescale and track_duration:
+        info.duration_ms = track_duration * 1000 // timescale
+    return info
+
+
+def _parse_trak(data: bytes, start: int, end: int):
+    handler = codec = None
+    width = height = duration = 0
+    for box_type, s, e in _iter_boxes(data, start, end):
+        if box_type == b"tkhd":
+            version = data[s]
+            if version == 1:
+                duration = struct.unpack(">Q", data[s + 28:s + 36])[0]
+                base = s + 36
+            else:
+                duration = struct.unpack(">I", data[s + 20:s + 24])[0]
+                base = s + 24
+            # Skip reserved(8) layer(2) alternate_group(2) volume(2) reserved(2)
+            matrix = struct.unpack(">9i", data[base + 16:base + 52])
+            width, height = (v >> 16 for v in struct.unpack(">II", data[base + 52:base + 60]))
+            # A 90/270 degree rotation matrix swaps the displayed dimensions
+            if matrix[0] == 0 and abs(matrix[1]) == 0x10000:
+                width, height = height, width
+        elif box_type == b"mdia":
+            hdlr = _find_box(data, s, e, b"hdlr")
+            if hdlr:
+                handler = data[hdlr[0] + 8:hdlr[0] + 12]
+            minf = _find_box(data, s, e, b"minf")
+            stbl = minf and _find_box(data, minf[0], minf[1], b"stbl")
+            stsd = stbl and _find_box(data, stbl[0], stbl[1], b"stsd")
+            if stsd and stsd[1] - stsd[0] >= 16:
+                codec = data[stsd[0] + 12:stsd[0] + 16].decode("latin-1").strip()
+    return handler, codec, width, height, duration
+
+
+# Matroska / WebM
+
+def _read_vint(data: bytes, pos: int, keep_marker: bool) -> Tuple[int, int, bool]:
+    """Decode an EBML variable-length integer, returns (value, next_pos, unknown)"""
+    first = data[pos]
+    mask = 0x80
+    length = 1
+    while length <= 8 and not first & mask:
+        mask >>= 1
+        length += 1
+    if length > 8 or pos + length > len(data):
+        raise ValueError("Bad EBML variable-length integer")
+    value = first if keep_marker else first & (mask - 1)
+    for byte in data[pos + 1:pos + length]:
+        value = (value << 8) | byte
+    unknown = not keep_marker and value == (1 << (7 * length)) - 1
+    return value, pos + length, unknown
+
+
+def _iter_elements(data: bytes, start: int, end: int) -> Iterator[Tuple[int, int, int]]:
+    """Yield (id, payload_start, payload_end) for the elements in data[start:end]"""
+    pos = start
+    while pos < end:
+        element_id, pos, _ = _read_vint(data, pos, keep_marker=True)
+        size, pos, unknown = _read_vint(data, pos, keep_marker=False)
+        payload_end = end if unknown else pos + size
+        if payload_end > end:
+            raise ValueError(f"Element {element_id:#x} overruns its parent")
+        yield element_id, pos, payload_end
+        pos = payload_end
+
+
+def _read_element_header(f, pos: int) -> Tuple[int, Optional[int], int]:
+    """Read an element header at pos in the file, returns (id, size, payload_pos)"""
+    f.seek(pos)
+    header = f.read(12)
+    element_id, offset, _ = _read_vint(header, 0, keep_marker=True)
+    size, offset, unknown = _read_vint(header, offset, keep_marker=False)
+    return element_id, None if unknown else size, pos + offset
+
+
+def _read_uint(data: bytes, start: int, end: int) -> int:
+    return int.from_bytes(data[start:end], "big")
+
+
+def _read_matroska(f) -> Optional[ContainerInfo]:
+    file_size = os.fstat(f.fileno()).st_size
+    element_id, size, pos = _read_element_header(f, 0)
+    if element_id != EBML_HEADER or size is None:
+        return None
+    element_id, size, segment_start = _read_element_header(f, pos + size)
+    if element_id != MKV_SEGMENT:
+        return None
+    segment_end = file_size if size is None else min(file_size, segment_start + size)
+
+    info = ContainerInfo("matroska")
+    found = set()
+    seek_positions = {}
+    pos = segment_start
+    while pos < segment_end and found != {MKV_INFO, MKV_TRACKS}:
+        element_id, size, payload = _read_element_header(f, pos)
+        if element_id == MKV_CLUSTER or size is None:
+            # Media data starts here, anything else is only reachable via SeekHead
+            break
+        if element_id in (MKV_INFO, MKV_TRACKS, MKV_SEEK_HEAD) and size <= MAX_HEADER_SIZE:
+            f.seek(payload)
+            data = f.read(size)
+            if element_id == MKV_SEEK_HEAD:
+                seek_positions = _parse_seek_head(data)
+            else:
+                _parse_mkv_element(info, element_id, data)
+                found.add(element_id)
+        pos = payload + size
+
+    for element_id in (MKV_INFO, MKV_TRACKS):
+        if element_id not in found and element_id in seek_positions:
+            element_id_read, size, payload = _read_element_header(f, segment_start + seek_positions[element_id])
+            if element_id_read == element_id and size is not None and size <= MAX_HEADER_SIZE:
+                f.seek(payload)
+                _parse_mkv_element(info, element_id, f.read(size))
+    return info
+
+
+def _parse_seek_head(data: bytes) -> dict:
+    positions = {}
+    for element_id, start, end in _iter_elements(data, 0, len(data)):
+        if element_id != MKV_SEEK:
+            continue
+        seek_id = seek_position = None
+        for child_id, s, e in _iter_elements(data, start, end):
+            if child_id == MKV_SEEK_ID:
+                seek_id = _read_uint(data, s, e)
+            elif child_id == MKV_SEEK_POSITION:
+                seek_position = _read_uint(data, s, e)
+        if seek_id is not None and seek_position is not None:
+            positions[seek_id] = seek_position
+    return positions
+
+
+def _parse_mkv_element(info: ContainerInfo, element_id: int, data: bytes):
+    if element_id == MKV_INFO:
+        timecode_scale = 1000000
+        duration = 0.0
+        for child_id, s, e in _iter_elements(data, 0, len(data)):
+            if child_id == MKV_TIMECODE_SCALE:
+                timecode_scale = _read_uint(data, s, e)
+            elif child_id == MKV_DURATION:
+                duration = struct.unpack(">f" if e - s == 4 else ">d", data[s:e])[0]
+        info.duration_ms = int(duration * timecode_scale / 1000000)
+    elif element_id == MKV_TRACKS:
+        for child_id, start, end in _iter_elements(data, 0, len(data)):
+            if child_id != MKV_TRACK_ENTRY:
+                continue
+            track_type = codec = None
+            width = height = 0
+            for entry_id, s, e in _iter_elements(data, start, end):
+                if entry_id == MKV_TRACK_TYPE:
+                    track_type = _read_uint(data, s, e)
+                elif entry_id == MKV_CODEC_ID:
+                    codec = data[s:e].decode("ascii", "replace").rstrip("\x00")
+                elif entry_id == MKV_VIDEO:
+                    for video_id, vs, ve in _iter_elements(data, s, e):
+                        if video_id == MKV_PIXEL_WIDTH:
+                            width = _read_uint(data, vs, ve)
+                        elif video_id == MKV_PIXEL_HEIGHT:
+                            height = _read_uint(data, vs, ve)
+            if track_type == 1 and not info.width:
+                info.width, info.height, info.video_codec = width, height, codec
+            elif track_type == 2 and not info.audio_codec:
+                info.audio_codec = codec
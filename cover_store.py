@@ -0,0 +1,137 @@
+import logging
+import os
+import time
+from typing import Dict, Optional, Tuple
+
+from PIL import Image
+
+from config import DATA_DIR
+from database import db
+from executor import execution_service
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+THUMBNAIL_DIR = os.path.join(DATA_DIR, "thumbnails")
+
+# Telegram accepts JPEG thumbnails up to 320px a side and 200 KB
+MAX_SIDE = 320
+MAX_BYTES = 200 * 1024
+
+# Seconds an uploaded thumbnail is reused before it is sent again; Telegram
+# keeps uploaded parts for a limited time only
+UPLOAD_REUSE_TTL = 1800
+
+
+def prerender_thumbnail(source_path: str, dest_path: str) -> Tuple[int, int, int]:
+    """Fit an image to Telegram's thumbnail limits, returns (width, height, bytes)"""
+    with Image.open(source_path) as img:
+        img = img.convert("RGB")
+        img.thumbnail((MAX_SIDE, MAX_SIDE), Image.Resampling.LANCZOS)
+        tmp_path = f"{dest_path}.tmp"
+        for quality in (95, 90, 85, 75, 60):
+            img.save(tmp_path, "JPEG", quality=quality, optimize=True)
+            if os.path.getsize(tmp_path) <= MAX_BYTES:
+                break
+        os.replace(tmp_path, dest_path)
+        return img.width, img.height, os.path.getsize(dest_path)
+
+
+class CoverStore:
+    """Custom thumbnails kept on disk and indexed in the database.
+
+    Each thumbnail is rendered to Telegram's limits once, when it is set, and
+    survives restarts and download cleanup. attach() lets the client reuse a
+    stored thumbnail's upload, so a batch sends the image once, not per file.
+    """
+    def __init__(self, directory: str = THUMBNAIL_DIR):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._paths: Dict[int, str] = {}
+        self._uploads = {}
+
+    def _path_for(self, user_id: int) -> str:
+        return os.path.join(self.directory, f"{user_id}.jpg")
+
+    async def load(self):
+        """Index the stored thumbnails, from the database or else from disk"""
+        entries = await db.get_thumbnails()
+        if entries is None:
+            entries = [
+                {"user_id": int(name[:-4]), "path": os.path.join(self.directory, name)}
+                for name in os.listdir(self.directory)
+                if name.endswith(".jpg") and name[:-4].isdigit()
+            ]
+        for entry in entries:
+            if os.path.exists(entry["path"]):
+                self._paths[entry["user_id"]] = entry["path"]
+        if self._paths:
+            logger.info(f"Loaded {len(self._paths)} custom thumbnail(s)")
+
+    def get(self, user_id: int) -> Optional[str]:
+        path = self._paths.get(user_id)
+        if path and os.path.exists(path):
+            return path
+        return None
+
+    async def set(self, user_id: int, source_path: str) -> str:
+        """Render source_path as the user's thumbnail and index it"""
+        path = self._path_for(user_id)
+        width, height, size = await execution_service.run(prerender_thumbnail, source_path, path)
+        self._forget_upload(path)
+        self._paths[user_id] = path
+        await db.set_thumbnail(user_id, path, width, height, size)
+        logger.info(f"Stored thumbnail for user {user_id}: {width}x{height}, {size} bytes")
+        return path
+
+    async def delete(self, user_id: int) -> bool:
+        path = self._paths.pop(user_id, None)
+        if not path:
+            return False
+        self._forget_upload(path)
+        if os.path.exists(path):
+            os.remove(path)
+        await db.delete_thumbnail(user_id)
+        return True
+
+    def _upload_key(self, path) -> Optional[Tuple[str, int]]:
+        """(path, mtime) for stored thumbnails, None for every other upload"""
+        if not isinstance(path, str):
+            return None
+        real_path = os.path.realpath(path)
+        if os.path.dirname(real_path) != os.path.realpath(self.directory):
+            return None
+        try:
+            return real_path, os.stat(real_path).st_mtime_ns
+        except OSError:
+            return None
+
+    def _forget_upload(self, path: str):
+        real_path = os.path.realpath(path)
+        for key in [key for key in self._uploads if key[0] == real_path]:
+            del self._uploads[key]
+
+    def attach(self, client):
+        """Serve repeated uploads of a stored thumbnail from its first InputFile.
+
+        pyrogram uploads the thumb path on every send through save_file, so the
+        client's save_file is wrapped; other files pass straight through.
+        """
+        upload = client.save_file
+
+        async def save_file(path, *args, **kwargs):
+            key = self._upload_key(path)
+            if key is None or args or kwargs:
+                return await upload(path, *args, **kwargs)
+            cached = self._uploads.get(key)
+            if cached and time.time() - cached[1] < UPLOAD_REUSE_TTL:
+                return cached[0]
+            input_file = await upload(path)
+            self._uploads[key] = (input_file, time.time())
+            return input_file
+
+        client.save_file = save_file
+
+
+# Create a single instance
+cover_store = CoverStore()
@@ -8,6 +8,7 @@ class Database:
         self.db = self.client.url_uploader
         self.users = self.db.users
         self.downloads = self.db.downloads
+        self.thumbnails = self.db.thumbnails
 
     async def add_user(self, user_id: int, username: str, batch_name: str):
         try:
@@ -52,5 +53,124 @@ class Database:
             print(f"Database error in update_download_status: {e}")
             return False
 
+    async def ensure_indexes(self):
+        try:
+            # One delivered upload per normalized URL, pending entries are not indexed
+            await self.downloads.create_index(
+                "url_key",
+                unique=True,
+                partialFilterExpression={"status": "uploaded"}
+            )
+            await self.downloads.create_index([("user_id", 1), ("timestamp", -1)])
+            # Content hashes of uploads, to reuse their Telegram file_id
+            await self.downloads.create_index("checksum", sparse=True)
+            await self.downloads.create_index("content_hash", sparse=True)
+            return True
+        except Exception as e:
+            print(f"Database error in ensure_indexes: {e}")
+            return False
+
+    async def record_upload(self, record: dict):
+        try:
+            await self.downloads.update_one(
+                {"url_key": record["url_key"], "status": "uploaded"},
+                {"$set": record},
+                upsert=True
+            )
+            return True
+        except Exception as e:
+            print(f"Database error in record_upload: {e}")
+            return False
+
+    async def find_uploads(self, url_keys: list):
+        try:
+            return await self.downloads.find(
+                {"url_key": {"$in": url_keys}, "status": "uploaded"},
+                {"_id": 0}
+            ).to_list(None)
+        except Exception as e:
+            print(f"Database error in find_uploads: {e}")
+            return None
+
+    async def get_upload_keys(self):
+        try:
+            cursor = self.downloads.find({"status": "uploaded"}, {"_id": 0, "url_key": 1})
+            return [doc["url_key"] async for doc in cursor]
+        except Exception as e:
+            print(f"Database error in get_upload_keys: {e}")
+            return None
+
+    async def delete_upload(self, url_key: str):
+        try:
+            await self.downloads.delete_one({"url_key": url_key, "status": "uploaded"})
+            return True
+        except Exception as e:
+            print(f"Database error in delete_upload: {e}")
+            return False
+
+    async def find_upload_by_checksum(self, checksum: str):
+        try:
+            return await self.downloads.find_one(
+                {"checksum": checksum, "status": "uploaded", "media.file_id": {"$exists": True}},
+                {"_id": 0}
+            )
+        except Exception as e:
+            print(f"Database error in find_upload_by_checksum: {e}")
+            return None
+
+    async def find_upload_by_content_hash(self, content_hash: str):
+        try:
+            return await self.downloads.find_one(
+                {"content_hash": content_hash, "status": "uploaded", "media.file_id": {"$exists": True}},
+                {"_id": 0}
+            )
+        except Exception as e:
+            print(f"Database error in find_upload_by_content_hash: {e}")
+            return None
+
+    async def clear_file_id(self, file_id: str):
+        try:
+            await self.downloads.update_many(
+                {"media.file_id": file_id, "status": "uploaded"},
+                {"$unset": {"media": ""}}
+            )
+            return True
+        except Exception as e:
+            print(f"Database error in clear_file_id: {e}")
+            return False
+
+    async def set_thumbnail(self, user_id: int, path: str, width: int, height: int, size: int):
+        try:
+            await self.thumbnails.update_one(
+                {"user_id": user_id},
+                {"$set": {
+                    "path": path,
+                    "width": width,
+                    "height": height,
+                    "size": size,
+                    "updated_at": time.time()
+                }},
+                upsert=True
+            )
+            return True
+        except Exception as e:
+            print(f"Database error in set_thumbnail: {e}")
+            return False
+
+    async def get_thumbnails(self):
+        try:
+            return await self.thumbnails.find({}, {"_id": 0, "user_id": 1, "path": 1}).to_list(None)
+        except Exception as e:
+            print(f"Database error in get_thumbnails: {e}")
+            return None
+
+    async def delete_thumbnail(self, user_id: int):
+        try:
+            await self.thumbnails.delete_one({"user_id": user_id})
+            return True
+        except Exception as e:
+            print(f"Database error in delete_thumbnail: {e}")
+            return False
+
 # Create a single instance
 db = Database() 
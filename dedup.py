@@ -0,0 +1,209 @@
+import asyncio
+import hashlib
+import logging
+import math
+import time
+from collections import OrderedDict
+from typing import Iterable, Optional
+
+from database import db
+from extraction_cache import normalize_url as normalize_link
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Delivery records kept in memory, misses confirmed by the database included
+CACHE_SIZE = 4096
+
+# The Bloom filter is sized for twice the stored keys, and never below this
+BLOOM_MIN_CAPACITY = 100000
+BLOOM_ERROR_RATE = 0.01
+
+# Keys per $in query when a batch is prefetched
+PREFETCH_CHUNK = 1000
+
+
+def normalize_url(url: str) -> str:
+    """Canonical form of a list URL, as the extraction cache normalizes links.
+    The decryption key stays, the same file under another key is another
+    delivery."""
+    url, _, key = url.strip().partition('*')
+    normalized = normalize_link(url)
+    return f"{normalized}*{key}" if key else normalized
+
+
+def url_key(url: str) -> str:
+    return hashlib.blake2b(normalize_url(url).encode(), digest_size=16).hexdigest()
+
+
+class BloomFilter:
+    """Membership test over url keys with false positives only"""
+    def __init__(self, capacity: int, error_rate: float = BLOOM_ERROR_RATE):
+        self.capacity = capacity
+        self.size = max(64, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key: str):
+        # The key is already a hash, its halves seed double hashing
+        digest = bytes.fromhex(key)
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, key: str):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+class DeliveryIndex:
+    """Successful uploads by normalized URL, backed by the downloads collection.
+
+    A Bloom filter of every delivered key answers most lookups for new URLs
+    without a database round trip; records that were looked up stay in an
+    LRU. Until the filter is loaded every miss goes to the database.
+    """
+    def __init__(self, cache_size: int = CACHE_SIZE):
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[str, Optional[dict]]" = OrderedDict()
+        self._bloom: Optional[BloomFilter] = None
+        self._reloading = False
+
+    async def load(self):
+        await db.ensure_indexes()
+        await self._load_bloom()
+
+    async def _load_bloom(self):
+        keys = await db.get_upload_keys()
+        if keys is None:
+            logger.warning("Could not load delivered URLs, lookups go to the database")
+            return
+        bloom = BloomFilter(max(BLOOM_MIN_CAPACITY, len(keys) * 2))
+        for key in keys:
+            bloom.add(key)
+        self._bloom = bloom
+        logger.info(f"Loaded {len(keys)} delivered URL(s)")
+
+    def _remember(self, key: str, record: Optional[dict]):
+        self._cache[key] = record
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def _may_exist(self, key: str) -> bool:
+        return self._bloom is None or key in self._bloom
+
+    async def prefetch(self, urls: Iterable[str]):
+        """Resolve a batch's possible duplicates with a few $in queries"""
+        keys = list(dict.fromkeys(
+            key for key in map(url_key, urls) if key not in self._cache and self._may_exist(key)
+        ))
+        # Items run in list order, more than the cache holds would evict each other
+        keys = keys[:self.cache_size]
+        for start in range(0, len(keys), PREFETCH_CHUNK):
+            chunk = keys[start:start + PREFETCH_CHUNK]
+            records = await db.find_uploads(chunk)
+            if records is None:
+                return
+            found = {record["url_key"]: record for record in records}
+            for key in chunk:
+                self._remember(key, found.get(key))
+
+    async def lookup(self, url: str) -> Optional[dict]:
+        """The delivery record for url, or None if it was never uploaded"""
+        key = url_key(url)
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            return self._cache[key]
+        if not self._may_exist(key):
+            return None
+        records = await db.find_uploads([key])
+        if records is None:
+            return None
+        record = records[0] if records else None
+        self._remember(key, record)
+        return record
+
+    async def record(
+        self,
+        url: str,
+        filename: str,
+        size: int,
+        chat_id: int,
+        message_id: int,
+        user_id: int,
+        checksum: Optional[str] = None,
+        media: Optional[dict] = None,
+        content_hash: Optional[str] = None,
+    ):
+        """Store a delivery. media holds the uploaded file's Telegram file_id
+        and metadata; checksum (sampled) and content_hash (whole file) identify
+        the content it was uploaded from."""
+        key = url_key(url)
+        record = {
+            "url_key": key,
+            "url": normalize_url(url),
+            "filename": filename,
+            "size": size,
+            "chat_id": chat_id,
+            "message_id": message_id,
+            "user_id": user_id,
+            "timestamp": time.time(),
+        }
+        if checksum:
+            record["checksum"] = checksum
+        if content_hash:
+            record["content_hash"] = content_hash
+        if media:
+            record["media"] = media
+        await db.record_upload(record)
+        self._remember(key, record)
+        if self._bloom is not None:
+            self._bloom.add(key)
+            if self._bloom.count > self._bloom.capacity and not self._reloading:
+                asyncio.create_task(self._grow())
+
+    async def _grow(self):
+        self._reloading = True
+        try:
+            await self._load_bloom()
+        finally:
+            self._reloading = False
+
+    def _cached_content(self, field: str, value: str) -> Optional[dict]:
+        for record in reversed(self._cache.values()):
+            if record and record.get(field) == value and record.get("media"):
+                return record
+        return None
+
+    async def may_have_content(self, checksum: str) -> bool:
+        """Whether a delivery with a file_id shares the sampled checksum. Samples
+        can match for different files, this only decides if a full hash is
+        worth computing; deliveries are stored with one from then on."""
+        return bool(self._cached_content("checksum", checksum) or await db.find_upload_by_checksum(checksum))
+
+    async def lookup_content(self, content_hash: str) -> Optional[dict]:
+        """A delivery of the same whole-file content under any URL, with a file_id to send"""
+        return self._cached_content("content_hash", content_hash) or await db.find_upload_by_content_hash(content_hash)
+
+    async def drop_media(self, file_id: str):
+        """Forget a file_id Telegram rejected, the deliveries themselves stay"""
+        for record in self._cache.values():
+            if record and record.get("media", {}).get("file_id") == file_id:
+                del record["media"]
+        await db.clear_file_id(file_id)
+
+    async def forget(self, url: str):
+        """Drop a delivery whose message can no longer be copied"""
+        key = url_key(url)
+        self._remember(key, None)
+        await db.delete_upload(key)
+
+
+# Create a single instance
+delivery_index = DeliveryIndex()
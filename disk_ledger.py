@@ -0,0 +1,178 @@
+import asyncio
+import logging
+import shutil
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from config import DOWNLOAD_DIR, DISK_RESERVE_MARGIN, DISK_WAIT_TIMEOUT
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Reservations older than this are assumed leaked and dropped
+STALE_RESERVATION_SECONDS = 6 * 3600
+
+# How often a queued job re-checks free space that was freed outside the ledger
+RECHECK_INTERVAL = 30
+
+
+def format_size(size: int) -> str:
+    return f"{size / (1024 * 1024):.1f} MB"
+
+
+class DiskSpaceError(Exception):
+    """A download cannot fit on the disk"""
+
+
+class Reservation:
+    """Disk space promised to one job, from admission until its files are removed"""
+    def __init__(self, ledger: "DiskLedger", size: int, label: str, order: Optional[Tuple[Any, int]] = None):
+        self.ledger = ledger
+        self.size = size
+        self.label = label
+        self.order = order
+        self.written = 0  # Updated by the download as bytes land on disk
+        self.created_at = time.time()
+        self.released = False
+
+    @property
+    def outstanding(self) -> int:
+        """Bytes promised but not yet visible in the free-space figure"""
+        return max(0, self.size - self.written)
+
+    def release(self):
+        if not self.released:
+            self.released = True
+            self.ledger._release(self)
+
+
+class DiskLedger:
+    """Admission control for downloads based on their expected size.
+
+    Every job reserves its expected size before any bytes are fetched. A
+    job that fits next to the space already promised to running jobs is
+    admitted right away; one that would fit once running jobs finish and
+    clean up is queued; one that cannot fit even then is rejected.
+
+    Jobs of one batch pass an order of (batch, position). The batch uploads
+    in list order, so a later item never frees its space before an earlier
+    one is done: its reservation does not count as space to wait for, and
+    while an earlier item waits, later ones are not admitted ahead of it.
+    """
+    def __init__(self, path: str = DOWNLOAD_DIR, margin: int = DISK_RESERVE_MARGIN,
+                 wait_timeout: float = DISK_WAIT_TIMEOUT):
+        self.path = path
+        self.margin = margin
+        self.wait_timeout = wait_timeout
+        self._reservations = set()
+        self._waiting = []
+        self._lock = threading.Lock()
+        self._changed = asyncio.Event()
+
+        # Metrics
+        self.admitted = 0
+        self.queued = 0
+        self.rejected = 0
+
+    def _drop_stale(self):
+        cutoff = time.time() - STALE_RESERVATION_SECONDS
+        with self._lock:
+            stale = [r for r in self._reservations if r.created_at < cutoff]
+            for reservation in stale:
+                logger.warning(f"Dropping stale disk reservation for {reservation.label}")
+                self._reservations.discard(reservation)
+
+    def available(self) -> int:
+        """Free bytes not yet promised to a running job"""
+        free = shutil.disk_usage(self.path).free
+        with self._lock:
+            outstanding = sum(r.outstanding for r in self._reservations)
+        return free - outstanding - self.margin
+
+    @staticmethod
+    def _behind(order: Optional[Tuple[Any, int]], other: Optional[Tuple[Any, int]]) -> bool:
+        """Whether other is a later item of the same batch as order"""
+        return order is not None and other is not None and other[0] == order[0] and other[1] > order[1]
+
+    async def reserve(self, size: int, label: str = "", order: Optional[Tuple[Any, int]] = None) -> Reservation:
+        """Admit a job of `size` bytes, waiting for space if other jobs hold it.
+
+        Raises DiskSpaceError when the job cannot fit even after every job it
+        may wait for has finished, or when it waited too long.
+        """
+        deadline = time.time() + self.wait_timeout
+        waiting = False
+        try:
+            while True:
+                self._drop_stale()
+                self._changed.clear()
+                available = self.available()
+                with self._lock:
+                    earlier_waiting = any(self._behind(other, order) for other in self._waiting)
+                    # Space the running jobs give back, later items of this batch excluded
+                    freeable = sum(
+                        r.size for r in self._reservations if not self._behind(order, r.order)
+                    )
+                if size <= available and not earlier_waiting:
+                    reservation = Reservation(self, size, label, order)
+                    with self._lock:
+                        self._reservations.add(reservation)
+                    self.admitted += 1
+                    if size:
+                        logger.info(f"Reserved {format_size(size)} for {label}")
+                    return reservation
+
+                if size > available + freeable:
+                    # Nothing that can finish first frees enough, waiting cannot help
+                    self.rejected += 1
+                    raise DiskSpaceError(
+                        f"Not enough disk space: need {format_size(size)}, "
+                        f"{format_size(max(0, available))} available"
+                    )
+
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    self.rejected += 1
+                    raise DiskSpaceError(
+                        f"Timed out waiting for {format_size(size)} of disk space"
+                    )
+
+                if not waiting:
+                    waiting = True
+                    self.queued += 1
+                    with self._lock:
+                        self._waiting.append(order)
+                    logger.info(f"Queued {label}: needs {format_size(size)}, {format_size(max(0, available))} available")
+                try:
+                    await asyncio.wait_for(self._changed.wait(), timeout=min(remaining, RECHECK_INTERVAL))
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            if waiting:
+                with self._lock:
+                    self._waiting.remove(order)
+                # Later items of the batch may have been held back by this one
+                self._changed.set()
+
+    def _release(self, reservation: Reservation):
+        with self._lock:
+            self._reservations.discard(reservation)
+        self._changed.set()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            reserved = sum(r.outstanding for r in self._reservations)
+            active = len(self._reservations)
+        return {
+            "active": active,
+            "reserved": reserved,
+            "available": self.available(),
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "rejected": self.rejected,
+        }
+
+
+# Create a single instance
+disk_ledger = DiskLedger()
@@ -3,7 +3,7 @@ import yt_dlp
 from config import DOWNLOAD_DIR
 import time
 import asyncio
-from urllib.parse import urlparse
+from urllib.parse import urlparse, unquote
 import requests
 import re
 import logging
@@ -14,10 +14,18 @@ import shutil
 from pathlib import Path
 import json
 import traceback
-from concurrent.futures import ThreadPoolExecutor
 from Crypto.Cipher import AES
 from Crypto.Util.Padding import unpad
 from typing import Callable, Optional, Tuple, Dict, Any
+from progress import ProgressChannel
+from executor import execution_service
+from journal import journal
+from http_engine import http_engine, is_direct_file_url
+from extraction_cache import extraction_cache, is_stale_error
+from tuner import connection_tuner, RetryCounter
+from disk_ledger import disk_ledger, DiskSpaceError
+from file_events import file_events
+from metadata_handler import get_video_metadata
 
 # Configure modern terminal logging with cleaner format
 class ColoredFormatter(logging.Formatter):
@@ -95,11 +103,17 @@ class VideoInfo:
         self.height = 0
         self.duration = 0
         self.thumbnail = None
+        self.thumbnail_url = None  # Remote thumbnail, fetched later only if needed
         self.title = None
         self.format = None
 
-# Global event loop for callbacks
-loop = asyncio.get_event_loop()
+# Size of the XOR-encrypted header on "*key" videos
+ENCRYPTED_HEADER_SIZE = 28
+
+VIDEO_EXTENSIONS = ('.mkv', '.mp4', '.avi', '.mov', '.wmv', '.flv', '.webm')
+
+# yt-dlp format selection, shared by the size preflight and the download
+YTDLP_FORMAT = "best/bestvideo+bestaudio"
 
 class Downloader:
     def __init__(
@@ -108,22 +122,38 @@ class Downloader:
         filename: str,
         progress_callback: Optional[Callable] = None,
         download_path: str = "downloads",
+        job_id: Optional[str] = None,
+        disk_order: Optional[Tuple[Any, int]] = None,
     ):
         self.url = url
         self.filename = filename
         self.progress_callback = progress_callback
         self.download_path = download_path
+        self.job_id = job_id  # Journal entry used to resume after a restart
+        self.interrupted = False
         self.download_started = False
         self.download_canceled = False
         self.is_encrypted = False
         self.encryption_key = None
         self.video_info = VideoInfo()
-        self.event_loop = loop
+        self.progress_channel = None
         self.update_interval = 1.0  # Reduced to 1 second for smoother progress
         self.last_update_time = 0
         self.last_progress = 0
         self.download_finished = False
-        self.executor = ThreadPoolExecutor(max_workers=2)
+        
+        # Throughput sample for the per-host connection tuner
+        self.connections = None
+        self.resets = 0
+        self.download_start_time = 0
+        self.first_bytes = 0
+        self.last_bytes = 0
+        
+        # Disk space admitted for this job and the preflight probe behind it
+        self.reservation = None
+        self.disk_order = disk_order  # (batch, position) for in-order disk admission
+        self.remote = None
+        self.finalized = None
         
         os.makedirs(download_path, exist_ok=True)
         
@@ -134,54 +164,56 @@ class Downloader:
                 self.encryption_key = url_parts[1]
                 self.is_encrypted = True
 
+    @staticmethod
+    def _xor_header(header, key):
+        """XOR the encrypted header bytes with the key"""
+        if isinstance(key, str):
+            key = key.encode('utf-8')
+        
+        decrypted_header = bytearray(len(header))
+        key_length = len(key)
+        
+        for i in range(len(header)):
+            if i < key_length:
+                decrypted_header[i] = header[i] ^ key[i]
+            else:
+                decrypted_header[i] = header[i] ^ i
+        
+        return bytes(decrypted_header)
+
     def decrypt_vid_data(self, vid_data, key):
         """Decrypt video data using XOR with key"""
         try:
             # Convert input to bytes if it's not already
             if isinstance(vid_data, (list, bytearray)):
                 vid_data = bytes(vid_data)
-            if isinstance(key, str):
-                key = key.encode('utf-8')
             
             # Only decrypt the first 28 bytes (header)
-            header = vid_data[:28]
-            rest = vid_data[28:]
-            
-            # XOR decryption of header
-            decrypted_header = bytearray(len(header))
-            key_length = len(key)
-            
-            for i in range(len(header)):
-                if i < key_length:
-                    decrypted_header[i] = header[i] ^ key[i]
-                else:
-                    decrypted_header[i] = header[i] ^ i
+            header = vid_data[:ENCRYPTED_HEADER_SIZE]
+            rest = vid_data[ENCRYPTED_HEADER_SIZE:]
             
             # Combine decrypted header with rest of file
-            return bytes(decrypted_header) + rest
+            return self._xor_header(header, key) + rest
         except Exception as e:
             logger.error(f"Decryption error: {str(e)}")
             logger.error(traceback.format_exc())
             raise
 
-    def get_file_extension(self):
-        parsed_url = urlparse(self.url)
-        path = parsed_url.path.lower()
-        
-        # Handle encrypted video URLs
-        if self.encryption_key:
-            # Extract original extension from URL
-            ext_match = re.search(r'\.(mkv|mp4|avi|mov|wmv|flv|webm)(?:\*|$)', self.url.lower())
-            if ext_match:
-                return f".{ext_match.group(1)}"
-            return '.mkv'  # Default for encrypted videos
+    def decrypt_file_in_place(self, file_path, key):
+        """Decrypt the encrypted header of a downloaded file in place.
         
-        # Keep original extension for videos
-        if any(path.endswith(ext) for ext in ['.mkv', '.mp4', '.avi', '.mov', '.wmv', '.flv', '.webm']):
-            ext = os.path.splitext(path)[1].lower()
-            return ext if ext else '.mkv'
-        
-        return '.mkv'  # Default to .mkv
+        Only the header bytes are read and patched back with a positional
+        write, so memory use is constant and the file is never copied.
+        """
+        try:
+            with open(file_path, "r+b") as f:
+                header = f.read(ENCRYPTED_HEADER_SIZE)
+                f.seek(0)
+                f.write(self._xor_header(header, key))
+        except Exception as e:
+            logger.error(f"Decryption error: {str(e)}")
+            logger.error(traceback.format_exc())
+            raise
 
     async def send_initial_progress(self):
         """Send initial progress update to initialize UI"""
@@ -209,7 +241,18 @@ class Downloader:
                 
                 if not self.download_started:
                     self.download_started = True
+                    self.download_start_time = time.time()
+                    self.first_bytes = downloaded_bytes
                     logger.info("⚡ DOWNLOADING")
+                self.last_bytes = downloaded_bytes
+                if self.reservation:
+                    self.reservation.written = downloaded_bytes
+                
+                if self.job_id:
+                    journal.update_progress(
+                        self.job_id, downloaded_bytes, total_bytes, d.get("tmpfilename"),
+                        d.get("control_file")
+                    )
                 
                 if total_bytes > 0:
                     progress = min((downloaded_bytes / total_bytes) * 100, 99.9)  # Cap at 99.9%
@@ -224,165 +267,141 @@ class Downloader:
                     # Minimal terminal log
                     logger.info(f"⬇️ {progress:.1f}%")
                     
-                    # Always call progress callback for UI updates
-                    if self.progress_callback:
-                        try:
-                            coro = self.progress_callback(
-                                progress, speed, total_bytes, downloaded_bytes, 
-                                d.get("eta", None), filename
-                            )
-                            if self.event_loop and self.event_loop.is_running():
-                                future = asyncio.run_coroutine_threadsafe(coro, self.event_loop)
-                                future.result(timeout=1)  # 1 second timeout
-                            else:
-                                asyncio.run(coro)
-                        except Exception:
-                            pass
+                    # Hand the sample to the UI consumer without waiting on it
+                    if self.progress_channel:
+                        self.progress_channel.publish(
+                            progress, speed, total_bytes, downloaded_bytes,
+                            d.get("eta", None), filename
+                        )
             
             elif status == "finished":
                 if not self.download_finished:  # Prevent multiple finish notifications
                     self.download_finished = True
+                    self.last_bytes = d.get("total_bytes") or d.get("downloaded_bytes") or self.last_bytes
                     logger.info("✅ Download Complete")
                     
                     # Final progress update
-                    if self.progress_callback:
-                        try:
-                            coro = self.progress_callback(100, 0, total_bytes, total_bytes, 0, filename)
-                            if self.event_loop and self.event_loop.is_running():
-                                future = asyncio.run_coroutine_threadsafe(coro, self.event_loop)
-                                future.result(timeout=1)
-                            else:
-                                asyncio.run(coro)
-                        except Exception:
-                            pass
+                    if self.progress_channel:
+                        total_bytes = d.get("total_bytes") or d.get("downloaded_bytes", 0)
+                        self.progress_channel.publish(
+                            100, 0, total_bytes, total_bytes, 0, d.get("filename", "")
+                        )
                     
                     # Update video info silently
                     if "info_dict" in d:
                         info = d["info_dict"]
                         self.video_info.title = info.get("title", "")
                         self.video_info.format = info.get("format", "")
-                        
-                        if "thumbnail" in info and info["thumbnail"]:
-                            try:
-                                thumbnail_path = os.path.join(
-                                    self.download_path, 
-                                    f"{os.path.basename(d.get('filename', 'video'))}_thumb.jpg"
-                                )
-                                ydl_opts = {
-                                    "quiet": True,
-                                    "no_warnings": True,
-                                    "outtmpl": thumbnail_path,
-                                }
-                                with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                                    ydl.download([info["thumbnail"]])
-                                
-                                if os.path.exists(thumbnail_path):
-                                    self.video_info.thumbnail = thumbnail_path
-                            except Exception:
-                                pass
+                        self.video_info.thumbnail_url = info.get("thumbnail")
         except Exception:
             pass
 
     async def extract_video_metadata(self, video_path):
-        """Extract video metadata using ffprobe"""
+        """Fill video_info from the shared metadata cache, one ffprobe per file"""
+        if os.path.splitext(video_path)[1].lower() not in VIDEO_EXTENSIONS:
+            return
         try:
-            # Extract video metadata using ffprobe with more detailed format
-            cmd = [
-                "ffprobe",
-                "-v", "error",
-                "-select_streams", "v:0",
-                "-show_entries", "stream=width,height,duration:format=duration",
-                "-of", "json",
-                video_path
-            ]
-            
-            # Run ffprobe
-            result = subprocess.run(cmd, capture_output=True, text=True)
-            
-            if result.returncode == 0:
-                # Parse the output
-                try:
-                    data = json.loads(result.stdout)
-                    
-                    # Try to get duration from stream first, then format
-                    duration = None
-                    if 'streams' in data and len(data['streams']) > 0:
-                        stream = data['streams'][0]
-                        self.video_info.width = int(stream.get('width', 0))
-                        self.video_info.height = int(stream.get('height', 0))
-                        duration = stream.get('duration')
-                    
-                    # If duration not in stream, try format section
-                    if not duration and 'format' in data:
-                        duration = data['format'].get('duration')
-                    
-                    # Convert duration to float if found
-                    if duration:
-                        self.video_info.duration = int(float(duration))
-                    
-                    # If still no duration, try another ffprobe command specifically for duration
-                    if not self.video_info.duration:
-                        duration_cmd = [
-                            "ffprobe",
-                            "-v", "error",
-                            "-show_entries", "format=duration",
-                            "-of", "default=noprint_wrappers=1:nokey=1",
-                            video_path
-                        ]
-                        duration_result = subprocess.run(duration_cmd, capture_output=True, text=True)
-                        if duration_result.returncode == 0 and duration_result.stdout.strip():
-                            self.video_info.duration = int(float(duration_result.stdout))
-                    
-                    logger.info(
-                        f"Extracted video metadata: {self.video_info.width}x{self.video_info.height}, "
-                        f"Duration: {self.video_info.duration}s"
-                    )
-                except json.JSONDecodeError:
-                    logger.warning("Could not parse ffprobe output as JSON")
-                except ValueError as ve:
-                    logger.warning(f"Invalid number format in metadata: {ve}")
-            else:
-                logger.warning(f"ffprobe failed with error: {result.stderr}")
-            
-            # Generate thumbnail
-            thumbnail_path = os.path.join(self.download_path, f"{Path(video_path).stem}_thumb.jpg")
-            cmd = [
-                "ffmpeg",
-                "-i", video_path,
-                "-ss", "00:00:01",  # Take thumbnail from first second
-                "-vframes", "1",
-                "-vf", "scale=320:-1",  # 320px width, keep aspect ratio
-                "-y",  # Overwrite without asking
-                thumbnail_path
-            ]
-            
-            # Run ffmpeg
-            result = subprocess.run(cmd, capture_output=True)
-            
-            if result.returncode == 0 and os.path.exists(thumbnail_path):
-                self.video_info.thumbnail = thumbnail_path
-                logger.info(f"Generated thumbnail: {thumbnail_path}")
-            else:
-                logger.warning("Could not generate thumbnail")
-        
+            # The thumbnail is left to post-processing, which reuses this probe
+            metadata = await get_video_metadata(video_path, with_thumbnail=False)
+            self.video_info.width = metadata.width or 0
+            self.video_info.height = metadata.height or 0
+            self.video_info.duration = metadata.duration or 0
+            logger.info(
+                f"Extracted video metadata: {self.video_info.width}x{self.video_info.height}, "
+                f"Duration: {self.video_info.duration}s"
+            )
         except Exception as e:
             logger.error(f"Error extracting video metadata: {e}")
             logger.error(traceback.format_exc())
 
     async def download(self) -> Tuple[bool, str, VideoInfo]:
         """Download the file with progress tracking"""
+        if self.progress_callback:
+            self.progress_channel = ProgressChannel(self.progress_callback).start()
+        success = False
+        try:
+            # Admit the job against free disk space before fetching any bytes
+            try:
+                expected_size = await self.expected_size()
+                self.reservation = await disk_ledger.reserve(expected_size, self.filename, self.disk_order)
+            except DiskSpaceError as e:
+                logger.error(f"❌ {str(e)}")
+                return False, str(e), self.video_info
+            
+            result = await self._download()
+            success = result[0]
+            return result
+        finally:
+            # On success the space stays reserved until the caller removes the files
+            if not success:
+                self.release_reservation()
+            if self.progress_channel:
+                await self.progress_channel.close()
+
+    def release_reservation(self):
+        """Give the job's disk reservation back, once its files are gone"""
+        if self.reservation:
+            self.reservation.release()
+            self.reservation = None
+
+    async def expected_size(self) -> int:
+        """Learn the download size without fetching the payload, 0 if unknown"""
+        try:
+            if is_direct_file_url(self.url):
+                self.remote = await http_engine.probe(self.url)
+                return self.remote.size
+            
+            def preflight():
+                ydl_opts = {
+                    "quiet": True,
+                    "no_warnings": True,
+                    "format": YTDLP_FORMAT,
+                    "socket_timeout": 15,
+                    "no_check_certificate": True,
+                }
+                with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+                    info, _ = self._extract_info(ydl)
+                return info
+            
+            # The info dict is cached, so the download reuses this extraction
+            info = await execution_service.run(preflight)
+            if not info:
+                return 0
+            formats = info.get("requested_formats") or [info]
+            size = sum(f.get("filesize") or f.get("filesize_approx") or 0 for f in formats)
+            if len(formats) > 1:
+                size *= 2  # Merging writes a second copy before the parts are removed
+            return int(size)
+        except Exception as e:
+            logger.warning(f"Size preflight failed: {str(e)}")
+            return 0
+
+    def _extract_info(self, ydl) -> Tuple[Optional[Dict[str, Any]], bool]:
+        """Info dict from the cache, or a fresh extraction that gets cached"""
+        info = extraction_cache.get(self.url)
+        if info is not None:
+            logger.info("Using cached extraction")
+            return info, True
+        info = ydl.extract_info(self.url, download=False)
+        info = ydl.sanitize_info(info)
+        extraction_cache.put(self.url, info)
+        return info, False
+
+    async def _download(self) -> Tuple[bool, str, VideoInfo]:
         try:
             if self.progress_callback:
                 await self.send_initial_progress()
             
-            output_path = os.path.join(self.download_path, self.filename)
+            output_path = self.ensure_proper_extension(os.path.join(self.download_path, self.filename))
             logger.info(f"📥 Processing: {os.path.basename(self.url)}")
             
             final_path = None
+            # Anyone awaiting the output waits for the finalized signal below
+            file_events.expect(output_path)
             
             if self.is_encrypted:
                 logger.info("🔒 Encrypted Video Detected")
-                download_success, temp_file = await self._download_with_ytdlp()
+                download_success, temp_file = await self._fetch()
                 
                 if not download_success:
                     logger.error("❌ Download Failed")
@@ -390,40 +409,35 @@ class Downloader:
                 
                 logger.info("🔑 Decrypting Video...")
                 try:
-                    output_path = self.ensure_proper_extension(output_path)
-                    with open(temp_file, "rb") as f:
-                        encrypted_data = f.read()
+                    self.decrypt_file_in_place(temp_file, self.encryption_key)
                     
-                    decrypted_data = self.decrypt_vid_data(encrypted_data, self.encryption_key)
-                    
-                    with open(output_path, "wb") as f:
-                        f.write(decrypted_data)
+                    # Rename instead of rewriting, the payload is untouched
+                    if temp_file != output_path:
+                        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+                        shutil.move(temp_file, output_path)
                     
                     logger.info("✅ Decryption Complete")
                     final_path = output_path
+                    self.finalized = await file_events.finalize(final_path)
                     
                     await self.extract_video_metadata(final_path)
-                    
-                    if os.path.exists(temp_file):
-                        os.remove(temp_file)
                 except Exception as e:
                     logger.error(f"❌ Decryption Failed: {str(e)}")
                     return False, f"Decryption failed: {str(e)}", self.video_info
             else:
-                download_success, temp_file = await self._download_with_ytdlp()
+                download_success, temp_file = await self._fetch()
                 
                 if not download_success:
                     logger.error("❌ Download Failed")
                     return False, f"Download failed: {temp_file}", self.video_info
                 
-                output_path = self.ensure_proper_extension(output_path)
-                
                 if temp_file != output_path and os.path.exists(temp_file):
                     os.makedirs(os.path.dirname(output_path), exist_ok=True)
                     shutil.move(temp_file, output_path)
                     logger.info("📦 File Moved to Final Location")
                 
                 final_path = output_path
+                self.finalized = await file_events.finalize(final_path)
                 await self.extract_video_metadata(final_path)
             
             return True, final_path, self.video_info
@@ -431,6 +445,9 @@ class Downloader:
         except Exception as e:
             logger.error(f"❌ Process Error: {str(e)}")
             return False, str(e), self.video_info
+        finally:
+            if not self.finalized:
+                file_events.abandon(output_path)
 
     def ensure_proper_extension(self, filepath):
         """Ensure the file has the correct extension based on the URL"""
@@ -446,32 +463,101 @@ class Downloader:
         
         return filepath
 
+    async def _fetch(self) -> Tuple[bool, str]:
+        """Fetch direct file URLs natively, everything else through yt-dlp"""
+        self.connections = connection_tuner.choose(self.url)
+        try:
+            if is_direct_file_url(self.url):
+                success, result = await self._download_with_http()
+                if success or self.download_canceled:
+                    return success, result
+                logger.warning(f"Direct download failed ({result}), falling back to yt-dlp")
+                self._record_throughput()
+                self.download_started = False
+                self.resets = 0
+            return await self._download_with_ytdlp()
+        finally:
+            self._record_throughput()
+
+    def _record_throughput(self):
+        """Report the download's throughput and resets to the connection tuner"""
+        if self.connections and (self.download_started or self.resets):
+            seconds = time.time() - self.download_start_time if self.download_started else 0
+            connection_tuner.record(
+                self.url, self.connections, max(0, self.last_bytes - self.first_bytes),
+                seconds, self.resets
+            )
+
+    async def _download_with_http(self) -> Tuple[bool, str]:
+        """Download a direct file URL with the segmented HTTP engine"""
+        name = unquote(os.path.basename(urlparse(self.url).path)) or "download"
+        name = re.sub(r'[\\/:*?"<>|]', "_", name)[-150:]
+        temp_path = os.path.join(self.download_path, name)
+        logger.info(f"Starting direct download: {self.url}")
+
+        def on_progress(downloaded, total, speed):
+            eta = (total - downloaded) / speed if speed and total else None
+            self.progress_hook({
+                "status": "downloading",
+                "downloaded_bytes": downloaded,
+                "total_bytes": total,
+                "speed": speed,
+                "eta": eta,
+                "filename": temp_path,
+                "tmpfilename": f"{temp_path}.part",
+                "control_file": f"{temp_path}.part.state",
+            })
+
+        stats = {"retries": 0}
+        try:
+            size = await http_engine.download(
+                self.url, temp_path, progress=on_progress, segments=self.connections,
+                stats=stats, remote=self.remote
+            )
+            if size <= 0:
+                return False, "Downloaded file is empty or missing"
+            # A file split into fewer segments than the tuner asked for says
+            # nothing about that connection count
+            if stats.get("segments", self.connections) < self.connections:
+                self.connections = None
+            self.progress_hook({"status": "finished", "total_bytes": size, "filename": temp_path})
+            return True, temp_path
+        except Exception as e:
+            logger.error(f"Direct download error: {str(e)}")
+            return False, str(e)
+        finally:
+            self.resets += stats["retries"]
+
     async def _download_with_ytdlp(self) -> Tuple[bool, str]:
         """Run yt-dlp download in a separate thread"""
         logger.info(f"Starting download: {self.url}")
         
+        connections = str(self.connections or 16)
+        retry_counter = RetryCounter()
         try:
             outtmpl = os.path.join(self.download_path, "%(title).100s.%(ext)s")
             
             ydl_opts = {
                 "quiet": True,
                 "no_warnings": True,
+                "noprogress": True,
+                "logger": retry_counter,  # Counts connection retries for the tuner
                 "progress_hooks": [self.progress_hook],
                 "outtmpl": outtmpl,
-                "format": "best/bestvideo+bestaudio",
+                "format": YTDLP_FORMAT,
                 "retries": 3,
                 "fragment_retries": 3,
                 "retry_sleep": lambda n: 3,  # Fixed retry delay
-                "concurrent_fragment_downloads": 16,  # Good balance for high-speed
+                "concurrent_fragment_downloads": int(connections),  # Tuned per host
                 "buffersize": 16777216,  # 16MB buffer
                 "http_chunk_size": 16777216,  # 16MB chunks
                 "throttledratelimit": None,  # Remove speed limit completely
                 "external_downloader": "aria2c",
                 "external_downloader_args": [
-                    "-x", "16",  # 16 connections
-                    "-s", "16",  # 16 splits
+                    "-x", connections,  # Connections, tuned per host
+                    "-s", connections,  # Splits, one per connection
                     "-k", "16M",  # 16MB min split
-                    "--max-connection-per-server=16",
+                    f"--max-connection-per-server={connections}",
                     "--min-split-size=16M",
                     "--max-concurrent-downloads=16",
                     "--max-overall-download-limit=0",  # No speed limit
@@ -486,7 +572,8 @@ class Downloader:
                     "--stream-piece-selector=geom",  # Better piece selection for high speed
                     "--enable-http-keep-alive=true",
                     "--http-accept-gzip=true",
-                    "--uri-selector=adaptive"  # Better URI selection for high speed
+                    "--uri-selector=adaptive",  # Better URI selection for high speed
+                    "--continue=true",  # Resume from the .aria2 control file
                 ],
                 "socket_timeout": 15,  # Increased timeout for high-speed transfers
                 "no_check_certificate": True,
@@ -496,7 +583,21 @@ class Downloader:
             def run_download():
                 try:
                     with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                        info = ydl.extract_info(self.url, download=True)
+                        info, cached = self._extract_info(ydl)
+                        if not info:
+                            return False, "Could not extract video info"
+                        try:
+                            info = ydl.process_ie_result(info, download=True)
+                        except yt_dlp.utils.DownloadError as e:
+                            if is_stale_error(e):
+                                extraction_cache.invalidate(self.url)
+                            if not cached or self.download_canceled:
+                                raise
+                            # Media URLs in the cached info may have expired, extract again
+                            logger.warning(f"Cached extraction failed ({e}), extracting again")
+                            extraction_cache.invalidate(self.url)
+                            info, cached = self._extract_info(ydl)
+                            info = ydl.process_ie_result(info, download=True)
                         if info:
                             filename = ydl.prepare_filename(info)
                             self.video_info.width = info.get("width", 0)
@@ -516,14 +617,19 @@ class Downloader:
             
             # Run download with timeout
             result = await asyncio.wait_for(
-                loop.run_in_executor(self.executor, run_download),
+                execution_service.run(run_download),
                 timeout=3600  # 1 hour timeout
             )
             return result
             
         except asyncio.TimeoutError:
-            logger.error("Download timed out after 1 hour")
+            # Abort the worker thread but keep the partial files for a resume
+            self.download_canceled = True
+            self.interrupted = True
+            logger.error("Download timed out after 1 hour, partial data kept for resume")
             return False, "Download timed out"
         except Exception as e:
             logger.error(f"Download setup error: {str(e)}")
-            return False, str(e) 
+            return False, str(e)
+        finally:
+            self.resets += retry_counter.resets
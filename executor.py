@@ -0,0 +1,125 @@
+import asyncio
+import functools
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Any, Callable, Dict
+
+from config import WORKERS, MEDIA_WORKERS, IO_WORKERS
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+
+class ExecutionService:
+    """Process-wide bounded thread pool and media-tool process slots.
+
+    Every blocking job (yt-dlp extraction, file I/O) and every external
+    media tool call goes through one shared instance, so the number of
+    threads and child processes stays flat no matter how many downloads
+    are in flight. Chunk-sized disk I/O has a small pool of its own, so
+    long blocking jobs cannot starve downloads and uploads of their writes
+    and reads.
+    """
+    def __init__(self, max_workers: int, max_processes: int, io_workers: int = IO_WORKERS):
+        self.max_workers = max(1, max_workers)
+        self.max_processes = max(1, max_processes)
+        self.io_workers = max(1, io_workers)
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix="uploader-worker"
+        )
+        self._io_executor = ThreadPoolExecutor(
+            max_workers=self.io_workers, thread_name_prefix="uploader-io"
+        )
+        self._process_slots = asyncio.Semaphore(self.max_processes)
+        self._lock = threading.Lock()
+        self._is_shutdown = False
+
+        # Metrics
+        self.submitted = 0
+        self.started = 0
+        self.completed = 0
+        self.failed = 0
+        self.processes_waiting = 0
+        self.processes_running = 0
+        self.processes_completed = 0
+
+    async def run(self, func: Callable, *args, **kwargs) -> Any:
+        """Run a blocking callable on the shared pool and await its result"""
+        if self._is_shutdown:
+            raise RuntimeError("Execution service is shut down")
+
+        with self._lock:
+            self.submitted += 1
+
+        def call():
+            with self._lock:
+                self.started += 1
+            try:
+                result = func(*args, **kwargs)
+            except BaseException:
+                with self._lock:
+                    self.failed += 1
+                raise
+            with self._lock:
+                self.completed += 1
+            return result
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(call))
+
+    async def run_io(self, func: Callable, *args) -> Any:
+        """Run a short disk read or write on the I/O pool and await its result"""
+        if self._is_shutdown:
+            raise RuntimeError("Execution service is shut down")
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._io_executor, functools.partial(func, *args))
+
+    @asynccontextmanager
+    async def process_slot(self):
+        """Hold one of the global media-tool process slots"""
+        self.processes_waiting += 1
+        try:
+            await self._process_slots.acquire()
+        finally:
+            self.processes_waiting -= 1
+        self.processes_running += 1
+        try:
+            yield
+        finally:
+            self.processes_running -= 1
+            self.processes_completed += 1
+            self._process_slots.release()
+
+    def stats(self) -> Dict[str, int]:
+        """Snapshot of queue depth and throughput counters"""
+        with self._lock:
+            queued = self.submitted - self.started
+            running = self.started - self.completed - self.failed
+            return {
+                "max_workers": self.max_workers,
+                "io_workers": self.io_workers,
+                "queued": queued,
+                "running": running,
+                "completed": self.completed,
+                "failed": self.failed,
+                "max_processes": self.max_processes,
+                "processes_waiting": self.processes_waiting,
+                "processes_running": self.processes_running,
+                "processes_completed": self.processes_completed,
+                "threads": threading.active_count(),
+            }
+
+    def shutdown(self, wait: bool = True):
+        """Stop accepting work and release the pool threads"""
+        if self._is_shutdown:
+            return
+        self._is_shutdown = True
+        logger.info("Shutting down execution service")
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+        self._io_executor.shutdown(wait=wait, cancel_futures=True)
+
+
+# Create a single instance
+execution_service = ExecutionService(WORKERS, MEDIA_WORKERS)
@@ -0,0 +1,129 @@
+import copy
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+from urllib.parse import parse_qsl, urlencode, urlparse, urlunparse
+
+from config import EXTRACTION_CACHE_SIZE, EXTRACTION_CACHE_TTL
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Query parameters that never change what a URL points at
+TRACKING_PARAMS = {"fbclid", "gclid", "si", "feature"}
+
+# Signed media URLs carry their own expiry, e.g. googlevideo "expire=1700000000"
+EXPIRY_PARAMS = ("expire", "expires", "exp")
+
+# Refresh this many seconds before a signed URL would expire
+EXPIRY_MARGIN = 120
+
+# Download errors that mean the cached media URLs are no longer valid
+STALE_ERROR_RE = re.compile(r"HTTP Error (403|410)|\b403 Forbidden\b|\b410 Gone\b")
+
+
+def normalize_url(url: str) -> str:
+    """Canonical form of a URL, so equivalent links share one cache entry"""
+    parsed = urlparse(url.strip())
+    scheme = parsed.scheme.lower()
+    netloc = parsed.netloc.lower()
+    if (scheme == "http" and netloc.endswith(":80")) or (scheme == "https" and netloc.endswith(":443")):
+        netloc = netloc.rsplit(":", 1)[0]
+    query = sorted(
+        (k, v) for k, v in parse_qsl(parsed.query, keep_blank_values=True)
+        if k.lower() not in TRACKING_PARAMS and not k.lower().startswith("utm_")
+    )
+    return urlunparse((scheme, netloc, parsed.path or "/", parsed.params, urlencode(query), ""))
+
+
+def is_stale_error(error: Any) -> bool:
+    """True when a download error means the extracted URLs went stale"""
+    return bool(STALE_ERROR_RE.search(str(error)))
+
+
+def _media_expiry(info: Dict[str, Any]) -> Optional[float]:
+    """Earliest expiry timestamp found in the selected media URLs"""
+    urls = [info.get("url")]
+    urls += [f.get("url") for f in info.get("requested_formats") or []]
+    expiry = None
+    for url in filter(None, urls):
+        for key, value in parse_qsl(urlparse(url).query):
+            if key.lower() in EXPIRY_PARAMS and value.isdigit():
+                expiry = min(expiry or float(value), float(value))
+    return expiry
+
+
+class ExtractionCache:
+    """TTL and size-bounded LRU cache of yt-dlp info dicts.
+
+    Entries are keyed by the normalized page URL. An entry expires after the
+    configured TTL, or earlier when the media URLs inside it are signed with
+    a shorter expiry. Callers get a deep copy, because yt-dlp mutates the
+    info dict while downloading.
+    """
+    def __init__(self, max_entries: int = EXTRACTION_CACHE_SIZE, ttl: float = EXTRACTION_CACHE_TTL):
+        self.max_entries = max(1, max_entries)
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        # Metrics
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, url: str) -> Optional[Dict[str, Any]]:
+        key = normalize_url(url)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.time():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            info = entry[1]
+        return copy.deepcopy(info)
+
+    def put(self, url: str, info: Dict[str, Any]):
+        if not info or info.get("_type", "video") != "video":
+            return
+        expires_at = time.time() + self.ttl
+        media_expiry = _media_expiry(info)
+        if media_expiry:
+            expires_at = min(expires_at, media_expiry - EXPIRY_MARGIN)
+        if expires_at <= time.time():
+            return
+        key = normalize_url(url)
+        with self._lock:
+            self._entries[key] = (expires_at, copy.deepcopy(info))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, url: str):
+        with self._lock:
+            if self._entries.pop(normalize_url(url), None) is not None:
+                self.invalidations += 1
+                logger.info(f"Invalidated cached extraction for {url}")
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+# Create a single instance
+extraction_cache = ExtractionCache()
@@ -0,0 +1,125 @@
+import asyncio
+import hashlib
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from executor import execution_service
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Bytes hashed from the start, middle and end of a file for its checksum
+SAMPLE_SIZE = 1024 * 1024
+
+# Read size when hashing a whole file
+HASH_CHUNK_SIZE = 4 * 1024 * 1024
+
+# Longest a consumer waits for a file that is still being written
+FINALIZE_TIMEOUT = 600
+
+MAX_TRACKED_FILES = 512
+
+
+def sampled_checksum(path: str, size: int) -> str:
+    """blake2b over the size and three 1 MiB samples, cheap even for huge files"""
+    digest = hashlib.blake2b(str(size).encode(), digest_size=16)
+    with open(path, "rb") as f:
+        for offset in sorted({0, max(0, size // 2 - SAMPLE_SIZE // 2), max(0, size - SAMPLE_SIZE)}):
+            f.seek(offset)
+            digest.update(f.read(SAMPLE_SIZE))
+    return digest.hexdigest()
+
+
+def full_checksum(path: str) -> str:
+    """blake2b over the whole file, for when two files must really be the same"""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class FinalizedFile:
+    """A file that its writer has closed for good"""
+    def __init__(self, path: str, size: int, checksum: str):
+        self.path = path
+        self.size = size
+        self.checksum = checksum
+        self.finalized_at = time.time()
+
+
+class FileEvents:
+    """"File finalized" signals from the downloader to post-processing.
+
+    The downloader marks a path as pending while it writes and finalizes it
+    with its size and a sampled checksum once the file is complete. Consumers
+    await the signal instead of polling the size or sleeping. A file that
+    nobody marked as pending is already complete and is finalized on the
+    spot.
+    """
+    def __init__(self):
+        self._files: "OrderedDict[str, FinalizedFile]" = OrderedDict()
+        self._pending = {}
+
+    @staticmethod
+    def _key(path: str) -> str:
+        return os.path.realpath(path)
+
+    def expect(self, path: str):
+        """Mark a path as being written, consumers wait until it is finalized"""
+        key = self._key(path)
+        self._files.pop(key, None)
+        if key not in self._pending:
+            self._pending[key] = asyncio.Event()
+
+    async def finalize(self, path: str) -> FinalizedFile:
+        """Record the finished file and wake everyone waiting for it"""
+        key = self._key(path)
+        size = os.path.getsize(path)
+        checksum = await execution_service.run(sampled_checksum, path, size)
+        finalized = FinalizedFile(path, size, checksum)
+        self._files[key] = finalized
+        self._files.move_to_end(key)
+        while len(self._files) > MAX_TRACKED_FILES:
+            self._files.popitem(last=False)
+        event = self._pending.pop(key, None)
+        if event:
+            event.set()
+        logger.info(f"File finalized: {os.path.basename(path)} ({size} bytes, {checksum[:12]})")
+        return finalized
+
+    def abandon(self, path: str):
+        """The writer gave up, release anyone waiting on the path"""
+        event = self._pending.pop(self._key(path), None)
+        if event:
+            event.set()
+
+    async def wait(self, path: str, timeout: float = FINALIZE_TIMEOUT) -> Optional[FinalizedFile]:
+        """The finalized record for path, or None if the file never completed"""
+        key = self._key(path)
+        event = self._pending.get(key)
+        if event:
+            try:
+                await asyncio.wait_for(event.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                logger.error(f"Timed out waiting for {path} to be finalized")
+                return None
+
+        finalized = self._files.get(key)
+        if finalized:
+            if os.path.exists(path) and os.path.getsize(path) == finalized.size:
+                return finalized
+            logger.warning(f"{path} changed after it was finalized")
+        if not os.path.exists(path):
+            return None
+        return await self.finalize(path)
+
+    def get(self, path: str) -> Optional[FinalizedFile]:
+        return self._files.get(self._key(path))
+
+
+# Create a single instance
+file_events = FileEvents()
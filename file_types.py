@@ -0,0 +1,263 @@
+import asyncio
+import logging
+import mimetypes
+import re
+import time
+from collections import OrderedDict
+from typing import Optional
+from urllib.parse import unquote, urlsplit
+
+import aiohttp
+
+from http_engine import http_engine
+
+try:
+    import magic
+except ImportError:  # libmagic missing, the signature table below still works
+    magic = None
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+VIDEO_EXTENSIONS = ('.mp4', '.mkv', '.avi', '.mov', '.wmv', '.flv', '.webm', '.m4v', '.3gp')
+
+# Kind of a file by extension, for URLs and local paths alike
+EXTENSION_KINDS = {
+    **{ext: 'video' for ext in VIDEO_EXTENSIONS},
+    '.m3u8': 'stream', '.mpd': 'stream',
+    '.pdf': 'pdf',
+    '.zip': 'zip',
+    '.rar': 'archive', '.7z': 'archive', '.tar': 'archive', '.gz': 'archive',
+    '.mp3': 'audio', '.m4a': 'audio', '.aac': 'audio', '.ogg': 'audio', '.wav': 'audio',
+    '.jpg': 'image', '.jpeg': 'image', '.png': 'image', '.gif': 'image', '.webp': 'image',
+    '.html': 'page', '.htm': 'page',
+}
+
+# Content types by prefix; generic ones like application/octet-stream are
+# not listed and lead to sniffing the first bytes
+MIME_KINDS = (
+    ('video/', 'video'),
+    ('application/pdf', 'pdf'),
+    ('application/zip', 'zip'),
+    ('application/x-zip', 'zip'),
+    ('application/vnd.apple.mpegurl', 'stream'),
+    ('application/x-mpegurl', 'stream'),
+    ('audio/mpegurl', 'stream'),
+    ('audio/x-mpegurl', 'stream'),
+    ('application/dash+xml', 'stream'),
+    ('application/x-rar', 'archive'),
+    ('application/vnd.rar', 'archive'),
+    ('application/x-7z-compressed', 'archive'),
+    ('audio/', 'audio'),
+    ('image/', 'image'),
+    ('text/html', 'page'),
+    ('application/xhtml', 'page'),
+)
+
+# Magic numbers for when libmagic is unavailable: (offset, bytes, mime)
+SIGNATURES = (
+    (0, b'%PDF-', 'application/pdf'),
+    (0, b'PK\x03\x04', 'application/zip'),
+    (0, b'\x1aE\xdf\xa3', 'video/x-matroska'),
+    (4, b'ftyp', 'video/mp4'),
+    (0, b'FLV', 'video/x-flv'),
+    (0, b'#EXTM3U', 'application/vnd.apple.mpegurl'),
+    (0, b'<!DOCTYPE html', 'text/html'),
+    (0, b'<html', 'text/html'),
+)
+
+# Preferred extensions where mimetypes guesses an unusual one
+MIME_EXTENSIONS = {
+    'video/mp4': '.mp4',
+    'video/x-matroska': '.mkv',
+    'video/quicktime': '.mov',
+    'video/x-flv': '.flv',
+    'application/pdf': '.pdf',
+}
+
+SNIFF_BYTES = 2048
+PROBE_TIMEOUT = 15
+
+# URL patterns whose type was probed, and how long a probe stays valid
+CACHE_SIZE = 2048
+CACHE_TTL = 6 * 3600
+
+# Probes that must agree before a pattern answers for its other URLs
+TRUST_AFTER = 2
+
+# Path segments that are ids or tokens rather than structure
+TOKEN_SEGMENT = re.compile(r'[A-Za-z0-9_-]{16,}')
+DIGITS = re.compile(r'\d+')
+
+
+class FileType:
+    """What a URL or file is: kind (video, pdf, zip, ...), a mime type and the
+    extension to save it under, when known"""
+    def __init__(self, kind: str, mime: Optional[str] = None, extension: Optional[str] = None):
+        self.kind = kind
+        self.mime = mime
+        self.extension = extension
+
+    def __repr__(self):
+        return f"FileType({self.kind!r}, {self.mime!r}, {self.extension!r})"
+
+
+def extension_of(url_or_path: str) -> str:
+    """Lower-case extension of a path or of a URL's path, without query or key"""
+    path = url_or_path.split('*', 1)[0]
+    # Plain string slicing, this runs for every line of every list
+    scheme_end = path.find('://')
+    if scheme_end != -1:
+        slash = path.find('/', scheme_end + 3)
+        path = path[slash:].split('?', 1)[0].split('#', 1)[0] if slash != -1 else ''
+        if '%' in path:
+            path = unquote(path)
+    name = path.rpartition('/')[2]
+    dot = name.rfind('.')
+    return name[dot:].lower() if dot > 0 else ''
+
+
+def kind_for_extension(url_or_path: str) -> Optional[str]:
+    """Kind from the extension table, None when the extension says nothing"""
+    return EXTENSION_KINDS.get(extension_of(url_or_path))
+
+
+def kind_for_mime(mime: Optional[str]) -> Optional[str]:
+    if not mime:
+        return None
+    mime = mime.split(';', 1)[0].strip().lower()
+    for prefix, kind in MIME_KINDS:
+        if mime.startswith(prefix):
+            return kind
+    return None
+
+
+def sniff_mime(data: bytes) -> Optional[str]:
+    """Mime type of a file from its first bytes"""
+    if magic is not None:
+        try:
+            return magic.from_buffer(data, mime=True)
+        except Exception as e:
+            logger.debug(f"libmagic failed: {e}")
+    for offset, signature, mime in SIGNATURES:
+        if data[offset:offset + len(signature)] == signature:
+            return mime
+    return None
+
+
+def file_type_for_mime(mime: Optional[str]) -> Optional[FileType]:
+    kind = kind_for_mime(mime)
+    if kind is None:
+        return None
+    mime = mime.split(';', 1)[0].strip().lower()
+    extension = MIME_EXTENSIONS.get(mime) or mimetypes.guess_extension(mime)
+    return FileType(kind, mime, extension)
+
+
+def url_pattern(url: str) -> str:
+    """host/path with numbers and id-like segments wildcarded, so the files
+    of one CDN layout share a cache entry"""
+    parts = urlsplit(url.split('*', 1)[0])
+    segments = [
+        '*' if TOKEN_SEGMENT.fullmatch(segment) else DIGITS.sub('#', segment)
+        for segment in parts.path.split('/')
+    ]
+    return f"{(parts.hostname or '').lower()}{'/'.join(segments)}"
+
+
+class FileTypeClassifier:
+    """One answer to "what is behind this URL".
+
+    The extension table decides whenever the extension is known. Otherwise
+    the server's Content-Type is asked with a HEAD, and when that is generic
+    the first bytes are fetched with a range request and sniffed. Probe
+    results are memoized per host and path pattern: once TRUST_AFTER probes
+    of a pattern agree, its other URLs are answered without a request. A
+    pattern whose probes disagree, like a /download?id= endpoint serving
+    both videos and PDFs, keeps being probed per URL.
+    """
+    def __init__(self, cache_size: int = CACHE_SIZE, ttl: int = CACHE_TTL):
+        self.cache_size = cache_size
+        self.ttl = ttl
+        # pattern -> [file type or None once probes disagreed, agreeing probes, time]
+        self._cache: "OrderedDict[str, list]" = OrderedDict()
+        self._probes = {}
+
+    def cached(self, url: str) -> Optional[FileType]:
+        pattern = url_pattern(url)
+        entry = self._cache.get(pattern)
+        if entry is None:
+            return None
+        if time.time() - entry[2] > self.ttl:
+            del self._cache[pattern]
+            return None
+        self._cache.move_to_end(pattern)
+        return entry[0] if entry[1] >= TRUST_AFTER else None
+
+    def _store(self, url: str, file_type: FileType):
+        pattern = url_pattern(url)
+        entry = self._cache.get(pattern)
+        if entry is None:
+            self._cache[pattern] = [file_type, 1, time.time()]
+        elif entry[0] is not None and entry[0].kind == file_type.kind:
+            entry[1] += 1
+        else:
+            entry[0] = None
+        self._cache.move_to_end(pattern)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    async def classify(self, url: str, encrypted: bool = False) -> FileType:
+        """Type of the file behind url, 'other' when nothing tells"""
+        kind = kind_for_extension(url)
+        if kind:
+            return FileType(kind, mimetypes.guess_type(f"x{extension_of(url)}")[0], extension_of(url))
+
+        file_type = self.cached(url)
+        if file_type:
+            return file_type
+
+        # Concurrent lookups of one URL share a single probe
+        target = url.split('*', 1)[0]
+        probe = self._probes.get(target)
+        if probe is None:
+            probe = asyncio.ensure_future(self._probe(target, encrypted))
+            self._probes[target] = probe
+            probe.add_done_callback(lambda _: self._probes.pop(target, None))
+            file_type = await asyncio.shield(probe)
+            if file_type is not None:
+                self._store(url, file_type)
+        else:
+            file_type = await asyncio.shield(probe)
+        return file_type or FileType('other')
+
+    async def _probe(self, url: str, encrypted: bool) -> Optional[FileType]:
+        session = await http_engine.session()
+        timeout = aiohttp.ClientTimeout(total=PROBE_TIMEOUT)
+        try:
+            mime = None
+            async with session.head(url, allow_redirects=True, timeout=timeout) as resp:
+                if resp.status < 400:
+                    mime = resp.headers.get("Content-Type")
+            file_type = file_type_for_mime(mime)
+            # Encrypted files start with scrambled bytes, sniffing them is useless
+            if file_type or encrypted:
+                logger.info(f"Type of {url_pattern(url)} from Content-Type {mime}: {file_type}")
+                return file_type
+
+            headers = {"Range": f"bytes=0-{SNIFF_BYTES - 1}"}
+            async with session.get(url, headers=headers, allow_redirects=True, timeout=timeout) as resp:
+                if resp.status >= 400:
+                    return None
+                data = await resp.content.read(SNIFF_BYTES)
+            mime = sniff_mime(data)
+            file_type = file_type_for_mime(mime) or FileType('other', mime)
+            logger.info(f"Type of {url_pattern(url)} from its first bytes: {file_type}")
+            return file_type
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.warning(f"Could not probe the type of {url}: {e}")
+            return None
+
+
+# Create a single instance
+file_types = FileTypeClassifier()
@@ -0,0 +1,344 @@
+import asyncio
+import json
+import logging
+import os
+import re
+import time
+from typing import Callable, Dict, List, Optional
+from urllib.parse import unquote, urlparse
+
+import aiohttp
+
+from executor import execution_service
+from tuner import CONNECTION_STEPS
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Extensions that are plain files on an HTTP server, no extractor needed
+DIRECT_FILE_EXTENSIONS = {
+    ".mp4", ".mkv", ".avi", ".mov", ".wmv", ".flv", ".webm", ".m4v", ".3gp",
+    ".pdf", ".zip", ".rar", ".7z", ".mp3", ".m4a", ".jpg", ".jpeg", ".png",
+}
+
+# Hosts that always need a yt-dlp extractor even when the path looks like a file
+EXTRACTOR_HOSTS = ("youtube.com", "youtu.be", "vimeo.com", "dailymotion.com", "drive.google.com")
+
+USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/120.0 Safari/537.36"
+)
+
+
+def is_direct_file_url(url: str) -> bool:
+    """True when the URL points straight at a file rather than a web page or playlist"""
+    try:
+        parsed = urlparse(url.split("*", 1)[0])
+        if parsed.scheme not in ("http", "https"):
+            return False
+        host = parsed.netloc.lower()
+        if any(host == h or host.endswith("." + h) for h in EXTRACTOR_HOSTS):
+            return False
+        ext = os.path.splitext(unquote(parsed.path).lower())[1]
+        return ext in DIRECT_FILE_EXTENSIONS
+    except Exception:
+        return False
+
+
+class RangeNotSupported(Exception):
+    """The server ignored a Range request"""
+
+
+class RemoteFile:
+    """Result of a preflight probe"""
+    def __init__(self, url: str):
+        self.url = url
+        self.size = 0
+        self.accept_ranges = False
+        self.content_type = None
+        self.filename = None
+
+
+class HttpEngine:
+    """Segmented range-request downloader on a pooled aiohttp session.
+
+    Files are split into parallel segments sized from Content-Length, each
+    written with positional writes into a preallocated .part file. Every
+    segment retries on its own from the last byte it wrote, and segment
+    offsets are checkpointed to a .state file so an interrupted download
+    resumes where it stopped.
+    """
+    def __init__(
+        self,
+        max_connections: int = 64,
+        # Up to the connection tuner's largest step, so every step it tries is real
+        connections_per_host: int = max(CONNECTION_STEPS),
+        chunk_size: int = 1024 * 1024,
+        min_segment_size: int = 8 * 1024 * 1024,
+        max_segments: int = max(CONNECTION_STEPS),
+        retries: int = 3,
+    ):
+        self.max_connections = max_connections
+        self.connections_per_host = connections_per_host
+        self.chunk_size = chunk_size
+        self.min_segment_size = min_segment_size
+        self.max_segments = max_segments
+        self.retries = retries
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    async def session(self) -> aiohttp.ClientSession:
+        """Shared session, created on first use inside the running loop"""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.max_connections,
+                limit_per_host=self.connections_per_host,
+                ttl_dns_cache=300,
+                ssl=False,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=None, sock_connect=15, sock_read=30),
+                headers={"User-Agent": USER_AGENT},
+            )
+        return self._session
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def probe(self, url: str) -> RemoteFile:
+        """Learn size, range support and type with a HEAD, or a 1-byte GET"""
+        session = await self.session()
+        remote = RemoteFile(url)
+        try:
+            async with session.head(url, allow_redirects=True) as resp:
+                if resp.status < 400:
+                    self._read_headers(remote, resp)
+        except aiohttp.ClientError:
+            pass
+
+        if not remote.size or not remote.accept_ranges:
+            async with session.get(url, headers={"Range": "bytes=0-0"}, allow_redirects=True) as resp:
+                resp.raise_for_status()
+                self._read_headers(remote, resp)
+                if resp.status == 206:
+                    remote.accept_ranges = True
+                    match = re.search(r"/(\d+)$", resp.headers.get("Content-Range", ""))
+                    if match:
+                        remote.size = int(match.group(1))
+                else:
+                    remote.accept_ranges = False
+        return remote
+
+    @staticmethod
+    def _read_headers(remote: RemoteFile, resp: aiohttp.ClientResponse):
+        remote.url = str(resp.url)
+        remote.content_type = resp.headers.get("Content-Type", remote.content_type)
+        if resp.status == 200 and resp.headers.get("Content-Length"):
+            remote.size = int(resp.headers["Content-Length"])
+        if resp.headers.get("Accept-Ranges", "").lower() == "bytes":
+            remote.accept_ranges = True
+        disposition = resp.headers.get("Content-Disposition", "")
+        match = re.search(r'filename\*?=(?:UTF-8\'\')?"?([^";]+)"?', disposition)
+        if match:
+            remote.filename = unquote(match.group(1))
+
+    def plan_segments(self, size: int, segments: Optional[int] = None) -> List[List[int]]:
+        """Split [0, size) into [start, end, done] segments"""
+        if segments is None:
+            segments = size // self.min_segment_size
+        count = max(1, min(segments, self.max_segments, size // max(1, self.chunk_size) or 1))
+        step = -(-size // count)
+        return [[start, min(start + step, size) - 1, 0] for start in range(0, size, step)]
+
+    async def download(
+        self,
+        url: str,
+        dest_path: str,
+        progress: Optional[Callable[[int, int, float], None]] = None,
+        segments: Optional[int] = None,
+        stats: Optional[Dict[str, int]] = None,
+        remote: Optional[RemoteFile] = None,
+    ) -> int:
+        """Download url to dest_path and return the number of bytes written.
+
+        progress(downloaded, total, speed) is called from the event loop; an
+        exception raised by it aborts the download and keeps the partial file.
+        Connection retries are counted in stats["retries"] when given and the
+        connections actually used in stats["segments"]; a RemoteFile from an
+        earlier probe() saves the second round trip.
+        """
+        stats = stats if stats is not None else {}
+        stats.setdefault("retries", 0)
+        remote = remote or await self.probe(url)
+        part_path = f"{dest_path}.part"
+        state_path = f"{part_path}.state"
+
+        if remote.size and remote.accept_ranges:
+            try:
+                await self._download_segmented(remote, part_path, state_path, progress, segments, stats)
+            except RangeNotSupported:
+                logger.warning("Server ignored Range requests, using a single stream")
+                await self._download_stream(remote, part_path, progress, stats)
+        else:
+            await self._download_stream(remote, part_path, progress, stats)
+
+        if os.path.exists(state_path):
+            os.remove(state_path)
+        os.replace(part_path, dest_path)
+        return os.path.getsize(dest_path)
+
+    def _load_state(self, state_path: str, size: int) -> Optional[List[List[int]]]:
+        try:
+            with open(state_path, "r") as f:
+                state = json.load(f)
+            if state.get("size") == size:
+                return state["segments"]
+        except (OSError, ValueError, KeyError):
+            pass
+        return None
+
+    @staticmethod
+    def _save_state(state_path: str, size: int, plan: List[List[int]]):
+        tmp_path = f"{state_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"size": size, "segments": plan}, f)
+        os.replace(tmp_path, state_path)
+
+    async def _download_segmented(self, remote, part_path, state_path, progress, segments, stats):
+        size = remote.size
+        plan = None
+        if os.path.exists(part_path) and os.path.getsize(part_path) == size:
+            plan = self._load_state(state_path, size)
+            if plan:
+                logger.info(f"Resuming segmented download at {sum(s[2] for s in plan)}/{size} bytes")
+        if not plan:
+            plan = self.plan_segments(size, segments)
+            with open(part_path, "wb") as f:
+                f.truncate(size)
+            self._save_state(state_path, size, plan)
+        stats["segments"] = len(plan)
+
+        tracker = _ProgressTracker(size, sum(s[2] for s in plan), progress)
+        fd = os.open(part_path, os.O_RDWR | getattr(os, "O_BINARY", 0))
+        try:
+            async def checkpoint():
+                while True:
+                    await asyncio.sleep(2)
+                    self._save_state(state_path, size, plan)
+
+            checkpointer = asyncio.create_task(checkpoint())
+            tasks = [
+                asyncio.create_task(self._fetch_segment(remote.url, fd, segment, tracker, size, stats))
+                for segment in plan if segment[0] + segment[2] <= segment[1]
+            ]
+            try:
+                await asyncio.gather(*tasks)
+            except BaseException:
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+                raise
+            finally:
+                checkpointer.cancel()
+                self._save_state(state_path, size, plan)
+        finally:
+            os.close(fd)
+
+    async def _fetch_segment(self, url, fd, segment, tracker, size, stats):
+        """Fetch one segment, retrying from the last written byte"""
+        session = await self.session()
+        start, end = segment[0], segment[1]
+        for attempt in range(self.retries + 1):
+            offset = start + segment[2]
+            if offset > end:
+                return
+            try:
+                headers = {"Range": f"bytes={offset}-{end}"}
+                async with session.get(url, headers=headers) as resp:
+                    if resp.status == 200 and not (offset == 0 and end == size - 1):
+                        raise RangeNotSupported()
+                    resp.raise_for_status()
+                    async for chunk in resp.content.iter_chunked(self.chunk_size):
+                        chunk = chunk[:end - offset + 1]
+                        # Disk writes run on the I/O pool, a slow disk must not stall the loop
+                        await execution_service.run_io(_pwrite, fd, chunk, offset)
+                        offset += len(chunk)
+                        segment[2] += len(chunk)
+                        tracker.add(len(chunk))
+                        if offset > end:
+                            break
+                if offset > end:
+                    return
+                raise aiohttp.ClientPayloadError(f"Segment ended early at {offset}/{end + 1}")
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if isinstance(e, aiohttp.ClientResponseError) and e.status in (401, 403, 404, 410):
+                    raise
+                if attempt == self.retries:
+                    raise
+                stats["retries"] += 1
+                logger.warning(f"Segment {start}-{end} failed ({e}), retry {attempt + 1}/{self.retries}")
+                await asyncio.sleep(2 ** attempt)
+
+    async def _download_stream(self, remote, part_path, progress, stats):
+        """Single-connection fallback for servers without usable ranges"""
+        stats["segments"] = 1
+        session = await self.session()
+        for attempt in range(self.retries + 1):
+            try:
+                async with session.get(remote.url) as resp:
+                    resp.raise_for_status()
+                    total = int(resp.headers.get("Content-Length") or remote.size or 0)
+                    tracker = _ProgressTracker(total, 0, progress)
+                    with open(part_path, "wb") as f:
+                        async for chunk in resp.content.iter_chunked(self.chunk_size):
+                            await execution_service.run_io(f.write, chunk)
+                            tracker.add(len(chunk))
+                return
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if isinstance(e, aiohttp.ClientResponseError) and e.status in (401, 403, 404, 410):
+                    raise
+                if attempt == self.retries:
+                    raise
+                stats["retries"] += 1
+                logger.warning(f"Download failed ({e}), retry {attempt + 1}/{self.retries}")
+                await asyncio.sleep(2 ** attempt)
+
+
+def _pwrite(fd: int, data: bytes, offset: int):
+    """Positional write, with a seek fallback where os.pwrite is missing"""
+    if hasattr(os, "pwrite"):
+        while data:
+            written = os.pwrite(fd, data, offset)
+            data = data[written:]
+            offset += written
+    else:
+        os.lseek(fd, offset, os.SEEK_SET)
+        os.write(fd, data)
+
+
+class _ProgressTracker:
+    """Aggregates bytes from all segments into throttled progress calls"""
+    def __init__(self, total: int, done: int, callback, interval: float = 0.5):
+        self.total = total
+        self.done = done
+        self.callback = callback
+        self.interval = interval
+        self.start_time = time.time()
+        self.start_done = done
+        self.last_call = 0.0
+
+    def add(self, count: int):
+        self.done += count
+        if not self.callback:
+            return
+        now = time.time()
+        if now - self.last_call >= self.interval or (self.total and self.done >= self.total):
+            self.last_call = now
+            elapsed = max(now - self.start_time, 1e-6)
+            self.callback(self.done, self.total, (self.done - self.start_done) / elapsed)
+
+
+# Create a single instance
+http_engine = HttpEngine()
@@ -0,0 +1,146 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from config import DATA_DIR
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+JOURNAL_PATH = os.path.join(DATA_DIR, "journal.json")
+
+# Minimum seconds between progress-only journal writes
+SAVE_INTERVAL = 5.0
+
+
+class JobJournal:
+    """Crash-safe record of in-flight download jobs.
+
+    Each job stores its URL, job directory, temp file, aria2 control file and
+    bytes done. The journal is rewritten atomically (temp file + rename), so
+    a crash at any point leaves either the old or the new version on disk.
+    Entries are removed once the job is uploaded or has failed for good;
+    whatever is left at startup is an interrupted download that can resume.
+    """
+    def __init__(self, path: str = JOURNAL_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._active = set()
+        self._last_save = 0.0
+        self._load()
+
+    @staticmethod
+    def job_id_for(chat_id: int, url: str, filename: str) -> str:
+        """Stable id, so a retried or resumed line reuses its partial files"""
+        key = f"{chat_id}\n{url}\n{filename}".encode("utf-8")
+        return hashlib.sha1(key).hexdigest()[:16]
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self._jobs = json.load(f)
+            if self._jobs:
+                logger.info(f"Loaded {len(self._jobs)} journaled download(s)")
+        except FileNotFoundError:
+            self._jobs = {}
+        except Exception as e:
+            logger.error(f"Could not read job journal, starting empty: {e}")
+            self._jobs = {}
+
+    def _save(self):
+        """Write the journal atomically, caller must hold the lock"""
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self._jobs, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+            self._last_save = time.time()
+        except Exception as e:
+            logger.error(f"Could not write job journal: {e}")
+
+    def claim(self, job_id: str) -> bool:
+        """Mark a job as running in this process, False if it already is"""
+        with self._lock:
+            if job_id in self._active:
+                return False
+            self._active.add(job_id)
+            return True
+
+    def start(self, job_id: str, **fields):
+        """Create or refresh a job entry, keeping progress from an earlier run"""
+        with self._lock:
+            job = self._jobs.setdefault(job_id, {"bytes_done": 0, "total_bytes": 0})
+            job.update(fields)
+            job.setdefault("created_at", time.time())
+            job.update({"job_id": job_id, "status": "downloading", "updated_at": time.time()})
+            self._save()
+
+    def update_progress(
+        self,
+        job_id: str,
+        bytes_done: int,
+        total_bytes: int,
+        temp_path: Optional[str] = None,
+        control_file: Optional[str] = None,
+    ):
+        """Record download progress, safe to call from download threads"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            job["bytes_done"] = int(bytes_done or 0)
+            job["total_bytes"] = int(total_bytes or 0)
+            if temp_path:
+                job["temp_path"] = temp_path
+                job["control_file"] = control_file or f"{temp_path}.aria2"
+            job["updated_at"] = time.time()
+            if time.time() - self._last_save >= SAVE_INTERVAL:
+                self._save()
+
+    def update(self, job_id: str, **fields):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            job.update(fields)
+            job["updated_at"] = time.time()
+            self._save()
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def finish(self, job_id: str):
+        """Forget a job that was delivered or failed permanently"""
+        with self._lock:
+            self._active.discard(job_id)
+            if self._jobs.pop(job_id, None) is not None:
+                self._save()
+
+    def release(self, job_id: str):
+        """Stop tracking a job as running but keep it for a later resume"""
+        with self._lock:
+            self._active.discard(job_id)
+            job = self._jobs.get(job_id)
+            if job is not None:
+                job["status"] = "interrupted"
+                self._save()
+
+    def pending(self) -> List[Dict[str, Any]]:
+        """Jobs left over from a previous run, oldest first"""
+        with self._lock:
+            jobs = [dict(job) for job_id, job in self._jobs.items() if job_id not in self._active]
+        return sorted(jobs, key=lambda job: job.get("created_at", 0))
+
+
+# Create a single instance
+journal = JobJournal()
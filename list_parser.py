@@ -0,0 +1,158 @@
+import logging
+import re
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from file_types import kind_for_extension
+from list_reader import iter_line_batches
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# An http(s) URL token, with the decryption key after `*` captured apart
+SCHEME_URL = re.compile(r'(https?://[^\s*]+)(?:\*(\S*))?', re.IGNORECASE)
+
+# A URL without a scheme: //host/..., www.host... or host.tld/path
+BARE_URL = re.compile(
+    r'(?:^|(?<=[\s:-]))(//[^\s*]+|www\.[^\s*]+|(?:[\w-]+\.)+[A-Za-z]{2,}/[^\s*]*)(?:\*(\S*))?(?=\s|$)',
+    re.IGNORECASE
+)
+
+# Trailing separators between the name and the URL
+NAME_SEPARATORS = ' \t:-'
+
+
+class ListEntry:
+    """One `name : url` line of a batch list.
+
+    url is the address without the `*key` suffix, key the decryption key
+    (None when the line has no `*`), kind youtube, unknown when the
+    extension says nothing, or a file_types kind (video, pdf, zip, ...).
+    """
+    __slots__ = ('line_no', 'line', 'name', 'url', 'key', 'kind')
+
+    def __init__(self, line_no: int, line: str, name: str, url: str, key: Optional[str], kind: str):
+        self.line_no = line_no
+        self.line = line
+        self.name = name
+        self.url = url
+        self.key = key
+        self.kind = kind
+
+    @property
+    def download_url(self) -> str:
+        """The URL as the downloader expects it, with the key re-attached"""
+        return self.url if self.key is None else f"{self.url}*{self.key}"
+
+    @property
+    def is_encrypted(self) -> bool:
+        return self.key is not None
+
+    @property
+    def is_supported(self) -> bool:
+        return self.kind in ('video', 'pdf')
+
+    def as_dict(self) -> dict:
+        return {
+            'line_no': self.line_no,
+            'name': self.name,
+            'url': self.url,
+            'key': self.key,
+            'kind': self.kind,
+        }
+
+
+class ListManifest:
+    """Entries of one list file, parsed once and shared by validation,
+    scheduling and reporting"""
+    def __init__(self):
+        self.entries: List[ListEntry] = []
+        self.invalid: List[str] = []
+        self.line_count = 0
+
+    def add_lines(self, lines: Iterable[str]):
+        """Parse the next lines of the file"""
+        entries, invalid = self.entries, self.invalid
+        line_no = self.line_count
+        for line_no, line in enumerate(lines, line_no + 1):
+            entry = parse_line(line, line_no)
+            if entry:
+                entries.append(entry)
+            elif line.strip():
+                invalid.append(line.strip())
+        self.line_count = line_no
+
+    @property
+    def total(self) -> int:
+        return len(self.entries) + len(self.invalid)
+
+
+def classify_url(url: str, key: Optional[str]) -> str:
+    base = url.lower()
+    if 'youtube.com' in base or 'youtu.be' in base:
+        return 'youtube'
+    kind = kind_for_extension(url)
+    if kind:
+        return kind
+    # Encrypted PDFs often hide the extension behind a query
+    if 'pdf' in base and key is not None:
+        return 'pdf'
+    return 'unknown'
+
+
+def parse_line(line: str, line_no: int = 0) -> Optional[ListEntry]:
+    """Parse `name : url`, `name - url`, `name url` or a bare URL.
+
+    The URL is the first http(s):// token, or failing that the first
+    //host/..., www.host... or host.tld/path token, which gets https. The
+    rest of the line is the name. Returns None for lines without a URL.
+    """
+    text = line.strip()
+    if not text:
+        return None
+
+    match = SCHEME_URL.search(text)
+    if match:
+        url, key = match.groups()
+    else:
+        match = BARE_URL.search(text)
+        if not match:
+            return None
+        url, key = match.groups()
+        url = f"https:{url}" if url.startswith('//') else f"https://{url}"
+    kind = classify_url(url, key)
+
+    start, end = match.span()
+    name = text[:start].rstrip(NAME_SEPARATORS)
+    if end < len(text):
+        name = f"{name} {text[end:].lstrip(NAME_SEPARATORS)}"
+    name = name.strip()
+    if not name:
+        name = url.split('?')[0].rstrip('/').split('/')[-1] or f"File_{line_no}"
+    if kind == 'pdf' and not name.lower().endswith('.pdf'):
+        name = f"{name}.pdf"
+
+    return ListEntry(line_no, text, name, url, key, kind)
+
+
+def iter_entries(lines: Iterable[str]) -> Iterator[Tuple[int, str, Optional[ListEntry]]]:
+    """Yield (line_no, line, entry) for every non-empty line, entry is None if invalid"""
+    for line_no, line in enumerate(lines, 1):
+        line = line.rstrip('\r\n')
+        if line.strip():
+            yield line_no, line, parse_line(line, line_no)
+
+
+def parse_manifest(lines: Iterable[str]) -> ListManifest:
+    manifest = ListManifest()
+    manifest.add_lines(lines)
+    logger.info(f"Parsed list: {len(manifest.entries)} entries, {len(manifest.invalid)} invalid lines")
+    return manifest
+
+
+async def read_manifest(path: str) -> ListManifest:
+    """Parse a list file while it is read, a chunk of lines at a time"""
+    manifest = ListManifest()
+    async for lines in iter_line_batches(path):
+        manifest.add_lines(lines)
+    logger.info(f"Read list {path}: {len(manifest.entries)} entries, {len(manifest.invalid)} invalid lines")
+    return manifest
@@ -0,0 +1,124 @@
+import codecs
+import logging
+from typing import AsyncIterator, Iterator, List
+
+import aiofiles
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Bytes looked at for a BOM or the charset before decoding starts
+SNIFF_SIZE = 8 * 1024
+
+CHUNK_SIZE = 64 * 1024
+
+# Everything str.splitlines() breaks on
+LINE_BREAKS = '\n\r\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029'
+
+# Longest BOM first, the UTF-32 LE BOM starts with the UTF-16 LE one
+BOMS = (
+    (codecs.BOM_UTF32_LE, 'utf-32'),
+    (codecs.BOM_UTF32_BE, 'utf-32'),
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+)
+
+
+def sniff_encoding(head: bytes) -> str:
+    """Encoding of a text file from its first bytes: the BOM, else utf-8 if
+    the sample decodes, else latin-1"""
+    for bom, encoding in BOMS:
+        if head.startswith(bom):
+            return encoding
+    try:
+        # final=False tolerates a character cut at the end of the sample
+        codecs.getincrementaldecoder('utf-8')().decode(head, final=False)
+        return 'utf-8'
+    except UnicodeDecodeError:
+        return 'latin-1'
+
+
+class LineDecoder:
+    """Incremental bytes to lines decoding for one file.
+
+    The encoding is sniffed from the first SNIFF_SIZE bytes. If a file that
+    looked like utf-8 turns out not to be further in, decoding continues as
+    latin-1 from the first bad byte, so every byte is read and decoded once.
+    """
+    def __init__(self):
+        self.encoding = None
+        self._decoder = None
+        self._head = b''
+        self._tail = ''
+
+    def _start(self, head: bytes):
+        self.encoding = sniff_encoding(head)
+        errors = 'strict' if self.encoding == 'utf-8' else 'replace'
+        self._decoder = codecs.getincrementaldecoder(self.encoding)(errors)
+
+    def _decode(self, data: bytes, final: bool) -> str:
+        try:
+            return self._decoder.decode(data, final)
+        except UnicodeDecodeError as e:
+            logger.warning(f"Invalid utf-8 at byte {e.start} of a chunk, decoding the rest as latin-1")
+            self.encoding = 'latin-1'
+            self._decoder = codecs.getincrementaldecoder('latin-1')()
+            return e.object[:e.start].decode('utf-8') + e.object[e.start:].decode('latin-1')
+
+    def feed(self, data: bytes, final: bool = False) -> List[str]:
+        """Decode the next chunk and return the lines it completes"""
+        if self._decoder is None:
+            self._head += data
+            if len(self._head) < SNIFF_SIZE and not final:
+                return []
+            self._start(self._head)
+            data, self._head = self._head, b''
+
+        text = self._tail + self._decode(data, final)
+        lines = text.splitlines()
+        self._tail = ''
+        if final or not lines:
+            return lines
+        # The last line may continue in the next chunk, a trailing \r may be
+        # the first half of \r\n
+        if text[-1] == '\r':
+            self._tail = lines.pop() + '\r'
+        elif text[-1] not in LINE_BREAKS:
+            self._tail = lines.pop()
+        return lines
+
+    def close(self) -> List[str]:
+        return self.feed(b'', final=True)
+
+
+def iter_file_lines(path: str) -> Iterator[str]:
+    """Lines of a text file in any supported encoding, read once"""
+    decoder = LineDecoder()
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            yield from decoder.feed(chunk)
+    yield from decoder.close()
+
+
+async def iter_line_batches(path: str) -> AsyncIterator[List[str]]:
+    """Lines of a text file, read without blocking the event loop.
+
+    Yields the lines completed by each chunk, so callers can parse a batch
+    between reads instead of holding the whole file.
+    """
+    decoder = LineDecoder()
+    async with aiofiles.open(path, 'rb') as f:
+        while True:
+            chunk = await f.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            lines = decoder.feed(chunk)
+            if lines:
+                yield lines
+    lines = decoder.close()
+    if lines:
+        yield lines
@@ -0,0 +1,84 @@
+import asyncio
+import logging
+import shutil
+from typing import List, Optional
+
+from config import MEDIA_TOOL_NICE, FFPROBE_TIMEOUT, FFMPEG_TIMEOUT
+from executor import execution_service
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+
+class MediaToolError(Exception):
+    """A media tool could not be run to completion"""
+
+
+class MediaToolTimeout(MediaToolError):
+    """A media tool ran past its timeout and was killed"""
+
+
+class ToolResult:
+    """Exit status and captured output of a finished tool"""
+    def __init__(self, returncode: int, stdout: bytes, stderr: bytes):
+        self.returncode = returncode
+        self.stdout = stdout
+        self.stderr = stderr
+
+
+def _priority_prefix() -> List[str]:
+    """nice/ionice wrapper for heavy jobs, whichever of them is installed"""
+    prefix = []
+    if MEDIA_TOOL_NICE and shutil.which("nice"):
+        prefix += ["nice", "-n", str(MEDIA_TOOL_NICE)]
+    if shutil.which("ionice"):
+        prefix += ["ionice", "-c", "2", "-n", "7"]
+    return prefix
+
+
+PRIORITY_PREFIX = _priority_prefix()
+
+
+async def run_tool(
+    cmd: List[str],
+    timeout: Optional[float] = None,
+    heavy: bool = False,
+    input: Optional[bytes] = None,
+) -> ToolResult:
+    """Run ffmpeg/ffprobe as an async child process and capture its output.
+
+    Holds one of the global media-tool slots while running. Heavy jobs
+    (decoding, encoding) run under nice/ionice so they yield to the bot. The
+    process is killed when it times out or when the awaiting task is
+    cancelled, so no orphaned ffmpeg keeps a slot or the disk busy.
+    """
+    if timeout is None:
+        timeout = FFMPEG_TIMEOUT if heavy else FFPROBE_TIMEOUT
+    argv = (PRIORITY_PREFIX + list(cmd)) if heavy else list(cmd)
+
+    async with execution_service.process_slot():
+        process = await asyncio.create_subprocess_exec(
+            *argv,
+            stdin=asyncio.subprocess.PIPE if input is not None else asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        try:
+            stdout, stderr = await asyncio.wait_for(process.communicate(input), timeout=timeout)
+        except asyncio.TimeoutError:
+            await _kill(process)
+            raise MediaToolTimeout(f"{cmd[0]} timed out after {timeout}s")
+        except asyncio.CancelledError:
+            await asyncio.shield(_kill(process))
+            raise
+    return ToolResult(process.returncode, stdout, stderr)
+
+
+async def _kill(process: asyncio.subprocess.Process):
+    if process.returncode is None:
+        try:
+            process.kill()
+        except ProcessLookupError:
+            pass
+        await process.wait()
+        logger.warning(f"Killed media tool process {process.pid}")
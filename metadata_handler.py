@@ -1,11 +1,23 @@
 import os
+import io
+import copy
 import asyncio
+import aiohttp
 import json
 import logging
 from PIL import Image
 import subprocess
 import re
+import shutil
+import tempfile
 from pathlib import Path
+from collections import OrderedDict
+from executor import execution_service
+from media_tools import run_tool, MediaToolError
+from container_header import read_container_info
+from http_engine import http_engine
+from file_events import file_events
+from config import THUMBNAIL_BEST_FRAME, DATA_DIR
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -17,61 +29,51 @@ class VideoMetadata:
         self.width = None
         self.height = None
         self.duration = None
+        self.video_codec = None
+        self.audio_codec = None
         self.thumbnail = None
         self.is_valid = False
 
-async def process_video(video_path, force_generate=False):
-    """Process video file to extract metadata and generate thumbnail"""
-    try:
-        logger.info(f"Processing video: {video_path}")
-        metadata = VideoMetadata(video_path)
-        
-        # Wait for file to be fully written/decrypted
-        if '*' in video_path:  # For encrypted videos
-            logger.info("Encrypted video detected, waiting for decryption...")
-            await asyncio.sleep(8)
-        
-        # Ensure file exists and is not empty
-        if not os.path.exists(video_path) or os.path.getsize(video_path) == 0:
-            logger.error(f"Video file not found or empty: {video_path}")
-            return metadata
-        
-        # Wait for file size to stabilize
-        file_size = 0
-        new_size = os.path.getsize(video_path)
-        while new_size != file_size:
-            file_size = new_size
-            await asyncio.sleep(1)
-            if os.path.exists(video_path):
-                new_size = os.path.getsize(video_path)
-            else:
-                logger.error("Video file disappeared during processing")
-                return metadata
-                
-        logger.info(f"Video file stabilized at size: {file_size} bytes")
-        
-        # Extract metadata using ffprobe
+# Probe results keyed by file identity, so every caller shares one probe per file
+METADATA_CACHE_SIZE = 256
+_metadata_cache = OrderedDict()
+_metadata_locks = {}
+
+def file_identity(path):
+    """(device, inode, size, mtime) - changes whenever the file content is replaced"""
+    st = os.stat(path)
+    return (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns)
+
+async def probe_video(video_path):
+    """Read dimensions, duration and codecs from the container header, or ffprobe"""
+    metadata = VideoMetadata(video_path)
+    
+    # MP4/MOV and Matroska/WebM headers are parsed directly, no process needed
+    header = await execution_service.run(read_container_info, video_path)
+    if header and header.is_complete:
+        metadata.duration = header.duration_ms // 1000 or 1
+        metadata.width = header.width
+        metadata.height = header.height
+        metadata.video_codec = header.video_codec
+        metadata.audio_codec = header.audio_codec
+        logger.info(f"Read {header.container} header: {metadata.width}x{metadata.height}, {metadata.duration}s")
+    else:
         try:
             cmd = [
                 'ffprobe',
                 '-v', 'error',
-                '-select_streams', 'v:0',
-                '-show_entries', 'stream=width,height,duration,r_frame_rate',
+                '-show_entries', 'stream=codec_type,codec_name,width,height,duration',
                 '-show_entries', 'format=duration',
                 '-of', 'json',
                 video_path
             ]
             
-            process = await asyncio.create_subprocess_exec(
-                *cmd,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
-            )
-            
-            stdout, stderr = await process.communicate()
-            if process.returncode == 0:
-                probe = json.loads(stdout.decode())
-                stream_info = probe.get('streams', [{}])[0]
+            result = await run_tool(cmd)
+            if result.returncode == 0:
+                probe = json.loads(result.stdout.decode())
+                streams = probe.get('streams', [])
+                stream_info = next((s for s in streams if s.get('codec_type') == 'video'), {})
+                audio_info = next((s for s in streams if s.get('codec_type') == 'audio'), {})
                 format_info = probe.get('format', {})
                 
                 # Get duration from multiple sources
@@ -79,62 +81,78 @@ async def process_video(video_path, force_generate=False):
                     float(stream_info.get('duration', 0)),
                     float(format_info.get('duration', 0))
                 ]
-                metadata.duration = int(max(d for d in duration_sources if d > 0))
-                
-                # Get dimensions
-                metadata.width = int(stream_info.get('width', 1280))
-                metadata.height = int(stream_info.get('height', 720))
-                
-                # Scale dimensions if needed
-                if metadata.width < 1280:
-                    scale = 1280 / metadata.width
-                    metadata.width = 1280
-                    metadata.height = int(metadata.height * scale)
+                metadata.duration = int(max(duration_sources))
+                metadata.width = int(stream_info.get('width', 0)) or None
+                metadata.height = int(stream_info.get('height', 0)) or None
+                metadata.video_codec = stream_info.get('codec_name')
+                metadata.audio_codec = audio_info.get('codec_name')
                 
-                # Ensure even dimensions
-                metadata.width = metadata.width // 2 * 2
-                metadata.height = metadata.height // 2 * 2
-                
-                logger.info(f"Extracted metadata: {metadata.width}x{metadata.height}, {metadata.duration}s")
+                logger.info(f"Probed metadata: {metadata.width}x{metadata.height}, {metadata.duration}s")
             
         except Exception as e:
             logger.error(f"Error extracting metadata with ffprobe: {e}")
-            # Fallback to ffmpeg
-            try:
-                cmd = [
-                    'ffmpeg',
-                    '-i', video_path,
-                    '-f', 'null',
-                    '-'
-                ]
-                process = await asyncio.create_subprocess_exec(
-                    *cmd,
-                    stdout=asyncio.subprocess.PIPE,
-                    stderr=asyncio.subprocess.PIPE
-                )
-                _, stderr = await process.communicate()
-                stderr = stderr.decode()
-                
-                # Extract duration
-                duration_match = re.search(r"Duration: (\d{2}):(\d{2}):(\d{2})", stderr)
-                if duration_match:
-                    h, m, s = map(int, duration_match.groups())
-                    metadata.duration = h * 3600 + m * 60 + s
-                
-                # Extract dimensions
-                dim_match = re.search(r"Stream.*Video.* (\d+)x(\d+)", stderr)
-                if dim_match:
-                    metadata.width = int(dim_match.group(1))
-                    metadata.height = int(dim_match.group(2))
-            except Exception as e:
-                logger.error(f"Error extracting metadata with ffmpeg: {e}")
+    
+    metadata.is_valid = bool(metadata.width and metadata.height and metadata.duration)
+    return metadata
+
+async def get_video_metadata(video_path, with_thumbnail=True):
+    """Probe a file once and serve every later caller from the cache.
+    
+    The returned object is shared, callers must copy it before changing it.
+    """
+    key = file_identity(video_path)
+    lock = _metadata_locks.setdefault(key, asyncio.Lock())
+    async with lock:
+        metadata = _metadata_cache.get(key)
+        if metadata is None:
+            metadata = await probe_video(video_path)
+            if metadata.is_valid:
+                _metadata_cache[key] = metadata
+                while len(_metadata_cache) > METADATA_CACHE_SIZE:
+                    old_key, _ = _metadata_cache.popitem(last=False)
+                    _metadata_locks.pop(old_key, None)
+        else:
+            _metadata_cache.move_to_end(key)
+            logger.info(f"Using cached metadata for {os.path.basename(video_path)}")
         
-        # Generate thumbnail
-        if force_generate or not metadata.thumbnail:
-            thumbnail_path = await generate_thumbnail(video_path)
-            if thumbnail_path:
-                metadata.thumbnail = thumbnail_path
-                logger.info(f"Generated thumbnail: {thumbnail_path}")
+        if with_thumbnail and not (metadata.thumbnail and os.path.exists(metadata.thumbnail)):
+            metadata.thumbnail = await generate_thumbnail(
+                video_path, duration=metadata.duration, best_frame=THUMBNAIL_BEST_FRAME
+            )
+            if metadata.thumbnail:
+                logger.info(f"Generated thumbnail: {metadata.thumbnail}")
+    
+    if key not in _metadata_cache:
+        _metadata_locks.pop(key, None)
+    return metadata
+
+async def process_video(video_path, force_generate=False):
+    """Process video file to extract metadata and generate thumbnail"""
+    try:
+        logger.info(f"Processing video: {video_path}")
+        metadata = VideoMetadata(video_path)
+        
+        # Wait for the downloader to finish writing/decrypting the file
+        finalized = await file_events.wait(video_path)
+        if not finalized or finalized.size == 0:
+            logger.error(f"Video file not found or empty: {video_path}")
+            return metadata
+        
+        # Shared probe and thumbnail, copied so the scaling below stays local
+        metadata = copy.copy(await get_video_metadata(video_path, with_thumbnail=force_generate))
+        
+        if metadata.width and metadata.height:
+            # Scale dimensions if needed
+            if metadata.width < 1280:
+                scale = 1280 / metadata.width
+                metadata.width = 1280
+                metadata.height = int(metadata.height * scale)
+            
+            # Ensure even dimensions
+            metadata.width = metadata.width // 2 * 2
+            metadata.height = metadata.height // 2 * 2
+            
+            logger.info(f"Extracted metadata: {metadata.width}x{metadata.height}, {metadata.duration}s")
         
         metadata.is_valid = bool(
             metadata.width and 
@@ -149,133 +167,172 @@ async def process_video(video_path, force_generate=False):
         logger.error(f"Error processing video: {e}")
         return metadata
 
-async def generate_thumbnail(video_path, max_attempts=5):
-    """Generate thumbnail from video with multiple attempts"""
+# Keyframe seek offsets tried in turn, later ones skip a damaged start
+THUMBNAIL_OFFSETS = (1, 6, 11, 16, 21)
+
+# Best-frame mode: candidates scored, and the opening seconds they are
+# spread over (every keyframe in it is decoded)
+BEST_FRAME_CANDIDATES = 8
+BEST_FRAME_WINDOW = 300
+
+PPM_HEADER = re.compile(rb"P6\s+(\d+)\s+(\d+)\s+(\d+)\s")
+
+def thumbnail_timestamps(duration=None, max_attempts=5):
+    """Seek offsets to try, kept inside the video when its duration is known.
+    
+    The first keyframe is the last resort, a short video may have no other.
+    """
+    offsets = list(THUMBNAIL_OFFSETS[:max_attempts])
+    if duration:
+        offsets = [ts for ts in offsets if ts < duration]
+    return offsets + [0]
+
+def render_thumbnail(frame, thumbnail_path):
+    """Fit a decoded frame to 320px and write it as the JPEG thumbnail, once"""
+    with Image.open(io.BytesIO(frame)) as img:
+        img = img.convert('RGB')
+        img.thumbnail((320, 320), Image.Resampling.LANCZOS)
+        img.save(thumbnail_path, "JPEG", quality=95)
+    return thumbnail_path
+
+async def grab_frame(video_path, timestamp):
+    """Decode the first keyframe from timestamp on, scaled, as PPM bytes"""
+    cmd = [
+        'ffmpeg', '-v', 'error',
+        '-skip_frame', 'nokey',
+        '-ss', str(timestamp),
+        '-i', video_path,
+        '-frames:v', '1',
+        '-vf', 'scale=320:320:force_original_aspect_ratio=decrease',
+        '-f', 'image2pipe', '-vcodec', 'ppm',
+        'pipe:1'
+    ]
+    result = await run_tool(cmd, heavy=True)
+    if result.returncode != 0 or not result.stdout:
+        raise MediaToolError(result.stderr.decode(errors='replace').strip() or f"no frame at {timestamp}s")
+    return result.stdout
+
+def split_ppm_frames(data):
+    """Split concatenated PPM images from image2pipe into (width, height, ppm)"""
+    frames = []
+    pos = 0
+    while True:
+        match = PPM_HEADER.match(data, pos)
+        if not match:
+            break
+        width, height = int(match.group(1)), int(match.group(2))
+        end = match.end() + width * height * 3
+        if end > len(data):
+            break
+        frames.append((width, height, data[pos:end]))
+        pos = end
+    return frames
+
+def pick_best_frame(frames):
+    """Index of the most informative frame, scored for all candidates at once.
+    
+    Score is luma entropy plus contrast; near-black, near-white and flat
+    frames (fades, title cards) only win when nothing else is left.
+    """
+    import numpy as np
+    
+    # Candidates of one stream share a size, anything else is a stray frame
+    width, height = frames[0][0], frames[0][1]
+    usable = [i for i, (w, h, _) in enumerate(frames) if (w, h) == (width, height)]
+    pixels = np.stack([
+        np.frombuffer(frames[i][2], np.uint8, width * height * 3, len(frames[i][2]) - width * height * 3)
+        for i in usable
+    ]).reshape(len(usable), -1, 3).astype(np.uint16)
+    luma = (pixels[..., 0] * 77 + pixels[..., 1] * 150 + pixels[..., 2] * 29) >> 8
+    
+    mean = luma.mean(axis=1)
+    contrast = luma.std(axis=1)
+    # 64-bin histograms of every candidate in a single bincount
+    bins = (luma >> 2) + np.arange(len(usable))[:, None] * 64
+    counts = np.bincount(bins.ravel(), minlength=len(usable) * 64).reshape(len(usable), 64)
+    p = counts / luma.shape[1]
+    entropy = -(p * np.log2(p, out=np.zeros_like(p), where=p > 0)).sum(axis=1)
+    
+    score = entropy + contrast / 32
+    score[(mean < 16) | (mean > 240) | (contrast < 4)] -= 100
+    return usable[int(score.argmax())]
+
+async def grab_candidate_frames(video_path, duration=None, count=BEST_FRAME_CANDIDATES):
+    """Decode up to count keyframes spread over the opening, in one ffmpeg pass"""
+    window = min(duration, BEST_FRAME_WINDOW) if duration else BEST_FRAME_WINDOW
+    step = max(window / count, 1)
+    cmd = [
+        'ffmpeg', '-v', 'error',
+        '-skip_frame', 'nokey',
+        '-t', str(window),
+        '-i', video_path,
+        '-vf', f"select='isnan(prev_selected_t)+gte(t-prev_selected_t,{step:.3f})',"
+               "scale=320:320:force_original_aspect_ratio=decrease",
+        '-fps_mode', 'vfr',
+        '-frames:v', str(count),
+        '-f', 'image2pipe', '-vcodec', 'ppm',
+        'pipe:1'
+    ]
+    result = await run_tool(cmd, heavy=True)
+    if result.returncode != 0 or not result.stdout:
+        raise MediaToolError(result.stderr.decode(errors='replace').strip() or "no candidate frames")
+    return result.stdout
+
+async def best_frame_thumbnail(video_path, thumbnail_path, duration=None):
+    """Thumbnail from the best scored candidate, None to fall back to fixed offsets"""
+    try:
+        import numpy  # noqa: F401
+    except ImportError:
+        logger.warning("numpy is not installed, best-frame thumbnails disabled")
+        return None
+    
+    try:
+        data = await grab_candidate_frames(video_path, duration)
+        
+        def select():
+            frames = split_ppm_frames(data)
+            if not frames:
+                return None
+            best = pick_best_frame(frames)
+            render_thumbnail(frames[best][2], thumbnail_path)
+            return best, len(frames)
+        
+        picked = await execution_service.run(select)
+        if picked:
+            logger.info(f"Generated thumbnail from candidate {picked[0] + 1} of {picked[1]}")
+            return thumbnail_path
+    except Exception as e:
+        logger.warning(f"Best-frame thumbnail failed: {e}")
+    return None
+
+async def generate_thumbnail(video_path, max_attempts=5, duration=None, best_frame=False):
+    """Generate a thumbnail with a single ffmpeg call per seek offset.
+    
+    ffmpeg seeks to the keyframe, scales and pipes the frame to stdout, PIL
+    writes the JPEG straight from memory. A later offset is only tried when
+    the first one yields no frame, e.g. a damaged start or a short video.
+    With best_frame, several keyframes are decoded in one pass and the most
+    informative one is used instead, skipping black and title frames.
+    """
     try:
         thumbnail_path = f"{video_path}_thumb.jpg"
-        base_timestamp = 1
         
-        # Ensure video file is accessible
-        if not os.path.exists(video_path):
+        # Wait for the downloader to finish writing the file
+        if not await file_events.wait(video_path):
             logger.error(f"Video file not found: {video_path}")
             return None
-            
-        # Wait for video file to be fully written
-        file_size = 0
-        new_size = os.path.getsize(video_path)
-        while new_size != file_size:
-            file_size = new_size
-            await asyncio.sleep(1)
-            if os.path.exists(video_path):
-                new_size = os.path.getsize(video_path)
-            else:
-                logger.error("Video file disappeared during size check")
-                return None
-        
-        logger.info(f"Video file stabilized at size: {file_size} bytes")
         
-        # Remove existing thumbnail if any
-        if os.path.exists(thumbnail_path):
-            try:
-                os.remove(thumbnail_path)
-                logger.info("Removed existing thumbnail")
-            except Exception as e:
-                logger.error(f"Error removing existing thumbnail: {e}")
+        if best_frame and await best_frame_thumbnail(video_path, thumbnail_path, duration):
+            return thumbnail_path
         
-        for attempt in range(max_attempts):
+        for timestamp in thumbnail_timestamps(duration, max_attempts):
             try:
-                # Try different timestamps
-                current_ts = base_timestamp + (attempt * 5)
-                logger.info(f"Attempting thumbnail generation at timestamp {current_ts}s")
-                
-                # First try with seeking to keyframe
-                cmd = [
-                    'ffmpeg',
-                    '-ss', str(current_ts),
-                    '-i', video_path,
-                    '-vframes', '1',
-                    '-vf', 'scale=320:320:force_original_aspect_ratio=decrease',
-                    '-y',
-                    thumbnail_path
-                ]
-                
-                process = await asyncio.create_subprocess_exec(
-                    *cmd,
-                    stdout=asyncio.subprocess.PIPE,
-                    stderr=asyncio.subprocess.PIPE
-                )
-                
-                stdout, stderr = await process.communicate()
-                stderr_text = stderr.decode()
-                
-                # Check if thumbnail was generated
-                if os.path.exists(thumbnail_path) and os.path.getsize(thumbnail_path) > 0:
-                    try:
-                        # Verify and optimize thumbnail
-                        with Image.open(thumbnail_path) as img:
-                            # Convert to RGB if needed
-                            if img.mode != 'RGB':
-                                img = img.convert('RGB')
-                            # Create a new image with white background
-                            bg = Image.new('RGB', img.size, (255, 255, 255))
-                            if img.mode == 'RGBA':
-                                bg.paste(img, mask=img.split()[3])
-                            else:
-                                bg.paste(img)
-                            # Resize maintaining aspect ratio
-                            bg.thumbnail((320, 320), Image.Resampling.LANCZOS)
-                            # Save with optimization
-                            bg.save(thumbnail_path, "JPEG", quality=95, optimize=True)
-                        logger.info(f"Successfully generated thumbnail at {current_ts}s")
-                        return thumbnail_path
-                    except Exception as e:
-                        logger.error(f"Error processing thumbnail image: {e}")
-                        # Try alternative method if image processing fails
-                        continue
-                
-                # If first attempt fails, try alternative method
-                logger.info("Trying alternative thumbnail method...")
-                cmd = [
-                    'ffmpeg',
-                    '-i', video_path,
-                    '-ss', str(current_ts),
-                    '-vframes', '1',
-                    '-vf', 'scale=320:320:force_original_aspect_ratio=decrease',
-                    '-y',
-                    thumbnail_path
-                ]
-                
-                process = await asyncio.create_subprocess_exec(
-                    *cmd,
-                    stdout=asyncio.subprocess.PIPE,
-                    stderr=asyncio.subprocess.PIPE
-                )
-                
-                await process.communicate()
-                
-                if os.path.exists(thumbnail_path) and os.path.getsize(thumbnail_path) > 0:
-                    try:
-                        with Image.open(thumbnail_path) as img:
-                            if img.mode != 'RGB':
-                                img = img.convert('RGB')
-                            bg = Image.new('RGB', img.size, (255, 255, 255))
-                            if img.mode == 'RGBA':
-                                bg.paste(img, mask=img.split()[3])
-                            else:
-                                bg.paste(img)
-                            bg.thumbnail((320, 320), Image.Resampling.LANCZOS)
-                            bg.save(thumbnail_path, "JPEG", quality=95, optimize=True)
-                        logger.info(f"Successfully generated thumbnail using alternative method at {current_ts}s")
-                        return thumbnail_path
-                    except Exception as e:
-                        logger.error(f"Error processing thumbnail image (alternative method): {e}")
-                
+                frame = await grab_frame(video_path, timestamp)
+                await execution_service.run(render_thumbnail, frame, thumbnail_path)
+                logger.info(f"Generated thumbnail at {timestamp}s")
+                return thumbnail_path
             except Exception as e:
-                logger.error(f"Thumbnail generation attempt {attempt + 1} failed: {e}")
-                if attempt == max_attempts - 1:
-                    logger.error("All thumbnail generation attempts failed")
-                    return None
-                await asyncio.sleep(2 ** attempt)  # Exponential backoff
+                logger.warning(f"No thumbnail at {timestamp}s: {e}")
         
         logger.error("Failed to generate thumbnail after all attempts")
         return None
@@ -284,6 +341,103 @@ async def generate_thumbnail(video_path, max_attempts=5):
         logger.error(f"Error in thumbnail generation: {e}")
         return None
 
+# First-page PDF thumbnails, kept by content hash across batches
+PDF_THUMBNAIL_DIR = os.path.join(DATA_DIR, "pdf_thumbnails")
+PDF_THUMBNAIL_CACHE_SIZE = 512
+PDFTOPPM_AVAILABLE = shutil.which('pdftoppm') is not None
+# sampled checksum -> [lock, coroutines holding or waiting for it]
+_pdf_locks = {}
+
+def store_pdf_thumbnail(page, cached_path):
+    """Write the rendered page into the cache and drop the oldest entries"""
+    os.makedirs(PDF_THUMBNAIL_DIR, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(suffix='.tmp', dir=PDF_THUMBNAIL_DIR)
+    os.close(fd)
+    try:
+        render_thumbnail(page, tmp_path)
+        os.replace(tmp_path, cached_path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    
+    entries = [entry for entry in os.scandir(PDF_THUMBNAIL_DIR) if entry.name.endswith('.jpg')]
+    if len(entries) > PDF_THUMBNAIL_CACHE_SIZE:
+        entries.sort(key=lambda entry: entry.stat().st_mtime)
+        for entry in entries[:len(entries) - PDF_THUMBNAIL_CACHE_SIZE]:
+            os.remove(entry.path)
+
+async def generate_pdf_thumbnail(pdf_path, thumbnail_path):
+    """Render page one of a PDF at thumbnail size, once per distinct file.
+    
+    The cache key is the sampled checksum of the finalized download, which
+    covers the size, the start with the first page and the end with the
+    xref, so no PDF is read a second time for it. The cached image is
+    copied to thumbnail_path.
+    """
+    if not PDFTOPPM_AVAILABLE:
+        return None
+    try:
+        finalized = await file_events.wait(pdf_path)
+        if not finalized or finalized.size == 0:
+            return None
+        checksum = finalized.checksum
+        cached_path = os.path.join(PDF_THUMBNAIL_DIR, f"{checksum}.jpg")
+        
+        # Identical PDFs in one batch wait for the first render; the lock
+        # stays until its last waiter is done
+        entry = _pdf_locks.setdefault(checksum, [asyncio.Lock(), 0])
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                if os.path.exists(cached_path):
+                    os.utime(cached_path)
+                    logger.info(f"Using cached PDF thumbnail for {os.path.basename(pdf_path)}")
+                else:
+                    cmd = [
+                        'pdftoppm', '-f', '1', '-l', '1', '-singlefile',
+                        '-scale-to', '320', '-png', pdf_path
+                    ]
+                    result = await run_tool(cmd, heavy=True)
+                    if result.returncode != 0 or not result.stdout:
+                        raise MediaToolError(result.stderr.decode(errors='replace').strip() or "no page rendered")
+                    await execution_service.run(store_pdf_thumbnail, result.stdout, cached_path)
+                    logger.info(f"Rendered PDF thumbnail for {os.path.basename(pdf_path)}")
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                _pdf_locks.pop(checksum, None)
+        
+        await execution_service.run(shutil.copyfile, cached_path, thumbnail_path)
+        return thumbnail_path
+    except Exception as e:
+        logger.warning(f"Could not render PDF thumbnail: {e}")
+        return None
+
+async def fetch_remote_thumbnail(url, thumbnail_path, max_size=5 * 1024 * 1024):
+    """Fetch a remote thumbnail on the shared HTTP session and fit it to 320px"""
+    try:
+        session = await http_engine.session()
+        async with session.get(url, timeout=aiohttp.ClientTimeout(total=15)) as resp:
+            resp.raise_for_status()
+            data = await resp.content.read(max_size + 1)
+        if len(data) > max_size:
+            logger.warning(f"Remote thumbnail too large, skipping: {url}")
+            return None
+        
+        def process():
+            with Image.open(io.BytesIO(data)) as img:
+                img = img.convert('RGB')
+                img.thumbnail((320, 320), Image.Resampling.LANCZOS)
+                img.save(thumbnail_path, "JPEG", quality=95, optimize=True)
+            return thumbnail_path
+        
+        thumbnail_path = await execution_service.run(process)
+        logger.info(f"Fetched remote thumbnail: {thumbnail_path}")
+        return thumbnail_path
+    except Exception as e:
+        logger.warning(f"Could not fetch remote thumbnail: {e}")
+        return None
+
 def format_duration(seconds):
     """Format duration in HH:MM:SS format"""
     try:
@@ -0,0 +1,204 @@
+import asyncio
+import logging
+import traceback
+from typing import Any, Awaitable, Callable, Iterable, Optional
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Marks the end of a stage's input
+_DONE = object()
+
+
+class BatchItem:
+    """A single list entry moving through the pipeline"""
+    def __init__(self, index: int, entry: Any):
+        self.index = index
+        self.entry = entry
+        self.job = None
+        self.success = False
+
+
+class BatchPipeline:
+    """Download -> post-process -> upload pipeline connected by bounded queues.
+
+    Each stage runs with its own concurrency limit, so the download of item N+1
+    overlaps the post-processing and upload of item N. Items reach the upload
+    stage in list order; with a single upload worker (the default) results are
+    posted to the chat in exactly the order of the list.
+
+    Stage callables:
+        download(item) -> job or None        (None marks the item as failed)
+        postprocess(job) -> job or None
+        upload(job) -> bool
+        cleanup(job)                         (optional, called once for every downloaded job)
+    """
+    def __init__(
+        self,
+        download: Callable[[BatchItem], Awaitable[Any]],
+        postprocess: Callable[[Any], Awaitable[Any]],
+        upload: Callable[[Any], Awaitable[bool]],
+        cleanup: Optional[Callable[[Any], Any]] = None,
+        download_workers: int = 2,
+        postprocess_workers: int = 1,
+        upload_workers: int = 1,
+        queue_size: int = 2,
+        is_canceled: Optional[Callable[[], bool]] = None,
+        on_item_done: Optional[Callable[[BatchItem, int, int], Awaitable[None]]] = None,
+    ):
+        self.download = download
+        self.postprocess = postprocess
+        self.upload = upload
+        self.cleanup = cleanup
+        self.download_workers = max(1, download_workers)
+        self.postprocess_workers = max(1, postprocess_workers)
+        self.upload_workers = max(1, upload_workers)
+        self.queue_size = max(1, queue_size)
+        self.is_canceled = is_canceled or (lambda: False)
+        self.on_item_done = on_item_done
+
+        self.success_count = 0
+        self.failed_count = 0
+        self.fed_count = 0
+        self.canceled = False
+
+    async def run(self, entries: Iterable[Any]):
+        """Run the batch and return (success_count, failed_count)"""
+        download_queue = asyncio.Queue(maxsize=self.queue_size)
+        postprocess_queue = asyncio.Queue(maxsize=self.queue_size)
+        ready_queue = asyncio.Queue()
+
+        # Bounds the number of items holding files on disk at any moment
+        window = asyncio.Semaphore(
+            self.download_workers + self.postprocess_workers + self.upload_workers
+            + 2 * self.queue_size
+        )
+
+        async def feeder():
+            for index, entry in enumerate(entries):
+                await window.acquire()
+                if self.is_canceled():
+                    self.canceled = True
+                    window.release()
+                    break
+                self.fed_count += 1
+                await download_queue.put(BatchItem(index, entry))
+            for _ in range(self.download_workers):
+                await download_queue.put(_DONE)
+
+        async def download_worker():
+            while True:
+                item = await download_queue.get()
+                if item is _DONE:
+                    return
+                if not self.is_canceled():
+                    item.job = await self._run_stage("download", self.download, item)
+                await postprocess_queue.put(item)
+
+        async def postprocess_worker():
+            while True:
+                item = await postprocess_queue.get()
+                if item is _DONE:
+                    return
+                if item.job is not None and not self.is_canceled():
+                    job = await self._run_stage("post-process", self.postprocess, item.job)
+                    if job is None:
+                        self._cleanup(item.job)
+                    item.job = job
+                await ready_queue.put(item)
+
+        async def upload_dispatcher():
+            slots = asyncio.Semaphore(self.upload_workers)
+            pending = {}
+            next_index = 0
+            running = set()
+            finished = False
+
+            async def upload_one(item):
+                try:
+                    if item.job is not None and not self.is_canceled():
+                        item.success = bool(await self._run_stage("upload", self.upload, item.job))
+                    if item.job is not None:
+                        self._cleanup(item.job)
+                    await self._finish(item)
+                finally:
+                    slots.release()
+                    window.release()
+
+            while not finished or pending:
+                if not finished:
+                    item = await ready_queue.get()
+                    if item is _DONE:
+                        finished = True
+                    else:
+                        pending[item.index] = item
+                # Dispatch every item whose predecessors have all been dispatched
+                while next_index in pending:
+                    item = pending.pop(next_index)
+                    next_index += 1
+                    await slots.acquire()
+                    task = asyncio.create_task(upload_one(item))
+                    running.add(task)
+                    task.add_done_callback(running.discard)
+                if finished and pending:
+                    # Only reachable if an index was lost, never block on it
+                    logger.error(f"Pipeline lost items before index {min(pending)}")
+                    next_index = min(pending)
+            if running:
+                await asyncio.gather(*running)
+
+        async def close_stage(workers, queue, count):
+            await asyncio.gather(*workers)
+            for _ in range(count):
+                await queue.put(_DONE)
+
+        download_tasks = [asyncio.create_task(download_worker()) for _ in range(self.download_workers)]
+        postprocess_tasks = [asyncio.create_task(postprocess_worker()) for _ in range(self.postprocess_workers)]
+        tasks = [
+            asyncio.create_task(feeder()),
+            asyncio.create_task(close_stage(download_tasks, postprocess_queue, self.postprocess_workers)),
+            asyncio.create_task(close_stage(postprocess_tasks, ready_queue, 1)),
+            asyncio.create_task(upload_dispatcher()),
+        ]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks + download_tasks + postprocess_tasks:
+                task.cancel()
+            raise
+
+        if self.is_canceled():
+            self.canceled = True
+        return self.success_count, self.failed_count
+
+    async def _run_stage(self, name, func, arg):
+        """Run one stage callable, turning exceptions into a failed item"""
+        try:
+            return await func(arg)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Pipeline {name} stage error: {e}")
+            logger.error(traceback.format_exc())
+            return None
+
+    def _cleanup(self, job):
+        if self.cleanup:
+            try:
+                self.cleanup(job)
+            except Exception as e:
+                logger.error(f"Pipeline cleanup error: {e}")
+
+    async def _finish(self, item):
+        if self.is_canceled() and not item.success:
+            # Items dropped by a cancel are neither successes nor failures
+            return
+        if item.success:
+            self.success_count += 1
+        else:
+            self.failed_count += 1
+        if self.on_item_done:
+            try:
+                await self.on_item_done(item, self.success_count, self.failed_count)
+            except Exception as e:
+                logger.error(f"Pipeline progress callback error: {e}")
@@ -0,0 +1,74 @@
+import asyncio
+import logging
+import traceback
+from typing import Awaitable, Callable, Optional
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+
+class ProgressChannel:
+    """Latest-value-wins channel between download threads and the event loop.
+
+    publish() may be called from any thread. It only stores the newest sample
+    and schedules a wakeup, so the caller never waits on the event loop or on
+    the network. A single async consumer renders whatever sample is newest
+    when it gets to run; intermediate samples are dropped.
+    """
+    def __init__(
+        self,
+        callback: Callable[..., Awaitable[None]],
+        loop: Optional[asyncio.AbstractEventLoop] = None,
+    ):
+        self.callback = callback
+        self.loop = loop or asyncio.get_running_loop()
+        self.published = 0
+        self.delivered = 0
+        self._latest = None
+        self._wakeup_pending = False
+        self._closed = False
+        self._event = asyncio.Event()
+        self._task = None
+
+    def start(self):
+        """Start the consumer task, must be called from the event loop"""
+        if self._task is None:
+            self._task = self.loop.create_task(self._consume())
+        return self
+
+    def publish(self, *sample):
+        """Store the newest sample, safe to call from any thread"""
+        # A single reference assignment is atomic, no lock needed
+        self._latest = sample
+        self.published += 1
+        if not self._wakeup_pending:
+            self._wakeup_pending = True
+            try:
+                self.loop.call_soon_threadsafe(self._event.set)
+            except RuntimeError:
+                # Event loop already closed, nobody is listening anymore
+                pass
+
+    async def close(self):
+        """Deliver the last pending sample and stop the consumer"""
+        self._closed = True
+        self._event.set()
+        if self._task is not None:
+            await self._task
+            self._task = None
+
+    async def _consume(self):
+        while True:
+            await self._event.wait()
+            self._event.clear()
+            self._wakeup_pending = False
+            sample, self._latest = self._latest, None
+            if sample is not None:
+                try:
+                    await self.callback(*sample)
+                    self.delivered += 1
+                except Exception as e:
+                    logger.error(f"Progress consumer error: {e}")
+                    logger.error(traceback.format_exc())
+            if self._closed and self._latest is None:
+                return
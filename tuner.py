@@ -0,0 +1,179 @@
+import json
+import logging
+import os
+import random
+import re
+import threading
+import time
+from typing import Any, Dict
+from urllib.parse import urlparse
+
+from config import DATA_DIR
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+TUNER_PATH = os.path.join(DATA_DIR, "tuner.json")
+
+# Connection counts the tuner moves between, 16 was the old fixed value
+CONNECTION_STEPS = (4, 8, 12, 16, 24, 32)
+DEFAULT_CONNECTIONS = 16
+
+# Weight of the newest sample in the moving averages
+EWMA_ALPHA = 0.3
+
+# Downloads smaller or shorter than this say nothing about throughput
+MIN_SAMPLE_BYTES = 4 * 1024 * 1024
+MIN_SAMPLE_SECONDS = 1.0
+
+# Samples needed at the best setting before trying its neighbours
+MIN_SAMPLES = 2
+
+# Average resets per download at which a setting is backed off
+RESET_THRESHOLD = 1.0
+
+EXPLORE_RATE = 0.1
+
+# yt-dlp messages that mean a connection was dropped and retried
+RESET_MESSAGE_RE = re.compile(
+    r"retrying|connection (reset|aborted|refused)|timed out|remote end closed|incomplete read",
+    re.IGNORECASE,
+)
+
+
+def host_of(url: str) -> str:
+    return (urlparse(url).hostname or "").lower()
+
+
+class RetryCounter:
+    """yt-dlp logger that counts dropped-connection retries"""
+    def __init__(self):
+        self.resets = 0
+
+    def _count(self, msg: str):
+        if RESET_MESSAGE_RE.search(msg):
+            self.resets += 1
+
+    def debug(self, msg: str):
+        self._count(msg)
+
+    def info(self, msg: str):
+        self._count(msg)
+
+    def warning(self, msg: str):
+        self._count(msg)
+        logger.debug(msg)
+
+    def error(self, msg: str):
+        self._count(msg)
+        logger.debug(msg)
+
+
+class ConnectionTuner:
+    """Picks per-host connection counts from measured throughput.
+
+    Every finished download records its throughput and connection resets
+    under (host, connections) as moving averages. The next download from the
+    same host uses the best-scoring count. Once that count has enough samples,
+    its untried neighbours get a turn. A count that keeps getting reset is
+    backed off. What the tuner learns is persisted to data/tuner.json.
+    """
+    def __init__(self, path: str = TUNER_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._hosts: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self._hosts = json.load(f)
+        except FileNotFoundError:
+            self._hosts = {}
+        except Exception as e:
+            logger.error(f"Could not read connection tuner state, starting empty: {e}")
+            self._hosts = {}
+
+    def _save(self):
+        """Write the tuner state atomically, caller must hold the lock"""
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self._hosts, f)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            logger.error(f"Could not write connection tuner state: {e}")
+
+    @staticmethod
+    def _score(stats: Dict[str, Any]) -> float:
+        return stats["mbps"] / (1.0 + stats["resets"])
+
+    @staticmethod
+    def _neighbours(connections: int):
+        index = CONNECTION_STEPS.index(connections) if connections in CONNECTION_STEPS else \
+            CONNECTION_STEPS.index(DEFAULT_CONNECTIONS)
+        higher = CONNECTION_STEPS[index + 1] if index + 1 < len(CONNECTION_STEPS) else None
+        lower = CONNECTION_STEPS[index - 1] if index > 0 else None
+        return higher, lower
+
+    def choose(self, url: str) -> int:
+        """Connection count to use for the next download from this URL's host"""
+        with self._lock:
+            stats = {int(n): s for n, s in self._hosts.get(host_of(url), {}).items()}
+        if not stats:
+            return DEFAULT_CONNECTIONS
+
+        best = max(stats, key=lambda n: self._score(stats[n]))
+        higher, lower = self._neighbours(best)
+
+        # The host keeps dropping connections at this count, use fewer
+        if stats[best]["resets"] >= RESET_THRESHOLD and lower is not None:
+            return lower
+
+        if stats[best]["samples"] >= MIN_SAMPLES:
+            for candidate in (higher, lower):
+                if candidate is not None and candidate not in stats:
+                    return candidate
+
+        if random.random() < EXPLORE_RATE:
+            candidates = [n for n in (higher, lower) if n is not None]
+            if candidates:
+                return random.choice(candidates)
+        return best
+
+    def record(self, url: str, connections: int, bytes_done: int, seconds: float, resets: int = 0):
+        """Fold one finished (or failed) download into the host's averages"""
+        host = host_of(url)
+        if not host:
+            return
+        # A failed download still teaches us about resets, but not about speed
+        has_speed = bytes_done >= MIN_SAMPLE_BYTES and seconds >= MIN_SAMPLE_SECONDS
+        if not has_speed and not resets:
+            return
+        mbps = bytes_done / seconds / (1024 * 1024) if has_speed else 0.0
+
+        with self._lock:
+            host_stats = self._hosts.setdefault(host, {})
+            stats = host_stats.get(str(connections))
+            if stats is None:
+                stats = {"samples": 0, "mbps": 0.0, "resets": float(resets)}
+                host_stats[str(connections)] = stats
+            else:
+                stats["resets"] = (1 - EWMA_ALPHA) * stats["resets"] + EWMA_ALPHA * resets
+            if has_speed:
+                if stats["samples"]:
+                    stats["mbps"] = (1 - EWMA_ALPHA) * stats["mbps"] + EWMA_ALPHA * mbps
+                else:
+                    stats["mbps"] = mbps
+                stats["samples"] += 1
+            stats["updated_at"] = time.time()
+            self._save()
+
+        logger.info(
+            f"Tuner {host}: {connections} connections, {mbps:.1f} MB/s, {resets} resets"
+        )
+
+
+# Create a single instance
+connection_tuner = ConnectionTuner()
@@ -1,7 +1,12 @@
 import os
 import re
+import tempfile
 from datetime import datetime
 import logging
+from executor import execution_service
+from file_types import extension_of
+from list_parser import parse_line, iter_entries
+from list_reader import iter_file_lines
 
 # Set up logging
 logging.basicConfig(
@@ -10,133 +15,79 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+INVALID_FILENAME_CHARS = re.compile(r'[<>:"/\\|?*]')
+
 def clean_filename(filename):
     """Clean and format filename"""
     # Remove invalid characters
-    filename = re.sub(r'[<>:"/\\|?*]', '', filename)
+    filename = INVALID_FILENAME_CHARS.sub('', filename)
     # Remove multiple spaces
     filename = ' '.join(filename.split())
     # Remove leading/trailing spaces and dots
     filename = filename.strip('. ')
     return filename or 'File'
 
-def clean_url(url):
-    """Clean and validate URL"""
-    # Remove leading/trailing whitespace
-    url = url.strip()
-    # Ensure URL starts with http:// or https://
-    if not url.startswith(('http://', 'https://')):
-        if '//' in url:
-            url = 'https:' + url[url.index('//'):]
-        else:
-            url = 'https://' + url
-    return url
+def format_entry(entry):
+    """Write a parsed list entry back as a clean `filename : url` line"""
+    filename = clean_filename(entry.name)
+    
+    # Add extension from URL if missing
+    if entry.kind == 'video':
+        ext = extension_of(entry.url)
+        if not filename.lower().endswith(ext):
+            filename += ext
+    elif entry.kind == 'pdf' and not filename.lower().endswith('.pdf'):
+        filename += '.pdf'
+    
+    return f"{filename} : {entry.download_url}"
 
 def format_line(line):
     """Format a single line into the correct format"""
     try:
-        # Skip empty lines
-        if not line.strip():
-            return None
-            
-        # Common patterns to handle
-        patterns = [
-            # Pattern 1: filename - url
-            r'^(.+?)\s*-\s*(https?://\S+|//\S+|\S+\.\S+)$',
-            # Pattern 2: filename : url with multiple colons
-            r'^(.+?)\s*:+\s*(https?://\S+|//\S+|\S+\.\S+)$',
-            # Pattern 3: url only (generate filename from URL)
-            r'^(https?://\S+|//\S+|\S+\.\S+)$',
-            # Pattern 4: filename followed by url
-            r'^(.+?)\s+(https?://\S+|//\S+|\S+\.\S+)$'
-        ]
-        
-        for pattern in patterns:
-            match = re.match(pattern, line.strip())
-            if match:
-                if len(match.groups()) == 1:
-                    # URL only - extract filename from URL
-                    url = match.group(1)
-                    url = clean_url(url)
-                    filename = url.split('/')[-1].split('?')[0].split('*')[0]
-                    if not filename:
-                        filename = f"File_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-                else:
-                    filename = match.group(1)
-                    url = match.group(2)
-                
-                # Clean filename and URL
-                filename = clean_filename(filename)
-                url = clean_url(url)
-                
-                # Add extension from URL if missing
-                if url.lower().endswith('.pdf') and not filename.lower().endswith('.pdf'):
-                    filename += '.pdf'
-                elif '*' in url and '.mkv' in url.lower() and not filename.lower().endswith('.mkv'):
-                    filename += '.mkv'
-                elif any(url.lower().endswith(ext) for ext in ['.mp4', '.mkv', '.avi']):
-                    ext = url.split('.')[-1].split('*')[0].lower()
-                    if not filename.lower().endswith(ext):
-                        filename += f'.{ext}'
-                
-                return f"{filename} : {url}"
-        
-        # If no pattern matches but line contains a URL
-        url_match = re.search(r'(https?://\S+|//\S+|\S+\.\S+)', line)
-        if url_match:
-            url = clean_url(url_match.group(1))
-            remaining = line.replace(url_match.group(1), '').strip(' :-')
-            filename = clean_filename(remaining) if remaining else url.split('/')[-1].split('?')[0]
-            return f"{filename} : {url}"
-            
-        return None
-        
+        entry = parse_line(line)
+        return format_entry(entry) if entry else None
     except Exception as e:
         logger.error(f"Error formatting line: {str(e)}")
         return None
 
+def iter_formatted(lines):
+    """Yield (formatted, line) for every non-empty line, formatted is None if skipped"""
+    for _, line, entry in iter_entries(lines):
+        yield (format_entry(entry) if entry else None), line
+
+def filter_lines(input_path, output_path):
+    """Stream input_path through the formatter into output_path, returns counters.
+    
+    The input is decoded in one pass whatever its encoding. Formatted lines
+    go straight to the output file. Skipped lines spill to a temporary file
+    and are appended after them, so memory use does not grow with the size
+    of the list.
+    """
+    formatted_count = 0
+    skipped_count = 0
+    with open(output_path, 'w', encoding='utf-8') as out, \
+            tempfile.TemporaryFile('w+', encoding='utf-8') as spill:
+        for formatted, line in iter_formatted(iter_file_lines(input_path)):
+            if formatted:
+                if not formatted_count:
+                    out.write("✅ Formatted URLs:")
+                out.write(f"\n{formatted}")
+                formatted_count += 1
+            else:
+                spill.write(f"{line}\n")
+                skipped_count += 1
+        
+        if skipped_count:
+            if formatted_count:
+                out.write("\n\n❌ Skipped Lines (Invalid Format):")
+            spill.seek(0)
+            for i, line in enumerate(spill):
+                out.write(f"\n{line[:-1]}" if formatted_count or i else line[:-1])
+    return formatted_count, skipped_count
+
 async def process_text_file(input_path):
     """Process text file and return formatted content"""
     try:
-        # Read input file with different encodings
-        content = None
-        encodings = ['utf-8', 'latin-1', 'ascii']
-        
-        for encoding in encodings:
-            try:
-                with open(input_path, 'r', encoding=encoding) as f:
-                    content = f.read()
-                break
-            except UnicodeDecodeError:
-                continue
-        
-        if content is None:
-            raise ValueError("Could not read file with any supported encoding")
-        
-        # Process lines
-        formatted_lines = []
-        skipped_lines = []
-        
-        for line in content.splitlines():
-            if line.strip():
-                formatted = format_line(line)
-                if formatted:
-                    formatted_lines.append(formatted)
-                else:
-                    skipped_lines.append(line)
-        
-        # Generate output content
-        output_content = []
-        
-        if formatted_lines:
-            output_content.append("✅ Formatted URLs:")
-            output_content.extend(formatted_lines)
-            
-        if skipped_lines:
-            if output_content:
-                output_content.append("\n❌ Skipped Lines (Invalid Format):")
-            output_content.extend(skipped_lines)
-        
         # Create output file path
         output_dir = "downloads"
         if not os.path.exists(output_dir):
@@ -145,14 +96,13 @@ async def process_text_file(input_path):
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         output_path = os.path.join(output_dir, f"formatted_{timestamp}.txt")
         
-        # Write formatted content
-        with open(output_path, 'w', encoding='utf-8') as f:
-            f.write('\n'.join(output_content))
+        # Stream the file through the formatter off the event loop
+        formatted_count, skipped_count = await execution_service.run(filter_lines, input_path, output_path)
         
         stats = {
-            'total': len(formatted_lines) + len(skipped_lines),
-            'formatted': len(formatted_lines),
-            'skipped': len(skipped_lines),
+            'total': formatted_count + skipped_count,
+            'formatted': formatted_count,
+            'skipped': skipped_count,
             'output_path': output_path
         }
         
@@ -0,0 +1,246 @@
+import asyncio
+import inspect
+import logging
+import math
+import os
+import time
+from typing import Any, Callable, Dict, Optional
+
+from pyrogram import raw
+from pyrogram.errors import FloodWait
+from pyrogram.session import Session
+
+from config import UPLOAD_CONNECTIONS, UPLOAD_MAX_PARTS
+from executor import execution_service
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Telegram's largest upload part
+PART_SIZE = 512 * 1024
+
+# Files above this are uploaded as big files, smaller ones need an md5 and
+# stay with pyrogram's own upload
+BIG_FILE_SIZE = 10 * 1024 * 1024
+
+PART_RETRIES = 5
+PART_TIMEOUT = 60
+
+# Weight of the newest part latency in the moving average
+EWMA_ALPHA = 0.2
+
+# Part latency up to this multiple of the unloaded latency is not queueing
+LATENCY_TOLERANCE = 1.5
+
+# How far one part moves the limit towards the latency-based target
+LIMIT_SMOOTHING = 0.2
+
+# The unloaded latency creeps up by this factor per part, so it follows a
+# network that got slower instead of holding on to one lucky sample
+BASELINE_DRIFT = 1.001
+
+
+class UploadEngine:
+    """Uploads big files as parts spread over a pool of media connections.
+
+    pyrogram sends a file over one fresh media connection with four workers
+    and only logs parts that fail. Here a pool of connections to the
+    client's DC stays open between files and failed parts are retried. All
+    uploads share a limit on the parts in flight, tuned from part latency:
+    while parts come back about as fast as the best seen, the limit grows,
+    once they queue up behind each other it shrinks.
+    """
+    def __init__(self, connections: int = UPLOAD_CONNECTIONS, max_parts: int = UPLOAD_MAX_PARTS):
+        self.connections = max(1, connections)
+        self.max_parts = max(self.connections, max_parts)
+        self.limit = float(self.connections)
+        self.in_flight = 0
+        self._slots = asyncio.Condition()
+        self._sessions = []
+        self._next_session = 0
+        self._sessions_lock = asyncio.Lock()
+        self._latency: Optional[float] = None
+        self._baseline: Optional[float] = None
+
+        # Metrics
+        self.files = 0
+        self.retries = 0
+        self.last_mbps = 0.0
+
+    async def _open_session(self, client):
+        session = Session(
+            client, await client.storage.dc_id(), await client.storage.auth_key(),
+            await client.storage.test_mode(), is_media=True
+        )
+        await session.start()
+        return session
+
+    async def _session(self, client):
+        """Next pooled media connection, opening the pool on first use"""
+        if len(self._sessions) < self.connections:
+            async with self._sessions_lock:
+                missing = self.connections - len(self._sessions)
+                if missing > 0:
+                    opened = await asyncio.gather(
+                        *(self._open_session(client) for _ in range(missing)), return_exceptions=True
+                    )
+                    for session in opened:
+                        if isinstance(session, Exception):
+                            logger.warning(f"Could not open upload connection: {session}")
+                        else:
+                            self._sessions.append(session)
+                    if not self._sessions:
+                        raise ConnectionError("No upload connection could be opened")
+        self._next_session = (self._next_session + 1) % len(self._sessions)
+        return self._sessions[self._next_session]
+
+    async def _acquire(self):
+        async with self._slots:
+            await self._slots.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+
+    async def _release(self, latency: Optional[float] = None):
+        async with self._slots:
+            self.in_flight -= 1
+            if latency is not None:
+                self._observe(latency)
+            self._slots.notify_all()
+
+    def _observe(self, latency: float):
+        """Move the limit towards limit * unloaded / current latency, plus headroom"""
+        if self._baseline is None:
+            self._baseline = self._latency = latency
+        else:
+            self._baseline = min(self._baseline * BASELINE_DRIFT, latency)
+            self._latency = EWMA_ALPHA * latency + (1 - EWMA_ALPHA) * self._latency
+        gradient = min(1.0, self._baseline * LATENCY_TOLERANCE / self._latency)
+        target = self.limit * gradient + math.sqrt(self.limit)
+        limit = (1 - LIMIT_SMOOTHING) * self.limit + LIMIT_SMOOTHING * target
+        self.limit = max(1.0, min(float(self.max_parts), limit))
+
+    async def _send_part(self, client, rpc):
+        for attempt in range(1, PART_RETRIES + 1):
+            session = await self._session(client)
+            await self._acquire()
+            started = time.monotonic()
+            latency = None
+            wait = min(attempt, 5)
+            try:
+                if await session.invoke(rpc, timeout=PART_TIMEOUT):
+                    latency = time.monotonic() - started
+                    return
+                error = "not saved"
+            except FloodWait as e:
+                error, wait = e, e.value
+            except Exception as e:
+                error = e
+            finally:
+                await self._release(latency)
+            self.retries += 1
+            logger.warning(f"Upload part {rpc.file_part} failed ({error}), attempt {attempt}/{PART_RETRIES}")
+            await asyncio.sleep(wait)
+        raise ConnectionError(f"Upload part {rpc.file_part} failed {PART_RETRIES} times")
+
+    async def save_file(
+        self,
+        client,
+        path: str,
+        progress: Optional[Callable] = None,
+        progress_args: tuple = ()
+    ):
+        """Upload path as a big file and return its InputFileBig"""
+        size = os.path.getsize(path)
+        size_limit_mib = 4000 if client.me.is_premium else 2000
+        if size > size_limit_mib * 1024 * 1024:
+            raise ValueError(f"Can't upload files bigger than {size_limit_mib} MiB")
+
+        file_id = client.rnd_id()
+        total_parts = math.ceil(size / PART_SIZE)
+        next_part = 0
+        uploaded = 0
+        fd = os.open(path, os.O_RDONLY)
+
+        async def worker():
+            nonlocal next_part, uploaded
+            while next_part < total_parts:
+                part = next_part
+                next_part += 1
+                data = await execution_service.run_io(os.pread, fd, PART_SIZE, part * PART_SIZE)
+                await self._send_part(client, raw.functions.upload.SaveBigFilePart(
+                    file_id=file_id,
+                    file_part=part,
+                    file_total_parts=total_parts,
+                    bytes=data
+                ))
+                uploaded += len(data)
+                if progress:
+                    result = progress(uploaded, size, *progress_args)
+                    if inspect.isawaitable(result):
+                        await result
+
+        started = time.monotonic()
+        workers = [asyncio.create_task(worker()) for _ in range(min(self.max_parts, total_parts))]
+        try:
+            await asyncio.gather(*workers)
+        except BaseException:
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            raise
+        finally:
+            os.close(fd)
+
+        elapsed = max(time.monotonic() - started, 1e-6)
+        self.files += 1
+        self.last_mbps = size / elapsed / (1024 * 1024)
+        logger.info(
+            f"Uploaded {os.path.basename(path)}: {size / (1024 * 1024):.1f} MB in {elapsed:.1f}s, "
+            f"{self.last_mbps:.2f} MB/s ({int(self.limit)} parts in flight over {len(self._sessions)} connections)"
+        )
+        return raw.types.InputFileBig(id=file_id, parts=total_parts, name=os.path.basename(path))
+
+    def attach(self, client):
+        """Send the client's big file uploads through the engine.
+
+        pyrogram keeps small files and the re-upload of a single part that
+        Telegram reports missing, which it asks for with file_id/file_part.
+        """
+        upload = client.save_file
+
+        async def save_file(path, file_id=None, file_part=0, progress=None, progress_args=()):
+            if (
+                file_id is None
+                and isinstance(path, (str, os.PathLike))
+                and os.path.isfile(path)
+                and os.path.getsize(path) > BIG_FILE_SIZE
+            ):
+                return await self.save_file(client, path, progress, progress_args)
+            return await upload(
+                path, file_id=file_id, file_part=file_part, progress=progress, progress_args=progress_args
+            )
+
+        client.save_file = save_file
+
+    async def close(self):
+        sessions, self._sessions = self._sessions, []
+        for session in sessions:
+            try:
+                await session.stop()
+            except Exception as e:
+                logger.debug(f"Error closing upload connection: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "connections": len(self._sessions),
+            "max_connections": self.connections,
+            "limit": int(self.limit),
+            "max_parts": self.max_parts,
+            "in_flight": self.in_flight,
+            "files": self.files,
+            "retries": self.retries,
+            "last_mbps": self.last_mbps,
+        }
+
+
+# Create a single instance
+upload_engine = UploadEngine()